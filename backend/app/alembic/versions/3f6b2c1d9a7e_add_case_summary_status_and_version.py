@@ -0,0 +1,32 @@
+"""Add case summary status and version
+
+Revision ID: 3f6b2c1d9a7e
+Revises: 1a31ce608336
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b2c1d9a7e'
+down_revision = '1a31ce608336'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The case table is created by init_db on fresh databases
+    if not sa.inspect(op.get_bind()).has_table('case'):
+        return
+    op.add_column('case', sa.Column('summary_status', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False, server_default='ready'))
+    op.add_column('case', sa.Column('summary_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('case'):
+        return
+    op.drop_column('case', 'summary_version')
+    op.drop_column('case', 'summary_status')
@@ -0,0 +1,46 @@
+"""Add message ancestry path and depth
+
+Revision ID: 5b8e1f0c2d4a
+Revises: 3f6b2c1d9a7e
+Create Date: 2026-10-17 14:03:11.527930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e1f0c2d4a'
+down_revision = '3f6b2c1d9a7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The message table is created by init_db on fresh databases
+    if not sa.inspect(op.get_bind()).has_table('message'):
+        return
+    op.add_column('message', sa.Column('path', sa.String().with_variant(sa.String(collation='C'), 'postgresql'), nullable=False, server_default=''))
+    op.add_column('message', sa.Column('depth', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from parent_id, walking down from the roots
+    op.execute("""
+        WITH RECURSIVE ancestry(id, path, depth) AS (
+            SELECT id, CAST('' AS TEXT), 0 FROM message WHERE parent_id IS NULL
+            UNION ALL
+            SELECT m.id, a.path || CAST(a.id AS TEXT) || '/', a.depth + 1
+            FROM message m JOIN ancestry a ON m.parent_id = a.id
+        )
+        UPDATE message SET path = ancestry.path, depth = ancestry.depth
+        FROM ancestry WHERE message.id = ancestry.id
+    """)
+    # Only a bounded prefix: paths grow with depth past the btree entry size limit
+    op.create_index('ix_message_path_key', 'message', [sa.text('substr(path, 1, 1024)')], unique=False)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('message'):
+        return
+    op.drop_index('ix_message_path_key', table_name='message')
+    op.drop_column('message', 'depth')
+    op.drop_column('message', 'path')
@@ -0,0 +1,43 @@
+"""Add simulation tree indexes
+
+Revision ID: 7d2a9e4b6c13
+Revises: 5b8e1f0c2d4a
+Create Date: 2026-10-17 15:26:48.301174
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2a9e4b6c13'
+down_revision = '5b8e1f0c2d4a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables are created with these indexes by init_db on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('simulation'):
+        op.create_index(op.f('ix_simulation_case_id'), 'simulation', ['case_id'], unique=False, if_not_exists=True)
+    if inspector.has_table('message'):
+        op.create_index(op.f('ix_message_simulation_id'), 'message', ['simulation_id'], unique=False, if_not_exists=True)
+        op.create_index(op.f('ix_message_parent_id'), 'message', ['parent_id'], unique=False, if_not_exists=True)
+        op.create_index('ix_message_selected', 'message', ['simulation_id', 'depth'], unique=False, if_not_exists=True, postgresql_where=sa.text('selected IS true'), sqlite_where=sa.text('selected IS 1'))
+    if inspector.has_table('bookmark'):
+        op.create_index('ix_bookmark_simulation_id_message_id', 'bookmark', ['simulation_id', 'message_id'], unique=False, if_not_exists=True)
+        op.create_index(op.f('ix_bookmark_message_id'), 'bookmark', ['message_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('bookmark'):
+        op.drop_index(op.f('ix_bookmark_message_id'), table_name='bookmark', if_exists=True)
+        op.drop_index('ix_bookmark_simulation_id_message_id', table_name='bookmark', if_exists=True)
+    if inspector.has_table('message'):
+        op.drop_index('ix_message_selected', table_name='message', if_exists=True)
+        op.drop_index(op.f('ix_message_parent_id'), table_name='message', if_exists=True)
+        op.drop_index(op.f('ix_message_simulation_id'), table_name='message', if_exists=True)
+    if inspector.has_table('simulation'):
+        op.drop_index(op.f('ix_simulation_case_id'), table_name='simulation', if_exists=True)
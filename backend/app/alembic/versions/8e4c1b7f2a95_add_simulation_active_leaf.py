@@ -0,0 +1,46 @@
+"""Add simulation active leaf
+
+Revision ID: 8e4c1b7f2a95
+Revises: 7d2a9e4b6c13
+Create Date: 2026-10-17 16:41:05.872316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4c1b7f2a95'
+down_revision = '7d2a9e4b6c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The simulation table is created by init_db on fresh databases
+    if not sa.inspect(op.get_bind()).has_table('simulation'):
+        return
+    op.add_column('simulation', sa.Column('active_leaf_id', sa.Integer(), nullable=True))
+    op.add_column('simulation', sa.Column('active_leaf_depth', sa.Integer(), nullable=True))
+
+    # Backfill with the deepest selected message of every simulation
+    op.execute("""
+        UPDATE simulation SET
+            active_leaf_id = (
+                SELECT m.id FROM message m
+                WHERE m.simulation_id = simulation.id AND m.selected
+                ORDER BY m.depth DESC, m.id DESC LIMIT 1
+            ),
+            active_leaf_depth = (
+                SELECT m.depth FROM message m
+                WHERE m.simulation_id = simulation.id AND m.selected
+                ORDER BY m.depth DESC, m.id DESC LIMIT 1
+            )
+    """)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('simulation'):
+        return
+    op.drop_column('simulation', 'active_leaf_depth')
+    op.drop_column('simulation', 'active_leaf_id')
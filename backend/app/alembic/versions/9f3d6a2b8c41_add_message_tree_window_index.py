@@ -0,0 +1,29 @@
+"""Add message tree window index
+
+Revision ID: 9f3d6a2b8c41
+Revises: 8e4c1b7f2a95
+Create Date: 2026-10-17 18:02:37.640519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f3d6a2b8c41'
+down_revision = '8e4c1b7f2a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The message table is created with this index by init_db on fresh databases
+    if not sa.inspect(op.get_bind()).has_table('message'):
+        return
+    op.create_index('ix_message_simulation_id_depth_path_key', 'message', ['simulation_id', 'depth', sa.text('substr(path, 1, 1024)')], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('message'):
+        return
+    op.drop_index('ix_message_simulation_id_depth_path_key', table_name='message', if_exists=True)
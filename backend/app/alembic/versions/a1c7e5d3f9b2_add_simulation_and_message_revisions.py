@@ -0,0 +1,37 @@
+"""Add simulation and message revisions
+
+Revision ID: a1c7e5d3f9b2
+Revises: 9f3d6a2b8c41
+Create Date: 2026-10-17 19:20:54.093782
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c7e5d3f9b2'
+down_revision = '9f3d6a2b8c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables are created by init_db on fresh databases, as is messagetombstone
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('simulation'):
+        op.add_column('simulation', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column('simulation', sa.Column('changes_floor', sa.Integer(), nullable=False, server_default='0'))
+    if inspector.has_table('message'):
+        op.add_column('message', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+        op.create_index('ix_message_simulation_id_revision', 'message', ['simulation_id', 'revision'], unique=False)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('message'):
+        op.drop_index('ix_message_simulation_id_revision', table_name='message')
+        op.drop_column('message', 'revision')
+    if inspector.has_table('simulation'):
+        op.drop_column('simulation', 'changes_floor')
+        op.drop_column('simulation', 'revision')
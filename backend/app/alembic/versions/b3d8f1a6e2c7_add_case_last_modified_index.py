@@ -0,0 +1,29 @@
+"""Add case last_modified index
+
+Revision ID: b3d8f1a6e2c7
+Revises: a1c7e5d3f9b2
+Create Date: 2026-10-17 21:14:52.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8f1a6e2c7'
+down_revision = 'a1c7e5d3f9b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The case table is created with this index by init_db on fresh databases
+    if not sa.inspect(op.get_bind()).has_table('case'):
+        return
+    op.create_index('ix_case_last_modified_id', 'case', ['last_modified', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('case'):
+        return
+    op.drop_index('ix_case_last_modified_id', table_name='case', if_exists=True)
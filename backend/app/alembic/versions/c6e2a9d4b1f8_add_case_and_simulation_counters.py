@@ -0,0 +1,46 @@
+"""Add case and simulation counters
+
+Revision ID: c6e2a9d4b1f8
+Revises: b3d8f1a6e2c7
+Create Date: 2026-10-17 22:03:11.572094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a9d4b1f8'
+down_revision = 'b3d8f1a6e2c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables are created with these columns by init_db on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('case'):
+        op.add_column('case', sa.Column('simulation_count', sa.Integer(), nullable=False, server_default='0'))
+        if inspector.has_table('simulation'):
+            op.execute(
+                'UPDATE "case" SET simulation_count = '
+                '(SELECT count(*) FROM simulation WHERE simulation.case_id = "case".id)'
+            )
+    if inspector.has_table('simulation'):
+        op.add_column('simulation', sa.Column('node_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column('simulation', sa.Column('max_depth', sa.Integer(), nullable=False, server_default='0'))
+        if inspector.has_table('message'):
+            op.execute(
+                'UPDATE simulation SET '
+                'node_count = (SELECT count(*) FROM message WHERE message.simulation_id = simulation.id), '
+                'max_depth = (SELECT coalesce(max(depth), 0) FROM message WHERE message.simulation_id = simulation.id)'
+            )
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('simulation'):
+        op.drop_column('simulation', 'max_depth')
+        op.drop_column('simulation', 'node_count')
+    if inspector.has_table('case'):
+        op.drop_column('case', 'simulation_count')
@@ -2,9 +2,10 @@ from collections.abc import Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
+from openai import AsyncOpenAI
 from pydantic import ValidationError
 from sqlmodel import Session
 
@@ -27,6 +28,28 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
+def get_boson_client(request: Request) -> AsyncOpenAI:
+    """Return the app-lifetime Boson client created in the lifespan."""
+    client: AsyncOpenAI | None = getattr(request.app.state, "boson_client", None)
+    if client is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Boson API key not configured. Please set BOSON_API_KEY environment variable.",
+        )
+    return client
+
+
+BosonClientDep = Annotated[AsyncOpenAI, Depends(get_boson_client)]
+
+
+def get_optional_boson_client(request: Request) -> AsyncOpenAI | None:
+    """Like get_boson_client, for optional background work: None when not configured."""
+    return getattr(request.app.state, "boson_client", None)
+
+
+OptionalBosonClientDep = Annotated[AsyncOpenAI | None, Depends(get_optional_boson_client)]
+
+
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
     try:
         payload = jwt.decode(
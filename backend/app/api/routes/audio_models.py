@@ -6,8 +6,10 @@ import base64
 import io
 import wave
 import os
-from openai import OpenAI
-from app.core.config import settings
+from openai import AsyncOpenAI
+from app.api.deps import BosonClientDep
+from app.core.boson import chat_completion
+from app.core.llm_cache import cached_completion
 from app.core.db import engine
 from app.crud import get_case_context, get_messages_by_tree, get_selected_messages_between
 from app.schemas import AudioResponse, ContextResponse, messages_to_conversation
@@ -16,17 +18,6 @@ from fastapi import APIRouter, Depends
 
 router = APIRouter()
 
-# Boson AI client configuration
-def get_boson_client():
-    """Get Boson AI client with proper error handling"""
-    if not settings.BOSON_API_KEY:
-        raise HTTPException(
-            status_code=500, 
-            detail="Boson API key not configured. Please set BOSON_API_KEY environment variable."
-        )
-    return OpenAI(api_key=settings.BOSON_API_KEY, base_url="https://hackathon.boson.ai/v1")
-
-
 def get_session():
     with Session(engine) as session:
         yield session
@@ -36,6 +27,11 @@ def b64(path):
     return base64.b64encode(open(path, "rb").read()).decode("utf-8")
 
 
+def strip_think(content: str) -> str:
+    """Return the answer from a response of form <think>\n\n</think>\n\n`ANSWER`."""
+    return content.split("\n")[4]
+
+
 @router.get("/context/{case_id}/{tree_id}", response_model=ContextResponse)
 async def get_context_history(case_id: int, tree_id: int, session: Session = Depends(get_session),) -> ContextResponse:
     """
@@ -54,7 +50,7 @@ async def get_context_history(case_id: int, tree_id: int, session: Session = Dep
 
 
 @router.post("/transcribe-audio")
-async def transcribe_audio(audio_file: UploadFile = File(...)):
+async def transcribe_audio(client: BosonClientDep, audio_file: UploadFile = File(...)):
     """
     Upload .wav audio file containing user's voice question.
     Returns the transcribed text from the audio.
@@ -70,8 +66,8 @@ async def transcribe_audio(audio_file: UploadFile = File(...)):
         audio_b64 = base64.b64encode(audio_content).decode("utf-8")
         
         # Use Boson AI for audio understanding
-        client = get_boson_client()
-        response = client.chat.completions.create(
+        response = await chat_completion(
+            client,
             model="higgs-audio-understanding-Hackathon",
             messages=[
                 {"role": "system", "content": "Transcribe this audio for me."},
@@ -98,71 +94,81 @@ async def transcribe_audio(audio_file: UploadFile = File(...)):
             message=transcribed_text
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
     
+async def summarize_dialogue_helper(client: AsyncOpenAI, data: str, desired_length: int) -> str:
+    """
+    Helper function to summarize dialogue using AI.
+    Returns a shortened summary about desired_length words long, as if a lawyer said it.
+    """
+    return await cached_completion(
+        client,
+        model="Qwen3-32B-thinking-Hackathon",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            #{"role": "user", "content": "Imagine you are a lawyer in a negotiation. Say only 8 words to summarize the following. Do not say anything else or think:\n" + data}
+            {"role": "user", "content": "Imagine you are a lawyer in a negotiation. Say only " + str(desired_length) + " words to summarize the following. Do not say anything else or think: " + data}
+        ],
+        parse=strip_think,
+        max_tokens=128,
+        temperature=0.7
+    ) # response is of form <think>\n\n</think>\n\n`ANSWER`
+
+
 @router.post("/summarize-dialogue")
-async def summarize_dialogue(data: str, desired_length: int):
+async def summarize_dialogue(data: str, desired_length: int, client: BosonClientDep):
     """
     Takes in a string describing what you want summarized, the desired length to summarize it to.
     Returns a shortened summary about desired_length words long, as if a lawyer said it.
     """
     try:
-
-        client = get_boson_client()
-        response = client.chat.completions.create(
-            model="Qwen3-32B-thinking-Hackathon",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                #{"role": "user", "content": "Imagine you are a lawyer in a negotiation. Say only 8 words to summarize the following. Do not say anything else or think:\n" + data}
-                {"role": "user", "content": "Imagine you are a lawyer in a negotiation. Say only " + str(desired_length) + " words to summarize the following. Do not say anything else or think: " + data}
-            ],
-            max_tokens=128,
-            temperature=0.7
-        ) # response is of form <think>\n\n</think>\n\n`ANSWER`
-
-
-        return {"message": response.choices[0].message.content.split("\n")[4]}
+        return {"message": await summarize_dialogue_helper(client, data, desired_length)}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error summarizing in get-headline: {str(e)}")
 
-async def summarize_background_helper(data: str, desired_lines: int) -> str:
+async def summarize_background_helper(client: AsyncOpenAI, data: str, desired_lines: int) -> str:
     """
     Helper function to summarize text using AI.
     Takes in a string describing what you want summarized, the desired lines to summarize it to.
     Returns a shortened summary about desired_lines number of lines long.
     """
     try:
-        client = get_boson_client()
-        response = client.chat.completions.create(
+        return await cached_completion(
+            client,
             model="Qwen3-32B-thinking-Hackathon",
             messages=[
                 {"role": "system", "content": "You are a helpful assistant."},
                 {"role": "user", "content": "Say a maximum of " + str(desired_lines) + " lines to summarize the following. Do not say anything else or think: " + data}
                 # {"role": "user", "content": "Say a maximum of " + str(desired_lines) + " lines to summarize the following. If you do not need to say much, don't say much. Do not say anything else or think: " + data}
             ],
+            parse=strip_think,
             max_tokens=4096,
             temperature=0.7
         )
-
-        return response.choices[0].message.content.split("\n")[4]
+    except HTTPException:
+        raise
     except Exception as e:
         raise Exception(f"Error summarizing: {str(e)}")
 
 
 @router.post("/summarize-background")
-async def summarize_background(data: str, desired_lines: int):
+async def summarize_background(data: str, desired_lines: int, client: BosonClientDep):
     """
     API endpoint to summarize text.
     Takes in a string describing what you want summarized, the desired lines to summarize it to.
     Returns a shortened summary about desired_lines number of lines long.
     """
-    result = await summarize_background_helper(data, desired_lines)
+    result = await summarize_background_helper(client, data, desired_lines)
     return {"message": result}
 
 @router.get("/get-conversation-audio/{tree_id}")
-async def get_conversation_audio(tree_id: int, end_message_id: int, session: Session = Depends(get_session)):
+async def get_conversation_audio(tree_id: int, end_message_id: int, client: BosonClientDep, session: Session = Depends(get_session)):
     """
     Takes a tree_id, for which it gets conversation history messages from the database in order.
     Returns the generated audio file as wav.
@@ -209,8 +215,8 @@ async def get_conversation_audio(tree_id: int, end_message_id: int, session: Ses
             "If no speaker tag is present, select a suitable voice on your own.\n\n"
             "<|scene_desc_start|>\nAudio is recorded from a quiet room.\n<|scene_desc_end|>"
         )
-        client = get_boson_client()
-        resp = client.chat.completions.create(
+        resp = await chat_completion(
+            client,
             model="higgs-audio-generation-Hackathon",
             messages=[
                 {"role": "system", "content": system},
@@ -245,5 +251,7 @@ async def get_conversation_audio(tree_id: int, end_message_id: int, session: Ses
         open(str(end_message_id) + ".wav", "wb").write(base64.b64decode(audio_b64))
         return FileResponse(str(end_message_id) + ".wav", media_type="audio/wav")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing conversation: {str(e)}")
\ No newline at end of file
@@ -4,22 +4,12 @@ import base64
 import io
 import wave
 import os
-from openai import OpenAI
-from app.core.config import settings
+from app.api.deps import BosonClientDep
+from app.core.boson import chat_completion, speech
 from app.schemas import AudioResponse, ContextResponse, ModelRequest
 
 router = APIRouter()
 
-# Boson AI client configuration
-def get_boson_client():
-    """Get Boson AI client with proper error handling"""
-    if not settings.BOSON_API_KEY:
-        raise HTTPException(
-            status_code=500, 
-            detail="Boson API key not configured. Please set BOSON_API_KEY environment variable."
-        )
-    return OpenAI(api_key=settings.BOSON_API_KEY, base_url="https://hackathon.boson.ai/v1")
-
 # Available models
 AVAILABLE_MODELS = [
     "higgs-audio-generation-Hackathon",
@@ -51,7 +41,7 @@ async def get_dummy_context_history():
     return ContextResponse(context=CONTEXT_HISTORY)
 
 @router.post("/upload-audio")
-async def upload_audio(audio_file: UploadFile = File(...)):
+async def upload_audio(client: BosonClientDep, audio_file: UploadFile = File(...)):
     """
     Upload audio file containing user's voice question.
     Returns the transcribed text from the audio.
@@ -67,8 +57,8 @@ async def upload_audio(audio_file: UploadFile = File(...)):
         audio_b64 = base64.b64encode(audio_content).decode("utf-8")
         
         # Use Boson AI for audio understanding
-        client = get_boson_client()
-        response = client.chat.completions.create(
+        response = await chat_completion(
+            client,
             model="higgs-audio-understanding-Hackathon",
             messages=[
                 {
@@ -93,11 +83,13 @@ async def upload_audio(audio_file: UploadFile = File(...)):
             "filename": audio_file.filename
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
 
 @router.post("/process-with-model", response_model=AudioResponse)
-async def process_with_model(request: ModelRequest):
+async def process_with_model(request: ModelRequest, client: BosonClientDep):
     """
     Process a question using one of the available AI models.
     Can optionally include context history.
@@ -122,8 +114,8 @@ async def process_with_model(request: ModelRequest):
         ]
         
         # Make API call to Boson AI
-        client = get_boson_client()
-        response = client.chat.completions.create(
+        response = await chat_completion(
+            client,
             model=request.model,
             messages=messages,
             modalities=["text", "audio"] if "audio-generation" in request.model else ["text"],
@@ -147,6 +139,8 @@ async def process_with_model(request: ModelRequest):
             audio_data=audio_data
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing with model: {str(e)}")
 
@@ -169,6 +163,7 @@ async def get_available_models():
 
 @router.post("/generate-audio-response")
 async def generate_audio_response(
+    client: BosonClientDep,
     text: str = Form(...),
     voice: str = Form(default="belinda")
 ):
@@ -176,8 +171,8 @@ async def generate_audio_response(
     Generate audio response from text using the audio generation model.
     """
     try:
-        client = get_boson_client()
-        response = client.audio.speech.create(
+        response = await speech(
+            client,
             model="higgs-audio-generation-Hackathon",
             voice=voice,
             input=text,
@@ -207,5 +202,7 @@ async def generate_audio_response(
             headers={"Content-Disposition": "attachment; filename=response.wav"}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating audio: {str(e)}")
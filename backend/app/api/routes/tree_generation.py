@@ -1,18 +1,29 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
 from fastapi.responses import StreamingResponse
 import base64
+import json
 import io
 import wave
 import os
-from openai import OpenAI
+import logging
+from openai import AsyncOpenAI
+from app.core.boson import chat_completion
 from app.core.config import settings
 from app.core.db import engine
-from app.schemas import ScenariosTreeResponse
+from app.core.hedging import race_first_valid
+from app.core.llm_cache import llm_cache
+from app.core.tree_stream import StreamedNode, TreeNodeStreamParser
+from app.core.upstream import UpstreamUnavailableError
+from app.core.tree_repair import extract_json, iter_nodes, missing_branches, node_at, nodes_to_tree, parse_tree
+from app.crud import insert_message_tree, note_selected_message, refresh_active_leaf
+from app.schemas import TreeNode, TreeWriteStats
 from app.models import Simulation, Message
 from sqlmodel import Session, select
-from typing import Dict, Any
+from collections.abc import AsyncIterator
+from typing import Any
 import asyncio
-import concurrent.futures
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -21,172 +32,308 @@ def get_session():
     with Session(engine) as session:
         yield session
 
-# Boson AI client configuration
-def get_boson_client():
-    """Get Boson AI client with proper error handling"""
-    if not settings.BOSON_API_KEY:
-        raise HTTPException(
-            status_code=500, 
-            detail="Boson API key not configured. Please set BOSON_API_KEY environment variable."
-        )
-    return OpenAI(api_key=settings.BOSON_API_KEY, base_url="https://hackathon.boson.ai/v1")
+TREE_MODEL = "Qwen3-32B-thinking-Hackathon"
+TREE_DEPTH = 3
+TREE_BRANCHING = 3
+TREE_PARAMS: dict[str, Any] = {
+    "temperature": 0.7,
+    "max_tokens": 4000,
+    "response_format": {"type": "json_object"},
+}
+
 
-def _create_tree_single(case_background: str, previous_statements: str, simulation_goal: str, last_message: str = None, client: OpenAI = None, system_message: str = None) -> Dict[str, Any]:
+def _tree_messages(system_message: str) -> list[dict[str, Any]]:
+    """Create the conversation with the AI model"""
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": "Generate the legal negotiation dialogue tree now."}
+    ]
+
+
+async def _create_tree_single(client: AsyncOpenAI, system_message: str) -> str:
     """
-    Helper function to create a tree with a single API call.
-    Returns the parsed result or None if parsing fails.
+    Helper function to request a tree with a single API call.
+    Returns the raw response content.
     """
-    if client is None:
-        client = get_boson_client()
-    
-    # Create the conversation with the AI model
-    messages = [
+    # Make API call to Qwen3-32B-thinking-Hackathon model
+    response = await chat_completion(
+        client,
+        model=TREE_MODEL,
+        messages=_tree_messages(system_message),
+        **TREE_PARAMS
+    )
+
+    # Extract the response content
+    return response.choices[0].message.content
+
+
+def _nodes_per_level(branching: int, levels: int) -> int:
+    """Number of nodes in `levels` full levels below a single node."""
+    return sum(branching ** i for i in range(1, levels + 1))
+
+
+def base_depth(depth: int, branching: int) -> int:
+    """Levels generated by the first, monolithic call; deeper ones are expanded per branch."""
+    levels = 1
+    while levels < depth and 1 + _nodes_per_level(branching, levels) <= settings.TREE_MAX_NODES_PER_CALL:
+        levels += 1
+    return max(levels, min(depth, 2))
+
+
+def _levels_per_call(branching: int) -> int:
+    levels = 1
+    while _nodes_per_level(branching, levels + 1) <= settings.TREE_MAX_NODES_PER_CALL:
+        levels += 1
+    return levels
+
+
+def _branch_messages(system_message: str, root: dict[str, Any], path: tuple[int, ...], count: int, depth: int, branching: int) -> list[dict[str, Any]]:
+    """Prompt for `count` more responses under the node at `path`, at most a few levels deep."""
+    branch = [root] + [node_at(root, path[:i + 1]) for i in range(len(path))]
+    parent = branch[-1]
+    level = parent["level"] + 1
+    last_level = min(depth, level + _levels_per_call(branching) - 1)
+    speaker = "B" if parent["speaker"] == "A" else "A"
+    dialogue = "\n".join(f"Level {n['level']} {n['speaker']}: {n['line']}" for n in branch)
+    existing = "\n".join(f"- {n['line']}" for n in parent.get("responses", []))
+    request = (
+        "This is the branch of the dialogue tree being extended:\n"
+        f"{dialogue}\n\n"
+        f"Generate exactly {count} more Level {level} responses from \"{speaker}\" to the last line"
+    )
+    if existing:
+        request += f", different from these existing ones:\n{existing}\n"
+    else:
+        request += ".\n"
+    if level < last_level:
+        request += f"Each of them must contain exactly {branching} nested responses per level, down to Level {last_level}.\n"
+    request += f"Level {last_level} nodes must have an empty [] responses array.\n"
+    request += 'Output a single JSON object of the form {"responses": [TreeNode, ...]} and nothing else.'
+    return [
         {"role": "system", "content": system_message},
-        {"role": "user", "content": "Generate the legal negotiation dialogue tree now."}
+        {"role": "user", "content": request},
     ]
-    
-    try:
-        # Make API call to Qwen3-32B-thinking-Hackathon model
-        response = client.chat.completions.create(
-            model="Qwen3-32B-thinking-Hackathon",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=4000,
-            response_format={"type": "json_object"}
+
+
+async def _generate_branches(client: AsyncOpenAI, system_message: str, root: dict[str, Any], path: tuple[int, ...], count: int, depth: int, branching: int) -> list[dict[str, Any]]:
+    """Generate the missing responses of one node; malformed ones are dropped."""
+    response = await chat_completion(
+        client,
+        model=TREE_MODEL,
+        messages=_branch_messages(system_message, root, path, count, depth, branching),
+        **TREE_PARAMS
+    )
+    data = json.loads(extract_json(response.choices[0].message.content))
+    level = node_at(root, path)["level"] + 1
+    branches = []
+    for candidate in data.get("responses", [])[:count]:
+        try:
+            node = TreeNode(**candidate).model_dump()
+        except Exception as e:
+            logger.warning(f"Dropping malformed generated branch: {e}")
+            continue
+        if node["level"] == level:
+            branches.append(node)
+    return branches
+
+
+async def expand_tree(client: AsyncOpenAI, system_message: str, root: dict[str, Any], depth: int = TREE_DEPTH, branching: int = TREE_BRANCHING) -> AsyncIterator[StreamedNode]:
+    """
+    Generate every branch missing from the tree down to `depth`, attaching them in place.
+    Each wave makes one parallel call per incomplete node: this regenerates branches
+    lost from a truncated response and expands leaves above `depth` a few levels at a
+    time, so no call produces more than TREE_MAX_NODES_PER_CALL nodes.
+    Yields the added nodes, parent first, as each wave completes.
+    """
+    while True:
+        gaps = missing_branches(root, depth, branching)
+        if not gaps:
+            return
+        logger.info(f"Generating {sum(count for _, count in gaps)} branches under {len(gaps)} nodes")
+        results = await asyncio.gather(
+            *(_generate_branches(client, system_message, root, path, count, depth, branching) for path, count in gaps),
+            return_exceptions=True,
         )
-        
-        # Extract the response content
-        tree_content = response.choices[0].message.content
-
-        # Try to parse as JSON
-        import json
-        tree_data = json.loads(tree_content)
-        # Validate the response structure
-        scenarios_response = ScenariosTreeResponse(**tree_data)
-        return scenarios_response.model_dump()
-    except Exception as e:
-        # Return None if parsing fails
-        print(f"Failed to parse response: {str(e)}")
-        return None
+        added: list[StreamedNode] = []
+        for (path, _), branches in zip(gaps, results, strict=True):
+            if isinstance(branches, BaseException):
+                logger.warning(f"Failed to generate branches under {path}: {branches!r}")
+                continue
+            responses = node_at(root, path)["responses"]
+            for node in branches:
+                added.extend(iter_nodes(node, path + (len(responses),)))
+                responses.append(node)
+        if not added:
+            # No progress: leave the tree incomplete rather than loop
+            return
+        for node in added:
+            yield node
 
-def create_tree(case_background: str, previous_statements: str, simulation_goal: str, last_message: str = None, refresh: bool = False) -> Dict[str, Any]:
+
+def build_tree_system_message(case_background: str, previous_statements: str, simulation_goal: str, last_message: str = None, depth: int = TREE_DEPTH, branching: int = TREE_BRANCHING) -> str:
     """
-    Create a tree of messages based on the case background and previous statements.
-    Makes 3 parallel API calls and keeps the first valid response.
-    Uses the Qwen3-32B-thinking-Hackathon model to generate a structured 3-level dialogue tree.
+    Build the system prompt asking for a structured dialogue tree `depth` levels deep
+    with `branching` responses per node.
     """
-    try:
-        # Get Boson AI client
-        client = get_boson_client()
-        
-        # Prepare the complete system message for legal simulation tree generation
-        if last_message:
-            # If continuing from a previous message, use that as Level 1
-            level1_instruction = f"Level 1: Use the provided last message as the Level 1 statement: \"{last_message}\"\n"
-            special_note = f"\nIMPORTANT: The Level 1 node must use exactly this text: \"{last_message}\"\n"
-            # Determine the speaker based on the last message pattern
-            # If last message was from one side, the next level should be from the other
-            if "A" in last_message or last_message.startswith("Your client"):
-                next_speaker = "B"
-                follow_up_speaker = "A"
-            else:
-                next_speaker = "A"
-                follow_up_speaker = "B"
-            level2_instruction = f"Level 2: Three possible responses from \"{next_speaker}\".\n"
-            level3_instruction = f"Level 3: For each Level 2 response, provide exactly three follow-up replies from \"{follow_up_speaker}\".\n"
+    # Prepare the complete system message for legal simulation tree generation
+    if last_message:
+        # If continuing from a previous message, use that as Level 1
+        level1_instruction = f"Level 1: Use the provided last message as the Level 1 statement: \"{last_message}\"\n"
+        special_note = f"\nIMPORTANT: The Level 1 node must use exactly this text: \"{last_message}\"\n"
+        # Determine the speaker based on the last message pattern
+        # If last message was from one side, the next level should be from the other
+        if "A" in last_message or last_message.startswith("Your client"):
+            next_speaker = "B"
+            follow_up_speaker = "A"
         else:
-            # New conversation - determine who should speak first based on context
-            level1_instruction = "Level 1: An opening statement. Based on the [CASE_BACKGROUND], determine who should initiate the negotiation:\n"
-            level1_instruction += "- If your client (Player) should initiate (e.g., making a demand, presenting evidence, proposing settlement): speaker = \"A\"\n"
-            level1_instruction += "- If the opposing side should initiate (e.g., they approach your client first, they have the burden, they sent an initial offer): speaker = \"B\"\n"
-            level1_instruction += "The decision should be realistic based on negotiation dynamics and who is most likely to reach out first given the context.\n"
-            special_note = ""
-            
-            # For new conversations, alternate based on who speaks first
-            # This will be determined dynamically by the model
-            level2_instruction = "Level 2: Three possible responses. If Level 1 speaker is \"A\", Level 2 should be responses from \"B\". If Level 1 is \"B\", Level 2 should be responses from \"A\".\n"
-            level3_instruction = "Level 3: For each Level 2 response, provide exactly three follow-up replies. The speaker should alternate: if Level 2 is from \"B\", Level 3 is from \"A\"; if Level 2 is from \"A\", Level 3 is from \"B\".\n"
-            
-        system_message = (
-            "You are an expert legal simulation generator. Your task is to create a realistic, branching dialogue tree for a legal negotiation scenario. You will be given a detailed case background and a specific simulation goal. Your output MUST be a single, valid JSON object and nothing else.\n\n"
-            "[TASK_DEFINITION]\n"
-            "Generate a dialogue tree exactly three (3) levels deep.\n"
-            f"{level1_instruction}"
-            f"{level2_instruction}"
-            f"{level3_instruction}"
-            "The dialogue must directly reflect the facts, disputed issues, and (most importantly) the personalities described in the [CASE_BACKGROUND]. The entire negotiation must be focused on achieving the [SIMULATION_GOAL].\n\n"
-            "[INPUT_CONTEXT]\n\n"
-            f"[CASE_BACKGROUND]\n{case_background}\n\n"
-            f"[PREVIOUS STATEMENTS]\n{previous_statements}\n\n"
-            f"[SIMULATION_GOAL] {simulation_goal}\n\n"
-            f"{special_note}"
-            "[OUTPUT_FORMAT_AND_CONSTRAINTS]\n"
-            "Output format MUST be a single, valid JSON object.\n"
-            "Do not include any text, explanations, or markdown formatting before or after the JSON object.\n"
-            "The root of the JSON object must be scenarios_tree.\n"
-            "Follow the schema precisely:\n"
-            "speaker: (string) \"A\" or \"B\".\n"
-            "line: (string) The text of the dialogue.\n"
-            "level: (number) The depth of the node (1, 2, or 3).\n"
-            "reflects_personality: (string) A brief justification of how this line reflects the facts or personality from the [CASE_BACKGROUND].\n"
-            "responses: (array) An array of nested node objects. Level 3 nodes must have an empty [] responses array.\n\n"
-            "[SCHEMA_DEFINITION]\n"
-            "The speaker at Level 1 can be either \"A\" or \"B\" based on the context.\n"
-            "Level 2 speaker must be the opposite of Level 1.\n"
-            "Level 3 speaker must be the opposite of Level 2.\n"
-            "Example where Player starts:\n"
-            "{\n"
-            '  "scenarios_tree": {\n'
-            '    "speaker": "A",\n'
-            '    "line": "...",\n'
-            '    "level": 1,\n'
-            '    "reflects_personality": "...",\n'
-            '    "responses": [\n'
-            '      {"speaker": "B", "line": "...", "level": 2, ...},\n'
-            '      {"speaker": "B", "line": "...", "level": 2, ...},\n'
-            '      {"speaker": "B", "line": "...", "level": 2, ...}\n'
-            '    ]\n'
-            '  }\n'
-            "}\n\n"
-            "Example where B starts:\n"
-            "{\n"
-            '  "scenarios_tree": {\n'
-            '    "speaker": "B",\n'
-            '    "line": "...",\n'
-            '    "level": 1,\n'
-            '    "reflects_personality": "...",\n'
-            '    "responses": [\n'
-            '      {"speaker": "A", "line": "...", "level": 2, ...},\n'
-            '      {"speaker": "A", "line": "...", "level": 2, ...},\n'
-            '      {"speaker": "A", "line": "...", "level": 2, ...}\n'
-            '    ]\n'
-            '  }\n'
-            "}\n"
-            "Each Level 2 response contains 3 Level 3 responses in its \"responses\" array."
+            next_speaker = "A"
+            follow_up_speaker = "B"
+        level2_instruction = f"Level 2: {branching} possible responses from \"{next_speaker}\".\n"
+        deeper_instructions = "".join(
+            f"Level {level}: For each Level {level - 1} response, provide exactly {branching} follow-up replies from \"{follow_up_speaker if level % 2 else next_speaker}\".\n"
+            for level in range(3, depth + 1)
         )
+    else:
+        # New conversation - determine who should speak first based on context
+        level1_instruction = "Level 1: An opening statement. Based on the [CASE_BACKGROUND], determine who should initiate the negotiation:\n"
+        level1_instruction += "- If your client (Player) should initiate (e.g., making a demand, presenting evidence, proposing settlement): speaker = \"A\"\n"
+        level1_instruction += "- If the opposing side should initiate (e.g., they approach your client first, they have the burden, they sent an initial offer): speaker = \"B\"\n"
+        level1_instruction += "The decision should be realistic based on negotiation dynamics and who is most likely to reach out first given the context.\n"
+        special_note = ""
         
-        # Make 3 parallel API calls using ThreadPoolExecutor
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [
-                executor.submit(_create_tree_single, case_background, previous_statements, simulation_goal, last_message, client, system_message)
-                for _ in range(3)
-            ]
-            
-            # Wait for the first valid result
-            results = []
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
+        # For new conversations, alternate based on who speaks first
+        # This will be determined dynamically by the model
+        level2_instruction = f"Level 2: {branching} possible responses. If Level 1 speaker is \"A\", Level 2 should be responses from \"B\". If Level 1 is \"B\", Level 2 should be responses from \"A\".\n"
+        deeper_instructions = "".join(
+            f"Level {level}: For each Level {level - 1} response, provide exactly {branching} follow-up replies. The speaker should alternate: if Level {level - 1} is from \"B\", Level {level} is from \"A\"; if Level {level - 1} is from \"A\", Level {level} is from \"B\".\n"
+            for level in range(3, depth + 1)
+        )
+        
+    system_message = (
+        "You are an expert legal simulation generator. Your task is to create a realistic, branching dialogue tree for a legal negotiation scenario. You will be given a detailed case background and a specific simulation goal. Your output MUST be a single, valid JSON object and nothing else.\n\n"
+        "[TASK_DEFINITION]\n"
+        f"Generate a dialogue tree exactly {depth} levels deep.\n"
+        f"{level1_instruction}"
+        f"{level2_instruction}"
+        f"{deeper_instructions}"
+        "The dialogue must directly reflect the facts, disputed issues, and (most importantly) the personalities described in the [CASE_BACKGROUND]. The entire negotiation must be focused on achieving the [SIMULATION_GOAL].\n\n"
+        "[INPUT_CONTEXT]\n\n"
+        f"[CASE_BACKGROUND]\n{case_background}\n\n"
+        f"[PREVIOUS STATEMENTS]\n{previous_statements}\n\n"
+        f"[SIMULATION_GOAL] {simulation_goal}\n\n"
+        f"{special_note}"
+        "[OUTPUT_FORMAT_AND_CONSTRAINTS]\n"
+        "Output format MUST be a single, valid JSON object.\n"
+        "Do not include any text, explanations, or markdown formatting before or after the JSON object.\n"
+        "The root of the JSON object must be scenarios_tree.\n"
+        "Follow the schema precisely:\n"
+        "speaker: (string) \"A\" or \"B\".\n"
+        "line: (string) The text of the dialogue.\n"
+        f"level: (number) The depth of the node (1 to {depth}).\n"
+        "reflects_personality: (string) A brief justification of how this line reflects the facts or personality from the [CASE_BACKGROUND].\n"
+        f"responses: (array) An array of nested node objects. Level {depth} nodes must have an empty [] responses array.\n\n"
+        "[SCHEMA_DEFINITION]\n"
+        "The speaker at Level 1 can be either \"A\" or \"B\" based on the context.\n"
+        "The speaker of each level must be the opposite of the level above it.\n"
+        "Example where Player starts:\n"
+        "{\n"
+        '  "scenarios_tree": {\n'
+        '    "speaker": "A",\n'
+        '    "line": "...",\n'
+        '    "level": 1,\n'
+        '    "reflects_personality": "...",\n'
+        '    "responses": [\n'
+        '      {"speaker": "B", "line": "...", "level": 2, ...},\n'
+        '      {"speaker": "B", "line": "...", "level": 2, ...},\n'
+        '      {"speaker": "B", "line": "...", "level": 2, ...}\n'
+        '    ]\n'
+        '  }\n'
+        "}\n\n"
+        "Example where B starts:\n"
+        "{\n"
+        '  "scenarios_tree": {\n'
+        '    "speaker": "B",\n'
+        '    "line": "...",\n'
+        '    "level": 1,\n'
+        '    "reflects_personality": "...",\n'
+        '    "responses": [\n'
+        '      {"speaker": "A", "line": "...", "level": 2, ...},\n'
+        '      {"speaker": "A", "line": "...", "level": 2, ...},\n'
+        '      {"speaker": "A", "line": "...", "level": 2, ...}\n'
+        '    ]\n'
+        '  }\n'
+        "}\n"
+        + "".join(
+            f"Each Level {level} response contains {branching} Level {level + 1} responses in its \"responses\" array.\n"
+            for level in range(2, depth)
+        )
+    )
+    return system_message
+
+
+def build_branch_system_message(case_background: str, previous_statements: str, simulation_goal: str) -> str:
+    """
+    Build the short system prompt used to generate single branches of a dialogue tree.
+    """
+    return (
+        "You are an expert legal simulation generator extending one branch of a realistic, branching dialogue tree for a legal negotiation scenario. "
+        "Speakers \"A\" and \"B\" alternate at every level.\n"
+        "The dialogue must directly reflect the facts, disputed issues, and personalities described in the [CASE_BACKGROUND] and be focused on achieving the [SIMULATION_GOAL].\n\n"
+        f"[CASE_BACKGROUND]\n{case_background}\n\n"
+        f"[PREVIOUS STATEMENTS]\n{previous_statements}\n\n"
+        f"[SIMULATION_GOAL] {simulation_goal}\n\n"
+        "Each TreeNode has: speaker (\"A\" or \"B\"), line (the text of the dialogue), level (number), "
+        "reflects_personality (a brief justification from the [CASE_BACKGROUND]) and responses (an array of nested TreeNodes).\n"
+        "Your output MUST be a single, valid JSON object and nothing else."
+    )
+
+async def create_tree(client: AsyncOpenAI, case_background: str, previous_statements: str, simulation_goal: str, last_message: str = None, refresh: bool = False, depth: int = TREE_DEPTH, branching: int = TREE_BRANCHING) -> dict[str, Any]:
+    """
+    Create a tree of messages based on the case background and previous statements.
+    The top levels come from one call; levels that would not fit in it are expanded
+    by parallel per-branch calls (see expand_tree).
+    Races up to TREE_GENERATION_ATTEMPTS hedged API calls and keeps the first valid
+    response, cancelling the others. Broken JSON is repaired and only the branches
+    that could not be salvaged are regenerated.
+    Identical prompts are served from the LLM cache unless refresh is set.
+    Uses the Qwen3-32B-thinking-Hackathon model to generate a structured dialogue tree.
+    """
+    try:
+        system_message = build_tree_system_message(case_background, previous_statements, simulation_goal, last_message, base_depth(depth, branching), branching)
+        branch_message = build_branch_system_message(case_background, previous_statements, simulation_goal)
+
+        cache_key = llm_cache.make_key(TREE_MODEL, _tree_messages(system_message), {**TREE_PARAMS, "depth": depth, "branching": branching})
+        if settings.LLM_CACHE_ENABLED and not refresh:
+            cached = await llm_cache.aget(cache_key)
+            if cached is not None:
+                result = parse_tree(cached)
                 if result is not None:
-                    # Cancel remaining futures
-                    for f in futures:
-                        f.cancel()
                     return result
-                results.append(result)
-        
-        # If all 3 attempts failed, return error response
+
+        # Race hedged API calls; losers are cancelled as soon as one validates
+        result = await race_first_valid(
+            lambda: _create_tree_single(client, system_message),
+            parse_tree,
+            attempts=settings.TREE_GENERATION_ATTEMPTS,
+            hedge_delay=settings.TREE_GENERATION_HEDGE_DELAY,
+            # Retries already happened in the governor; more attempts would only add load
+            fatal=(UpstreamUnavailableError,),
+        )
+        if result is not None:
+            # A truncated or partly malformed response keeps its complete nodes;
+            # the missing and deeper branches are generated per branch
+            async for _ in expand_tree(client, branch_message, result["scenarios_tree"], depth, branching):
+                pass
+            complete = not missing_branches(result["scenarios_tree"], depth, branching)
+            if settings.LLM_CACHE_ENABLED and complete:
+                await llm_cache.aset(cache_key, TREE_MODEL, json.dumps(result))
+            return result
+
+        # If all attempts failed, return error response
+        attempts = settings.TREE_GENERATION_ATTEMPTS
         return {
-            "error": "All 3 parallel attempts failed to generate valid response",
-            "raw_response": "Failed to parse JSON from all 3 API calls",
+            "error": f"All {attempts} attempts failed to generate valid response",
+            "raw_response": f"Failed to parse JSON from all {attempts} API calls",
             "scenarios_tree": {
                 "speaker": "A",
                 "line": "Error: Could not generate proper dialogue tree",
@@ -196,178 +343,127 @@ def create_tree(case_background: str, previous_statements: str, simulation_goal:
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating tree: {str(e)}")
 
-def save_tree_to_database(session: Session, case_id: int, tree_data: Dict[str, Any]) -> int:
+async def stream_tree(client: AsyncOpenAI, case_background: str, previous_statements: str, simulation_goal: str, last_message: str = None, depth: int = TREE_DEPTH, branching: int = TREE_BRANCHING) -> AsyncIterator[StreamedNode]:
     """
-    Save the generated tree structure to the database.
+    Stream a tree generation, yielding each TreeNode (parent first) as soon as the
+    model has produced its fields. Branches missing because the stream ended early,
+    and levels below the first call, are generated afterwards and yielded wave by wave.
+    """
+    system_message = build_tree_system_message(case_background, previous_statements, simulation_goal, last_message, base_depth(depth, branching), branching)
+    branch_message = build_branch_system_message(case_background, previous_statements, simulation_goal)
+    stream = await chat_completion(
+        client,
+        model=TREE_MODEL,
+        messages=_tree_messages(system_message),
+        stream=True,
+        **TREE_PARAMS
+    )
+    parser = TreeNodeStreamParser()
+    streamed: list[StreamedNode] = []
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                for node in parser.feed(delta):
+                    streamed.append(node)
+                    yield node
+            if parser.done:
+                break
+    finally:
+        await stream.close()
+
+    if not parser.done:
+        logger.warning("Streamed tree ended before the JSON object was complete")
+
+    tree = nodes_to_tree(streamed)
+    if tree is None:
+        return
+    async for node in expand_tree(client, branch_message, tree["scenarios_tree"], depth, branching):
+        yield node
+
+
+def save_message_node(session: Session, simulation_id: int, node: StreamedNode, parent_id: int | None, selected: bool = False) -> Message:
+    """
+    Save a single streamed TreeNode under parent_id and return the stored message.
+    """
+    message = Message(
+        content=node.line,
+        role=node.speaker,
+        simulation_id=simulation_id,
+        parent_id=parent_id,
+        selected=selected
+    )
+    session.add(message)
+    if selected:
+        session.flush()
+        note_selected_message(session, message)
+    session.commit()
+    session.refresh(message)
+    return message
+
+
+def save_tree_to_database(session: Session, case_id: int, tree_data: dict[str, Any]) -> int:
+    """
+    Save the generated tree structure to the database in a single transaction.
     Returns the tree_id of the created tree.
     """
     try:
-        # Create a new Tree record
+        # Create a new Tree record; flush to learn its id without committing
         tree = Simulation(case_id=case_id)
         session.add(tree)
-        session.commit()
-        session.refresh(tree)
-        
-        # Get the scenarios_tree from the response
+        session.flush()
+
+        # Save every level of the scenarios_tree, all selected
         scenarios_tree = tree_data.get("scenarios_tree", {})
-        
-        # Save Level 1 message (root)
-        level1_msg = Message(
-            content=scenarios_tree.get("line", ""),
-            role=scenarios_tree.get("speaker", "A"),
-            simulation_id=tree.id,
-            parent_id=None,  # Root message has parent_id None
-            selected=True
-        )
-        session.add(level1_msg)
-        session.commit()
-        session.refresh(level1_msg)
-        
-        # Save Level 2 messages (B responses)
-        level2_messages = []
-        level2_responses = scenarios_tree.get("responses", [])
-        
-        for i, level2_response in enumerate(level2_responses):
-            level2_msg = Message(
-                content=level2_response.get("line", ""),
-                role=level2_response.get("speaker", "B"),
-                simulation_id=tree.id,
-                parent_id=level1_msg.id,
-                selected=True
-            )
-            session.add(level2_msg)
-            session.commit()
-            session.refresh(level2_msg)
-            level2_messages.append(level2_msg)
-        
-        # Save Level 3 messages (player follow-ups)
-        for i, level2_response in enumerate(level2_responses):
-            if i < len(level2_messages):
-                level2_msg = level2_messages[i]
-                level3_responses = level2_response.get("responses", [])
-                
-                for level3_response in level3_responses:
-                    level3_msg = Message(
-                        content=level3_response.get("line", ""),
-                        role=level3_response.get("speaker", "A"),
-                        simulation_id=tree.id,
-                        parent_id=level2_msg.id,
-                        selected=True
-                    )
-                    session.add(level3_msg)
-        
+        insert_message_tree(session, tree.id, scenarios_tree, root_selected=True, selected=True)
+        refresh_active_leaf(session, tree.id)
+
         session.commit()
         return tree.id
-        
+
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Error saving tree to database: {str(e)}")
 
-def save_messages_to_tree(session: Session, case_id: int, tree_data: Dict[str, Any], existing_tree_id: int = None, last_message_id: int = None) -> bool:
+def save_messages_to_tree(session: Session, case_id: int, tree_data: dict[str, Any], existing_tree_id: int = None, last_message_id: int = None) -> TreeWriteStats:
     """
-    Save messages from tree generation to database.
+    Save messages from tree generation to database in a single transaction.
     If no last_message_id, creates a new tree with level1 as root.
     If existing_tree_id provided, appends new messages to the existing tree as children of last_message_id.
-    Returns True if successful, False otherwise.
+    Returns the number of rows written and the time taken.
     """
     try:
         # Get the scenarios_tree from the response
         scenarios_tree = tree_data.get("scenarios_tree", {})
-        
+
         if last_message_id is None:
-            # No last_message_id - create new tree with level1 as root
-            # Save Level 1 message as root (parent_id=None)
-            level1_msg = Message(
-                content=scenarios_tree.get("line", ""),
-                role=scenarios_tree.get("speaker", "A"),
-                simulation_id=existing_tree_id,
-                parent_id=None,  # Root message
-                selected=True
-            )
-            session.add(level1_msg)
-            session.commit()
-            session.refresh(level1_msg)
-            
-            # Save Level 2 messages (B responses)
-            level2_messages = []
-            level2_responses = scenarios_tree.get("responses", [])
-            
-            for level2_response in level2_responses:
-                level2_msg = Message(
-                    content=level2_response.get("line", ""),
-                    role=level2_response.get("speaker", "B"),
-                    simulation_id=existing_tree_id,
-                    parent_id=level1_msg.id,
-                    selected=False  # Not selected by default
-                )
-                session.add(level2_msg)
-                session.commit()
-                session.refresh(level2_msg)
-                level2_messages.append(level2_msg)
-            
-            # Save Level 3 messages (player follow-ups)
-            for i, level2_response in enumerate(level2_responses):
-                if i < len(level2_messages):
-                    level2_msg = level2_messages[i]
-                    level3_responses = level2_response.get("responses", [])
-                    
-                    for level3_response in level3_responses:
-                        level3_msg = Message(
-                            content=level3_response.get("line", ""),
-                            role=level3_response.get("speaker", "A"),
-                            simulation_id=existing_tree_id,
-                            parent_id=level2_msg.id,
-                            selected=False  # Not selected by default
-                        )
-                        session.add(level3_msg)
-            
+            # No last_message_id - create new tree with level1 as root (selected)
+            stats = insert_message_tree(session, existing_tree_id, scenarios_tree, root_selected=True)
+            refresh_active_leaf(session, existing_tree_id)
         else:
             # Existing history - append new messages as children of last_message_id
             last_message = session.get(Message, last_message_id)
             if not last_message:
                 raise HTTPException(status_code=404, detail=f"Message with id {last_message_id} not found")
 
-            level1_msg = last_message
-            
-            # Save Level 2 messages (B responses)
-            level2_messages = []
-            level2_responses = scenarios_tree.get("responses", [])
-            
-            for level2_response in level2_responses:
-                level2_msg = Message(
-                    content=level2_response.get("line", ""),
-                    role=level2_response.get("speaker", "B"),
-                    simulation_id=existing_tree_id,
-                    parent_id=level1_msg.id,
-                    selected=False  # Not selected by default
-                )
-                session.add(level2_msg)
-                session.commit()
-                session.refresh(level2_msg)
-                level2_messages.append(level2_msg)
-            
-            # Save Level 3 messages (player follow-ups)
-            for i, level2_response in enumerate(level2_responses):
-                if i < len(level2_messages):
-                    level2_msg = level2_messages[i]
-                    level3_responses = level2_response.get("responses", [])
-                    
-                    for level3_response in level3_responses:
-                        level3_msg = Message(
-                            content=level3_response.get("line", ""),
-                            role=level3_response.get("speaker", "A"),
-                            simulation_id=existing_tree_id,
-                            parent_id=level2_msg.id,
-                            selected=False  # Not selected by default
-                        )
-                        session.add(level3_msg)
-        
+            # Level 1 is the last message itself; only its responses are new
+            stats = insert_message_tree(
+                session, existing_tree_id, scenarios_tree, parent_id=last_message.id, include_root=False
+            )
+
         session.commit()
-        return True
-        
+        return stats
+
+    except HTTPException:
+        session.rollback()
+        raise
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Error saving messages to tree: {str(e)}")
\ No newline at end of file
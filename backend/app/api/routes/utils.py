@@ -1,5 +1,10 @@
+from typing import Any
+
 from fastapi import APIRouter
 
+from app.core.llm_cache import llm_cache
+from app.core.upstream import governor
+
 router = APIRouter()
 
 
@@ -10,3 +15,20 @@ def health_check() -> dict[str, str]:
     Returns a simple OK status to indicate the service is running.
     """
     return {"status": "ok"}
+
+
+@router.get("/llm-cache/stats")
+def llm_cache_stats() -> dict[str, int]:
+    """
+    Hit/miss counters of this worker's LLM response cache.
+    """
+    return llm_cache.stats()
+
+
+@router.get("/upstream/stats")
+def upstream_stats() -> dict[str, Any]:
+    """
+    Retry counters, circuit breaker states and free concurrency slots of this
+    worker's Boson AI calls.
+    """
+    return governor.stats()
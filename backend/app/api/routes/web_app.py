@@ -1,21 +1,40 @@
+import asyncio
 import json
-from datetime import datetime
-
-from fastapi import APIRouter, Depends, HTTPException, Query
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
+from sqlalchemy import update
 from sqlmodel import Session, select, func
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
-from app.api.routes.audio_models import get_session, summarize_background_helper, summarize_dialogue
-from app.crud import get_messages_by_tree, get_selected_messages_between, \
-    get_tree, delete_messages_after_children, get_message_children, \
-    update_message_selected, get_case_context, delete_messages_including_children, \
+from app.api.deps import BosonClientDep, OptionalBosonClientDep
+from app.api.routes.audio_models import get_session, summarize_background_helper, summarize_dialogue_helper
+from app.crud import get_messages_by_tree, get_message_path, get_selected_messages_between, \
+    get_tree_rows, get_tree_window, list_cases, count_children, get_tree_changes, delete_messages_after_children, get_message_children, \
+    update_message_selected, delete_messages_including_children, \
     create_simulation, create_bookmark, get_bookmarks_by_simulation, delete_bookmark, \
-    format_case_background_for_llm
-from app.models import Message, Case, Simulation
-from app.schemas import TreeResponse, SimulationCreate, SimulationResponse, CaseWithTreeCount, \
-    BookmarkCreate, BookmarkResponse
-from app.api.routes.tree_generation import create_tree, save_messages_to_tree
+    reserve_staged_tree, mark_staged_tree_ready, \
+    take_staged_tree, discard_staged_trees, evict_staged_trees, note_selected_message
+from app.models import Message, Case, ChangeCounter, Simulation, StagedTree, bump_change_counter
+from app.schemas import TreeResponse, SimulationCreate, SimulationResponse, CaseWithTreeCount, CaseListItem, \
+    BookmarkCreate, BookmarkResponse, CaseSummaryResponse, ActiveLeafResponse, \
+    LazyTreeNode, LazyTreeResponse, TreeNodeChange, TreeChangesResponse
+from app.api.routes.tree_generation import create_tree, save_messages_to_tree, \
+    stream_tree, save_message_node, TREE_DEPTH, TREE_BRANCHING
+from app.core.case_context import case_contexts
+from app.core.config import settings
+from app.core.db import engine
+from app.core.debounce import Debouncer
+from app.core.history import compact_history
+from app.core.single_flight import single_flight
+from app.core.tree_json import iter_tree_json
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -25,36 +44,28 @@ class ContinueConversationRequest(BaseModel):
     message_id: Optional[int] = None
     tree_id: Optional[int] = None
     refresh: bool = False
+    # Shape of the generated tree: levels including the message continued from,
+    # and responses per message
+    depth: int = Field(default=TREE_DEPTH, ge=2, le=settings.TREE_MAX_DEPTH)
+    branching: int = Field(default=TREE_BRANCHING, ge=1, le=settings.TREE_MAX_BRANCHING)
+
+    @model_validator(mode="after")
+    def _check_tree_size(self) -> "ContinueConversationRequest":
+        nodes = sum(self.branching ** level for level in range(self.depth))
+        if nodes > settings.TREE_MAX_NODES:
+            raise ValueError(f"A tree of depth {self.depth} and branching {self.branching} has {nodes} messages, more than {settings.TREE_MAX_NODES}")
+        return self
 
 
 def get_last_message_id_from_tree(session: Session, tree_id: int) -> int:
     """
     Get the ID of the last selected message in a tree.
-    Returns the ID of the deepest selected message in the tree.
+    Returns the ID of the deepest selected message in the tree (its active leaf).
     """
-    # Get all selected messages in the tree
-    statement = select(Message).where(
-        (Message.simulation_id == tree_id) & (Message.selected == True)
-    )
-    messages = session.exec(statement).all()
-
-    if not messages:
+    simulation = session.get(Simulation, tree_id)
+    if not simulation or simulation.active_leaf_id is None:
         raise HTTPException(status_code=404, detail=f"No selected messages found in tree {tree_id}")
-
-    # Find the deepest selected message (the one with no selected children)
-    for msg in messages:
-        # Check if this message has any selected children
-        has_selected_children = session.exec(
-            select(Message).where(
-                (Message.parent_id == msg.id) & (Message.selected == True)
-            )
-        ).first() is not None
-
-        if not has_selected_children:
-            return msg.id
-
-    # Fallback: return the message with the highest ID
-    return max(msg.id for msg in messages)
+    return simulation.active_leaf_id
 
 def is_leaf_node(session: Session, message_id: int) -> bool:
     """
@@ -75,8 +86,50 @@ def get_message_children_for_tree(session: Session, message_id: int) -> list[Mes
     return children
 
 
+async def _prepare_generation(session: Session, client: AsyncOpenAI, request: ContinueConversationRequest) -> tuple[str, str, str, str]:
+    """
+    Collect the prompt inputs for a tree generation: case background, conversation
+    history, last message and simulation goal. Deletes the old subtree on refresh.
+    Older turns of the history are compacted into a cached running summary.
+    """
+    # Get the case background for the LLM, formatted once per context version
+    case_context = case_contexts.get(session, request.case_id)
+    if case_context is None:
+        raise HTTPException(status_code=404, detail=f"Case with id {request.case_id} not found")
+    case_background = case_context.background
+
+    # Tree_id provided - continue existing conversation
+    # Check if the last selected message is a leaf node
+    if request.refresh:
+        # Delete the original subtree
+        delete_messages_including_children(session, request.message_id)
+
+    # Leaf node - generate new messages and save them
+    path = get_message_path(session, request.message_id) if request.message_id is not None else []
+    messages_history = await compact_history(client, session, path)
+    last_message = session.get(Message, request.message_id)
+    last_message_content = last_message.content if last_message else ""
+
+    simulation = session.get(Simulation, request.tree_id)
+    simulation_goal = simulation.brief if simulation else "Reach a favorable settlement"
+
+    return case_background, messages_history, last_message_content, simulation_goal
+
+
+async def _generate_tree(client: AsyncOpenAI, request: ContinueConversationRequest) -> Dict[str, Any]:
+    """Generate the tree continuing from request.message_id without saving it."""
+    with Session(engine) as session:
+        case_background, messages_history, last_message_content, simulation_goal = await _prepare_generation(session, client, request)
+    # Generate a tree of messages based on the case background and simulation goal
+    return await create_tree(client, case_background, messages_history, simulation_goal, last_message_content, request.refresh, request.depth, request.branching)
+
+
+def _speculation_key(message_id: int, depth: int, branching: int) -> str:
+    return f"speculate:{message_id}:{depth}x{branching}"
+
+
 @router.post("/continue-conversation")
-async def continue_conversation(request: ContinueConversationRequest, session: Session = Depends(get_session)):
+async def continue_conversation(request: ContinueConversationRequest, client: BosonClientDep):
     """
     Continue a conversation by either generating new messages or returning existing children.
     If tree_id is provided:
@@ -88,40 +141,40 @@ async def continue_conversation(request: ContinueConversationRequest, session: S
     tree_id = request.tree_id
     message_id = request.message_id
     refresh = request.refresh
+
+    async def generate() -> Dict[str, Any]:
+        # Runs once per coalesced group, so it must not depend on one caller's session
+        with Session(engine) as generation_session:
+            if refresh or message_id is None:
+                if message_id is not None:
+                    discard_staged_trees(generation_session, message_id)
+                tree_data = await _generate_tree(client, request)
+            else:
+                staged = take_staged_tree(generation_session, message_id, request.depth, request.branching)
+                if staged is not None:
+                    tree_data = json.loads(staged)
+                else:
+                    # Joins a speculative generation still running for this message
+                    tree_data = await single_flight.do(
+                        _speculation_key(message_id, request.depth, request.branching),
+                        lambda: _generate_tree(client, request),
+                    )
+                    discard_staged_trees(generation_session, message_id)
+
+            # Save the messages to the database
+            save_messages_to_tree(
+                generation_session,
+                case_id,
+                tree_data,
+                existing_tree_id=tree_id,
+                last_message_id=message_id
+            )
+            return tree_data
+
     try:
-        # Get the case context
-        case_context_json = get_case_context(session, case_id)
-        if not case_context_json:
-            raise HTTPException(status_code=404, detail=f"Case with id {case_id} not found")
-
-        # Format the case background for the LLM
-        case_background = format_case_background_for_llm(case_context_json)
-
-        # Tree_id provided - continue existing conversation
-        # Check if the last selected message is a leaf node
-        if refresh:
-            # Delete the original subtree
-            delete_messages_including_children(session, message_id)
-
-        # Leaf node - generate new messages and save them
-        messages_history = get_messages_by_tree(session, tree_id, message_id) or ""
-        last_message = session.get(Message, message_id)
-        last_message_content = last_message.content if last_message else ""
-
-        simulation = session.get(Simulation, tree_id)
-        simulation_goal = simulation.brief if simulation else "Reach a favorable settlement"
-
-
-        # Generate a tree of messages based on the case background and simulation goal
-        tree_data = create_tree(case_background, messages_history, simulation_goal, last_message_content, refresh)
-
-        # Save the messages to the database
-        save_messages_to_tree(
-            session,
-            case_id,
-            tree_data,
-            existing_tree_id=tree_id,
-            last_message_id=message_id
+        # Duplicate requests (double-clicks, client retries) share one generation
+        tree_data = await single_flight.do(
+            f"continue-conversation:{tree_id}:{message_id}:{refresh}:{request.depth}x{request.branching}", generate
         )
 
         # Return the generated tree data
@@ -129,48 +182,238 @@ async def continue_conversation(request: ContinueConversationRequest, session: S
             **tree_data
         }
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error continuing conversation: {str(e)}")
+
+
+def _etag(*parts: Any) -> str:
+    """Weak ETag naming one version of a resource."""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    """
+    Tag the response with etag and return a 304 if the client's If-None-Match
+    already names it (weak comparison), so the caller can skip the real work.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _simulation_revision(session: Session, simulation_id: int) -> int | None:
+    return session.exec(select(Simulation.revision).where(Simulation.id == simulation_id)).first()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/continue-conversation/stream")
+async def continue_conversation_stream(request: ContinueConversationRequest, client: BosonClientDep, session: Session = Depends(get_session)):
+    """
+    Streaming variant of /continue-conversation using Server-Sent Events.
+    Each TreeNode is sent as a `node` event (parent first) as soon as the model has
+    produced it, and saved to the tree as it arrives. A final `done` event carries
+    the number of nodes, or an `error` event is sent if generation fails.
+    """
+    tree_id = request.tree_id
+    message_id = request.message_id
+    try:
+        case_background, messages_history, last_message_content, simulation_goal = await _prepare_generation(session, client, request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error continuing conversation: {str(e)}")
 
+    async def events():
+        # The request session is closed once the response starts, so use our own
+        with Session(engine) as stream_session:
+            message_ids: dict[tuple[int, ...], int] = {}
+            node_count = 0
+            try:
+                async for node in stream_tree(client, case_background, messages_history, simulation_goal, last_message_content, request.depth, request.branching):
+                    if not node.path and message_id is not None:
+                        # Level 1 is the message we are continuing from
+                        message_ids[node.path] = message_id
+                        parent_id = None
+                    else:
+                        parent_id = message_ids.get(node.parent_path) if node.path else None
+                        if node.path and parent_id is None:
+                            continue  # parent was dropped as malformed
+                        saved = save_message_node(stream_session, tree_id, node, parent_id, selected=not node.path)
+                        message_ids[node.path] = saved.id
+                    node_count += 1
+                    yield _sse("node", {
+                        "id": message_ids[node.path],
+                        "parent_id": parent_id,
+                        "path": list(node.path),
+                        "speaker": node.speaker,
+                        "line": node.line,
+                        "level": node.level,
+                        "reflects_personality": node.reflects_personality,
+                    })
+                yield _sse("done", {"tree_id": tree_id, "node_count": node_count})
+            except Exception as e:
+                stream_session.rollback()
+                yield _sse("error", {"detail": f"Error continuing conversation: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.get("/trees/{simulation_id}/messages", response_model=List[dict])
 def get_tree_messages_endpoint(
     simulation_id: int,
+    request: Request,
+    response: Response,
     session: Session = Depends(get_session),
 ):
     """
     Return all messages for a specific simulation_id (both selected and unselected)
-    in a hierarchical chronological structure.
+    in a hierarchical chronological structure, streamed as it is serialized.
     """
+    etag = _etag("tree", simulation_id, _simulation_revision(session, simulation_id))
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
 
-    # Reuse your existing function
-    messages = get_tree(session, simulation_id)
+    rows = get_tree_rows(session, simulation_id)
 
-    if not messages:
+    if not rows:
         raise HTTPException(status_code=404, detail="No messages found for this simulation_id")
 
-    # Build mapping for hierarchy
-    by_parent: dict[Optional[int], list[Message]] = {}
-    for m in messages:
-        by_parent.setdefault(m.parent_id, []).append(m)
+    return StreamingResponse(iter_tree_json(rows), media_type="application/json", headers=response.headers)
+
+
+def _lazy_tree(simulation_id: int, root: Message | None, max_depth: int, session: Session) -> LazyTreeResponse:
+    """Nest a tree window, flagging the nodes whose children were not loaded."""
+    messages = get_tree_window(session, simulation_id, root, max_depth)
+    counts = count_children(session, [m.id for m in messages])
+    last_depth = (root.depth if root else 0) + max_depth
+
+    nodes: dict[int, LazyTreeNode] = {}
+    top: list[LazyTreeNode] = []
+    for m in messages:  # parents first
+        child_count = counts.get(m.id, 0)
+        node = LazyTreeNode(
+            id=m.id,
+            parent_id=m.parent_id,
+            role=m.role,
+            content=m.content,
+            selected=m.selected,
+            depth=m.depth,
+            child_count=child_count,
+            has_more=child_count > 0 and m.depth >= last_depth,
+        )
+        nodes[m.id] = node
+        parent = nodes.get(m.parent_id)
+        if parent is not None:
+            parent.children.append(node)
+        else:
+            top.append(node)
+
+    return LazyTreeResponse(
+        simulation_id=simulation_id,
+        root_id=root.id if root else None,
+        max_depth=max_depth,
+        nodes=top,
+    )
+
 
-    for children in by_parent.values():
-        children.sort(key=lambda m: m.id)
+@router.get("/trees/{simulation_id}/nodes", response_model=LazyTreeResponse)
+def get_tree_nodes(
+    simulation_id: int,
+    request: Request,
+    response: Response,
+    root_id: int | None = Query(None, description="Load below this message instead of the simulation's roots"),
+    max_depth: int = Query(2, ge=0, le=settings.LAZY_TREE_MAX_DEPTH, description="Levels to load below the root"),
+    session: Session = Depends(get_session),
+):
+    """
+    Load part of a simulation tree: the root (or the simulation's roots) and
+    max_depth levels below it. Every node carries its child_count, and has_more
+    is set where children exist but were not loaded.
+    """
+    etag = _etag("nodes", simulation_id, root_id, max_depth, _simulation_revision(session, simulation_id))
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
 
-    def build_tree(parent_id: Optional[int]) -> List[dict]:
-        """Recursive builder for JSON hierarchy."""
-        result = []
-        for msg in by_parent.get(parent_id, []):
-            result.append({
-                "id": msg.id,
-                "role": msg.role,
-                "content": msg.content,
-                "children": build_tree(msg.id),
-            })
-        return result
+    root = None
+    if root_id is not None:
+        root = session.get(Message, root_id)
+        if not root or root.simulation_id != simulation_id:
+            raise HTTPException(status_code=404, detail=f"Message with id {root_id} not found in simulation {simulation_id}")
+    return _lazy_tree(simulation_id, root, max_depth, session)
 
-    tree_json = build_tree(None)
-    return tree_json
+
+@router.get("/messages/{message_id}/expand", response_model=LazyTreeResponse)
+def expand_message(
+    message_id: int,
+    request: Request,
+    response: Response,
+    max_depth: int = Query(1, ge=1, le=settings.LAZY_TREE_MAX_DEPTH, description="Levels to load below the message"),
+    session: Session = Depends(get_session),
+):
+    """Load the levels below a node returned with has_more set."""
+    message = session.get(Message, message_id)
+    if not message:
+        raise HTTPException(status_code=404, detail=f"Message with id {message_id} not found")
+
+    etag = _etag("expand", message_id, max_depth, _simulation_revision(session, message.simulation_id))
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
+    return _lazy_tree(message.simulation_id, message, max_depth, session)
+
+
+@router.get("/trees/{simulation_id}/changes", response_model=TreeChangesResponse)
+def get_tree_changes_endpoint(
+    simulation_id: int,
+    since: int = Query(..., ge=0, description="Revision the client already has"),
+    session: Session = Depends(get_session),
+):
+    """
+    Return the messages added, updated and deleted since a revision of the simulation.
+    When since predates the retained deletions, reset is set and nothing else is sent.
+    """
+    simulation = session.get(Simulation, simulation_id)
+    if not simulation:
+        raise HTTPException(status_code=404, detail=f"Simulation with id {simulation_id} not found")
+
+    if since < simulation.changes_floor or since > simulation.revision:
+        return TreeChangesResponse(
+            simulation_id=simulation_id, revision=simulation.revision, reset=True, upserted=[], deleted=[]
+        )
+
+    upserted, deleted = get_tree_changes(session, simulation_id, since)
+    return TreeChangesResponse(
+        simulation_id=simulation_id,
+        revision=simulation.revision,
+        reset=False,
+        upserted=[
+            TreeNodeChange(
+                id=m.id,
+                parent_id=m.parent_id,
+                role=m.role,
+                content=m.content,
+                selected=m.selected,
+                depth=m.depth,
+                revision=m.revision,
+            )
+            for m in upserted
+        ],
+        deleted=deleted,
+    )
 
 
 @router.get("/messages/selected-path", response_model=List[dict])
@@ -211,7 +454,7 @@ def trim_messages_after_children(
     session: Session = Depends(get_session),
 ):
     """
-    Delete all messages after the children of the given message.
+    Delete everything below the children of the given message.
     Keeps the given message and its direct children.
     """
     try:
@@ -220,7 +463,7 @@ def trim_messages_after_children(
         raise HTTPException(status_code=404, detail=str(e))
 
     return {
-        "message": f"Deleted {deleted_count} messages after message {message_id} and its children."
+        "message": f"Deleted {deleted_count} messages below message {message_id} and its children."
     }
 
 
@@ -231,10 +474,111 @@ def get_children(message_id: int, db: Session = Depends(get_session)):
     return children  # returns [] if none found
 
 
+speculation_debouncer = Debouncer()
+
+
+def _reserve_speculation(message_id: int) -> tuple[int, ContinueConversationRequest] | None:
+    """Reserve a staged tree for a leaf, returning its id and the request to generate it."""
+    with Session(engine) as session:
+        message = session.get(Message, message_id)
+        if message is None or not is_leaf_node(session, message_id):
+            return None
+        simulation = session.get(Simulation, message.simulation_id)
+        if simulation is None:
+            return None
+        staged = reserve_staged_tree(
+            session, simulation.id, message_id, TREE_DEPTH, TREE_BRANCHING,
+            settings.SPECULATION_BUDGET, settings.SPECULATION_TTL_SECONDS,
+        )
+        if staged is None:
+            return None
+        request = ContinueConversationRequest(case_id=simulation.case_id, tree_id=simulation.id, message_id=message_id)
+        return staged.id, request
+
+
+def _drop_staged_tree(staged_id: int) -> None:
+    with Session(engine) as session:
+        row = session.get(StagedTree, staged_id)
+        if row is not None:
+            session.delete(row)
+            session.commit()
+
+
+def _stage_tree(staged_id: int, message_id: int, tree_data: dict[str, Any]) -> None:
+    with Session(engine) as session:
+        if mark_staged_tree_ready(session, staged_id, json.dumps(tree_data)):
+            logger.info(f"Staged speculative tree for message {message_id}")
+
+
+async def speculate(client: AsyncOpenAI, message_id: int) -> None:
+    """
+    Generate the default-shaped tree continuing from a leaf in the background and
+    stage it for /continue-conversation. Runs under the per-simulation
+    SPECULATION_BUDGET; a failed or cancelled speculation leaves nothing staged.
+    The staging rows are written in the threadpool, off the event loop.
+    """
+    reserved = await run_in_threadpool(_reserve_speculation, message_id)
+    if reserved is None:
+        return
+    staged_id, request = reserved
+
+    try:
+        tree_data = await single_flight.do(
+            _speculation_key(message_id, TREE_DEPTH, TREE_BRANCHING),
+            lambda: _generate_tree(client, request),
+        )
+    except BaseException as e:
+        await run_in_threadpool(_drop_staged_tree, staged_id)
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        logger.warning(f"Speculative generation for message {message_id} failed: {e}")
+        return
+
+    await run_in_threadpool(_stage_tree, staged_id, message_id, tree_data)
+
+
+def speculation_candidates(db: Session, message: Message) -> list[int]:
+    """
+    Evict trees staged for branches the user left and return the leaves to
+    pre-generate: the selected one, plus its leaf siblings if
+    SPECULATION_INCLUDE_SIBLINGS is set.
+    """
+    candidates = [message.id]
+    if settings.SPECULATION_INCLUDE_SIBLINGS and message.parent_id is not None:
+        candidates += [
+            sibling.id for sibling in get_message_children(db, message.parent_id)
+            if sibling.id != message.id
+        ]
+    evict_staged_trees(db, message.simulation_id, candidates)
+    return [candidate for candidate in candidates[:settings.SPECULATION_BUDGET] if is_leaf_node(db, candidate)]
+
+
+async def schedule_speculation(client: AsyncOpenAI, candidates: list[int]) -> None:
+    """Start speculation for the candidates; runs on the event loop, as a background task."""
+    for candidate in candidates:
+        # Debounced so clicking through messages only speculates on where the user stops
+        speculation_debouncer.schedule(
+            candidate,
+            settings.SPECULATION_DELAY_SECONDS,
+            lambda candidate=candidate: speculate(client, candidate),
+        )
+
+
 @router.patch("/messages/{message_id}/select", response_model=Message)
-def select_message(message_id: int, db: Session = Depends(get_session)):
-    """Mark a message as selected=True."""
+def select_message(
+    message_id: int,
+    background_tasks: BackgroundTasks,
+    client: OptionalBosonClientDep,
+    db: Session = Depends(get_session),
+):
+    """
+    Mark a message as selected=True.
+    If it is a leaf, the tree continuing from it is generated in the background so
+    that /continue-conversation can return it without waiting for the model.
+    """
     message = update_message_selected(db, message_id)
+    if settings.SPECULATION_ENABLED and client is not None:
+        background_tasks.add_task(schedule_speculation, client, speculation_candidates(db, message))
     return message
 
 
@@ -259,6 +603,8 @@ def create_message(
     )
 
     db.add(new_message)
+    db.flush()
+    note_selected_message(db, new_message)
     db.commit()
     db.refresh(new_message)
 
@@ -276,6 +622,7 @@ class SummarizedMessageRequest(BaseModel):
 @router.post("/messages/create-summarized", response_model=Message)
 async def create_summarized_message(
     request: SummarizedMessageRequest,
+    client: BosonClientDep,
     db: Session = Depends(get_session),
 ):
     """
@@ -284,8 +631,7 @@ async def create_summarized_message(
     """
     try:
         # Summarize the user input
-        summary_result = await summarize_dialogue(request.user_input, request.desired_length)
-        summarized_content = summary_result.get("message", "") if summary_result.get("message") else request.user_input
+        summarized_content = await summarize_dialogue_helper(client, request.user_input, request.desired_length) or request.user_input
         
         # Create the message
         new_message = Message(
@@ -300,6 +646,8 @@ async def create_summarized_message(
         db.refresh(new_message)
 
         return new_message
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating summarized message: {str(e)}")
 
@@ -357,59 +705,73 @@ async def create_case(
         scenario_count=0
     )
 
-@router.get("/cases", response_model=List[CaseWithTreeCount])
-def get_all_cases(db: Session = Depends(get_session)):
-    """Return all cases with the number of trees for each case."""
-    cases = db.exec(select(Case)).all()
-
-    result = []
-    for case in cases:
-        tree_count = db.exec(
-            select(func.count(Simulation.id)).where(Simulation.case_id == case.id)
-        ).one()  # returns a tuple like (count,)
-        result.append(
-            CaseWithTreeCount(
-                id=case.id,
-                name=case.name,
-                party_a=case.party_a,
-                party_b=case.party_b,
-                context=case.context,
-                summary=case.summary,
-                last_modified=case.last_modified,
-                scenario_count=tree_count,  # extract integer
-            )
-        )
-    return result
+def _case_cursor(last_modified: datetime, case_id: int) -> str:
+    return f"{last_modified.isoformat()},{case_id}"
+
+
+def _parse_case_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        last_modified, case_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(last_modified), int(case_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor {cursor!r}")
+
+
+@router.get("/cases", response_model=List[CaseListItem], response_model_exclude_none=True)
+def get_all_cases(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.CASES_DEFAULT_PAGE_SIZE, ge=1, le=settings.CASES_MAX_PAGE_SIZE, description="Page size"),
+    before: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    include_details: bool = Query(False, description="Also return the context and summary of each case"),
+    db: Session = Depends(get_session),
+):
+    """
+    Return a page of cases with the number of trees for each case, most recently
+    modified first. Pages are keyset-paginated: when there may be more cases, the
+    X-Next-Cursor header holds the `before` value of the next page.
+    """
+    cursor = _parse_case_cursor(before) if before else None
+    # Bumped by every case write, summary update and simulation create/delete
+    version = db.exec(select(ChangeCounter.value).where(ChangeCounter.name == "cases")).first()
+    etag = _etag("cases", version, limit, before, include_details)
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
+
+    cases = list_cases(db, limit, cursor, include_details)
+    if len(cases) == limit:
+        response.headers["X-Next-Cursor"] = _case_cursor(cases[-1]["last_modified"], cases[-1]["id"])
+    return cases
 
 
 @router.get("/cases/{case_id}")
-def get_case_with_simulations(case_id: int, session: Session = Depends(get_session)):
+def get_case_with_simulations(case_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
     """
     Get one case by ID, including its background and all simulations.
     Returns data matching the CaseData interface for the frontend.
     """
-    # Fetch case
-    case = session.exec(select(Case).where(Case.id == case_id)).first()
-    if not case:
+    # Node counts change with the simulation revisions, which only ever grow
+    version = session.exec(
+        select(Case.last_modified, Case.summary_version, Case.summary_status,
+               Case.simulation_count, func.coalesce(func.sum(Simulation.revision), 0))
+        .outerjoin(Simulation, Simulation.case_id == Case.id)
+        .where(Case.id == case_id)
+        .group_by(Case.id)
+    ).first()
+    if version is None:
         raise HTTPException(status_code=404, detail=f"Case with id {case_id} not found.")
+    last_modified, summary_version, summary_status, simulation_count, revisions = version
+    etag = _etag("case", case_id, last_modified.isoformat(), summary_version, summary_status, simulation_count, revisions)
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
+
+    # Fetch case, except for the context which comes parsed from the cache
+    name, summary = session.exec(select(Case.name, Case.summary).where(Case.id == case_id)).one()
+    context = case_contexts.get(session, case_id, summary_version)
+    background_data = context.data if context else {}
 
     # Fetch simulations
-    simulations = session.exec(select(Simulation).where(Simulation.case_id == case.id)).all()
-
-    # Count messages per simulation (optional but fits nodeCount)
-    node_counts = {}
-    for sim in simulations:
-        count = session.exec(
-            select(func.count(Message.id)).where(Message.simulation_id == sim.id)
-        ).first()
-        node_counts[sim.id] = count or 0
-
-    # === Parse background (stored JSON in `context`) ===
-    # Your Case.context is a JSON string
-    try:
-        background_data = json.loads(case.context)
-    except Exception:
-        background_data = {}
+    simulations = session.exec(select(Simulation).where(Simulation.case_id == case_id)).all()
 
     background = {
         "party_a": background_data.get("parties", {}).get("party_A", {}).get("name"),
@@ -420,9 +782,11 @@ def get_case_with_simulations(case_id: int, session: Session = Depends(get_sessi
 
     # === Construct response ===
     return {
-        "id": str(case.id),
-        "name": case.name,
-        "summary": case.summary,
+        "id": str(case_id),
+        "name": name,
+        "summary": summary,
+        "summary_status": summary_status,
+        "summary_version": summary_version,
         "background": background,
         "simulations": [
             {
@@ -430,7 +794,8 @@ def get_case_with_simulations(case_id: int, session: Session = Depends(get_sessi
                 "headline": sim.headline,
                 "brief": sim.brief,
                 "created_at": sim.created_at.isoformat(),
-                "node_count": node_counts.get(sim.id, 0)
+                "node_count": sim.node_count,
+                "max_depth": sim.max_depth,
             }
             for sim in simulations
         ],
@@ -466,16 +831,62 @@ class CaseUpdate(BaseModel):
     general_notes: Optional[str] = None
 
 
+summary_debouncer = Debouncer()
+
+
+async def regenerate_case_summary(client: AsyncOpenAI, case_id: int, version: int) -> None:
+    """
+    Regenerate the summary of a case for the given summary_version.
+    The result is only written if no newer edit has bumped the version meanwhile.
+    """
+    with Session(engine) as session:
+        case = session.get(Case, case_id)
+        if not case or case.summary_version != version:
+            return  # superseded by a newer edit, possibly in another worker
+        context = case.context
+
+    try:
+        summary = await summarize_background_helper(client, context, desired_lines=30)
+        values = {"summary": summary, "summary_status": "ready"}
+    except Exception as e:
+        logger.warning(f"Error regenerating summary for case {case_id}: {e}")
+        values = {"summary_status": "failed"}
+
+    with Session(engine) as session:
+        written = session.execute(
+            update(Case)
+            .where(Case.id == case_id, Case.summary_version == version)
+            .values(**values)
+        )
+        if written.rowcount:
+            bump_change_counter(session.connection(), "cases")
+        session.commit()
+
+
+async def schedule_case_summary(client: AsyncOpenAI, case_id: int, version: int) -> None:
+    """
+    Debounce summary regeneration so a burst of edits costs one LLM call. Runs on
+    the event loop: awaited by async handlers, a background task of sync ones.
+    """
+    summary_debouncer.schedule(
+        case_id,
+        settings.CASE_SUMMARY_DEBOUNCE_SECONDS,
+        lambda: regenerate_case_summary(client, case_id, version),
+    )
+
+
 @router.patch("/cases/{case_id}")
 async def update_case(
     case_id: int,
     case_update: CaseUpdate,
+    client: BosonClientDep,
     session: Session = Depends(get_session)
 ):
     """
     Update a case's background information.
     Updates the context field which is stored as JSON.
-    Also regenerates the summary based on the updated context.
+    The summary is regenerated in the background; poll GET /cases/{case_id}/summary
+    until summary_status is "ready" for the returned summary_version.
     """
     # Fetch case
     case = session.exec(select(Case).where(Case.id == case_id)).first()
@@ -516,18 +927,18 @@ async def update_case(
     # Save updated context
     case.context = json.dumps(background_data)
     case.last_modified = datetime.now()
-    
-    # Regenerate summary based on updated context
-    try:
-        case.summary = await summarize_background_helper(case.context, desired_lines=30)
-    except Exception as e:
-        case.summary = ""
-    
+    case.summary_version += 1
+    case.summary_status = "pending"
+
     session.add(case)
     session.commit()
     session.refresh(case)
+    case_contexts.put(case.id, case.summary_version, case.context)
+
+    # Regenerate summary based on updated context, once edits settle
+    await schedule_case_summary(client, case.id, case.summary_version)
 
-    # Return the updated case data including the regenerated summary
+    # Return the updated case data; the summary is the previous one until ready
     return CaseWithTreeCount(
         id=case.id,
         name=case.name,
@@ -536,7 +947,40 @@ async def update_case(
         context=case.context,
         summary=case.summary,
         last_modified=case.last_modified,
-        scenario_count=0  # We could compute this if needed
+        scenario_count=case.simulation_count,
+        summary_status=case.summary_status,
+        summary_version=case.summary_version
+    )
+
+
+@router.get("/cases/{case_id}/summary", response_model=CaseSummaryResponse)
+def get_case_summary(
+    case_id: int,
+    background_tasks: BackgroundTasks,
+    client: OptionalBosonClientDep,
+    session: Session = Depends(get_session)
+):
+    """
+    Get the summary of a case and the status of its background regeneration.
+    A failed regeneration is retried when read, as is one lost to a worker
+    restart, if Boson is configured; the summary is then reported as pending.
+    """
+    case = session.get(Case, case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail=f"Case with id {case_id} not found.")
+
+    # A regeneration lost to a worker restart would stay pending forever
+    stale_before = datetime.now() - timedelta(seconds=settings.CASE_SUMMARY_STALE_SECONDS)
+    lost = case.summary_status == "pending" and case.last_modified < stale_before
+    summary_status = case.summary_status
+    if (summary_status == "failed" or lost) and client is not None and not summary_debouncer.pending(case.id):
+        background_tasks.add_task(schedule_case_summary, client, case.id, case.summary_version)
+        summary_status = "pending"
+
+    return CaseSummaryResponse(
+        summary=case.summary or "",
+        summary_status=summary_status,
+        summary_version=case.summary_version
     )
 
 
@@ -566,6 +1010,8 @@ def create_simulation_endpoint(
 @router.get("/simulations/{simulation_id}", response_model=SimulationResponse)
 def get_simulation_endpoint(
     simulation_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_session)
 ):
     """
@@ -575,6 +1021,10 @@ def get_simulation_endpoint(
     if not simulation:
         raise HTTPException(status_code=404, detail=f"Simulation with id {simulation_id} not found")
 
+    etag = _etag("simulation", simulation_id, simulation.revision)
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
+
     return SimulationResponse(
         id=simulation.id,
         headline=simulation.headline,
@@ -584,6 +1034,25 @@ def get_simulation_endpoint(
     )
 
 
+@router.get("/simulations/{simulation_id}/active-leaf", response_model=ActiveLeafResponse)
+def get_active_leaf(
+    simulation_id: int,
+    db: Session = Depends(get_session)
+):
+    """
+    Get the deepest selected message of a simulation, i.e. where the negotiation currently stands.
+    """
+    simulation = db.get(Simulation, simulation_id)
+    if not simulation:
+        raise HTTPException(status_code=404, detail=f"Simulation with id {simulation_id} not found")
+
+    return ActiveLeafResponse(
+        simulation_id=simulation.id,
+        message_id=simulation.active_leaf_id,
+        depth=simulation.active_leaf_depth,
+    )
+
+
 @router.delete("/simulations/{simulation_id}")
 def delete_simulation(
     simulation_id: int,
@@ -666,6 +1135,9 @@ def delete_bookmark_endpoint(
 
 
 @router.get("/trees/{simulation_id}/messages/traversal")
-def get_messages_by_tree_endpoint(simulation_id: int, message_id: int | None = None, db: Session = Depends(get_session)):
+def get_messages_by_tree_endpoint(simulation_id: int, request: Request, response: Response, message_id: int | None = None, db: Session = Depends(get_session)):
+    etag = _etag("traversal", simulation_id, message_id, _simulation_revision(db, simulation_id))
+    if (not_modified := _not_modified(request, response, etag)) is not None:
+        return not_modified
 
     return get_messages_by_tree(db, simulation_id, message_id, to_conversation=False)
@@ -0,0 +1,8 @@
+"""
+Micro-benchmarks for hot database paths.
+
+Each module runs against the configured database inside a transaction that is
+rolled back at the end, or against an in-memory SQLite database with --sqlite:
+
+    python -m app.benchmarks.message_path --sqlite
+"""
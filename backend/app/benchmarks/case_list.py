@@ -0,0 +1,85 @@
+"""
+The case list (GET /cases): one keyset page from crud.list_cases, at the start
+and deep into the list, against the previous implementation that loaded every
+case and counted the simulations of each with its own query.
+
+    python -m app.benchmarks.case_list [--sqlite] [--cases 100000] [--limit 100] [--compare]
+
+--compare also times the previous implementation, which takes one query per case.
+"""
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import insert
+from sqlmodel import Session, func, select
+
+from app.benchmarks.common import get_engine, parser, report, scratch_session, timed
+from app.crud import list_cases
+from app.models import Case, Simulation
+
+
+def seed_cases(session: Session, cases: int, simulations_per_case: int = 2) -> None:
+    """
+    Cases with a few KB of context each and simulations on every third one,
+    inserted in bulk with their simulation_count set; flushes only.
+    """
+    start = datetime(2025, 1, 1)
+    context = '{"background": "' + "x" * 4000 + '"}'
+    batch = 5000
+    for offset in range(0, cases, batch):
+        rows = [
+            {
+                "name": f"case {i}", "party_a": "A", "party_b": "B", "context": context, "summary": "summary " * 100,
+                "summary_status": "ready", "summary_version": 0, "last_modified": start + timedelta(seconds=i),
+                "simulation_count": simulations_per_case if i % 3 == 0 else 0,
+            }
+            for i in range(offset, min(cases, offset + batch))
+        ]
+        ids = session.scalars(insert(Case).returning(Case.id, sort_by_parameter_order=True), rows).all()
+        simulations = [
+            {"headline": "benchmark", "brief": "benchmark", "case_id": case_id, "created_at": start,
+             "revision": 0, "changes_floor": 0, "node_count": 0, "max_depth": 0}
+            for row, case_id in zip(rows, ids, strict=True)
+            for _ in range(row["simulation_count"])
+        ]
+        if simulations:
+            session.execute(insert(Simulation), simulations)
+    session.flush()
+
+
+def all_cases(session: Session) -> list[dict[str, Any]]:
+    """The previous implementation, kept for comparison."""
+    result = []
+    for case in session.exec(select(Case)).all():
+        tree_count = session.exec(select(func.count(Simulation.id)).where(Simulation.case_id == case.id)).one()
+        result.append({"id": case.id, "context": case.context, "summary": case.summary, "scenario_count": tree_count})
+    return result
+
+
+def main() -> None:
+    args_parser = parser("Benchmark the case list.")
+    args_parser.add_argument("--cases", type=int, default=100_000)
+    args_parser.add_argument("--limit", type=int, default=100)
+    args_parser.add_argument("--compare", action="store_true", help="also time the previous implementation")
+    args = args_parser.parse_args()
+
+    with scratch_session(get_engine(args.sqlite)) as session:
+        seed_cases(session, args.cases)
+        middle = list_cases(session, 1, (datetime(2025, 1, 1) + timedelta(seconds=args.cases // 2), 0))[0]
+        runs = {
+            "first page": lambda: list_cases(session, args.limit),
+            "middle page": lambda: list_cases(session, args.limit, (middle["last_modified"], middle["id"])),
+            "first page + details": lambda: list_cases(session, args.limit, include_details=True),
+        }
+        if args.compare:
+            runs["all cases (previous)"] = lambda: all_cases(session)
+
+        report(f"{args.cases} cases")
+        report(f"{'query':>22} {'median ms':>10} {'p95 ms':>10}")
+        for name, fn in runs.items():
+            result = timed(fn, args.repeat)
+            report(f"{name:>22} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models import Case, Simulation
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sqlite", action="store_true", help="use an in-memory SQLite database")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case")
+    return parser
+
+
+def report(line: str) -> None:
+    """Write a line of a benchmark's result table to stdout."""
+    sys.stdout.write(f"{line}\n")
+
+
+def get_engine(sqlite: bool) -> Engine:
+    if not sqlite:
+        from app.core.db import engine
+
+        return engine
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@contextmanager
+def scratch_session(engine: Engine) -> Iterator[Session]:
+    """A session whose writes are all rolled back on exit."""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            try:
+                yield session
+            finally:
+                session.close()
+                transaction.rollback()
+
+
+def scratch_simulation(session: Session) -> Simulation:
+    case = Case(name="benchmark", party_a="A", party_b="B", context="{}", summary="")
+    session.add(case)
+    session.flush()
+    simulation = Simulation(headline="benchmark", brief="benchmark", case_id=case.id)
+    session.add(simulation)
+    session.flush()
+    return simulation
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Median and p95 wall time of fn() in milliseconds, after one warm-up run."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
@@ -0,0 +1,71 @@
+"""
+Root-to-leaf path retrieval: the materialized ancestry path
+(crud.get_message_path) against a walk with one session.get() per ancestor.
+
+    python -m app.benchmarks.message_path [--sqlite] [--depths 10 100 1000]
+"""
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session, func, select
+
+from app.benchmarks.common import (
+    get_engine,
+    parser,
+    report,
+    scratch_session,
+    scratch_simulation,
+    timed,
+)
+from app.crud import get_message_path, insert_message_tree
+from app.models import Message
+
+
+def chain(depth: int) -> dict[str, Any]:
+    """A single branch `depth` messages deep, in TreeNode shape."""
+    node: dict[str, Any] = {"speaker": "A" if depth % 2 else "B", "line": f"statement {depth}", "responses": []}
+    for level in range(depth - 1, 0, -1):
+        node = {"speaker": "A" if level % 2 else "B", "line": f"statement {level}", "responses": [node]}
+    return node
+
+
+def walk_to_root(session: Session, message_id: int) -> list[Message]:
+    """The previous implementation, kept for comparison."""
+    ordered: list[Message] = []
+    current_id: int | None = message_id
+    while current_id is not None:
+        message = session.get(Message, current_id)
+        if not message:
+            break
+        ordered.insert(0, message)
+        current_id = message.parent_id
+    return ordered
+
+
+def main() -> None:
+    args_parser = parser("Benchmark root-to-leaf message path retrieval.")
+    args_parser.add_argument("--depths", type=int, nargs="+", default=[10, 100, 1000])
+    args = args_parser.parse_args()
+
+    with scratch_session(get_engine(args.sqlite)) as session:
+        simulation = scratch_simulation(session)
+        report(f"{'depth':>6} {'query':>10} {'median ms':>10} {'p95 ms':>10}")
+        for depth in args.depths:
+            insert_message_tree(session, simulation.id, chain(depth))
+            session.flush()
+            # Inserted level by level, so the leaf has the highest id
+            leaf_id = session.exec(select(func.max(Message.id)).where(Message.simulation_id == simulation.id)).one()
+            assert [m.id for m in get_message_path(session, leaf_id)] == [m.id for m in walk_to_root(session, leaf_id)]
+
+            for name, fn in (("path", get_message_path), ("walk", walk_to_root)):
+                def run(fn: Callable[[Session, int], list[Message]] = fn, leaf_id: int = leaf_id) -> None:
+                    # Empty the identity map so the walk cannot skip its round trips
+                    session.expunge_all()
+                    fn(session, leaf_id)
+
+                result = timed(run, args.repeat)
+                report(f"{depth:>6} {name:>10} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Query-plan regression harness for the simulation schema.
+
+Seeds synthetic cases, simulations, message trees and bookmarks, then runs
+EXPLAIN on the hot queries of crud.py and web_app.py and fails when any of them
+scans a table sequentially instead of using an index:
+
+    python -m app.benchmarks.query_plans [--sqlite] [--simulations 200] [--depth 6] [--branching 3]
+
+`seq_scans()` is also used by the tests on a small seed, with sequential scans
+disabled on Postgres so the check depends on the available indexes rather than
+on table sizes.
+"""
+import re
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import Executable, func, text
+from sqlmodel import Session, select
+
+from app.benchmarks.common import (
+    get_engine,
+    parser,
+    report,
+    scratch_session,
+    scratch_simulation,
+)
+from app.benchmarks.subtree_delete import full_tree
+from app.crud import (
+    ancestor_ids,
+    case_page,
+    insert_message_tree,
+    subtree_prefix,
+    subtree_range,
+)
+from app.models import Bookmark, Message, Simulation
+
+
+@dataclass
+class Sample:
+    """Ids the hot queries are run with."""
+
+    case_id: int
+    simulation_id: int
+    message: Message  # somewhere in the middle of a tree
+    leaf: Message
+
+
+HOT_QUERIES: dict[str, Callable[[Sample], Executable]] = {
+    "tree messages": lambda s: select(Message).where(Message.simulation_id == s.simulation_id),
+    "children": lambda s: select(Message).where(Message.parent_id == s.message.id),
+    "selected sibling": lambda s: select(Message).where(
+        Message.parent_id == s.message.parent_id,
+        Message.id != s.message.id,
+        Message.simulation_id == s.simulation_id,
+        Message.selected.is_(True),
+    ),
+    "last selected": lambda s: select(Message)
+    .where(Message.simulation_id == s.simulation_id, Message.selected.is_(True))
+    .order_by(Message.depth.desc(), Message.id.desc())
+    .limit(1),
+    "ancestors": lambda s: select(Message).where(Message.id.in_(ancestor_ids(s.leaf))),
+    "subtree": lambda s: select(Message).where(subtree_range(subtree_prefix(s.message))),
+    "tree window": lambda s: select(Message).where(
+        Message.simulation_id == s.simulation_id,
+        Message.depth.in_([s.message.depth + 1, s.message.depth + 2]),
+        subtree_range(subtree_prefix(s.message)),
+    ),
+    "child counts": lambda s: select(Message.parent_id, func.count(Message.id))
+    .where(Message.parent_id.in_([s.message.id, s.leaf.id]))
+    .group_by(Message.parent_id),
+    "case page": lambda s: case_page(50, (datetime(2100, 1, 1), s.case_id)),
+    "max depth": lambda s: select(func.max(Message.depth)).where(Message.simulation_id == s.simulation_id),
+    "simulations of case": lambda s: select(Simulation).where(Simulation.case_id == s.case_id),
+    "bookmark duplicate": lambda s: select(Bookmark).where(
+        Bookmark.simulation_id == s.simulation_id, Bookmark.message_id == s.message.id
+    ),
+    "bookmarks of simulation": lambda s: select(Bookmark).where(Bookmark.simulation_id == s.simulation_id),
+}
+
+
+def explain(session: Session, statement: Executable) -> list[str]:
+    """The plan of statement as text lines."""
+    dialect = session.get_bind().dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        return [row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [row[0] for row in session.execute(text(f"EXPLAIN {sql}"))]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Tables read sequentially according to a Postgres or SQLite plan."""
+    tables = []
+    for line in plan:
+        if match := re.search(r"Seq Scan on (\w+)", line):
+            tables.append(match[1])
+        elif (match := re.match(r"\s*SCAN (\w+)", line)) and "USING" not in line:
+            tables.append(match[1])
+    return tables
+
+
+def seq_scans(session: Session, sample: Sample, force_index: bool = False) -> dict[str, list[str]]:
+    """Hot queries that scan a table sequentially, with the tables they scan."""
+    if force_index and session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SET LOCAL enable_seqscan = off"))
+    failures = {}
+    for name, query in HOT_QUERIES.items():
+        tables = full_scans(explain(session, query(sample)))
+        if tables:
+            failures[name] = tables
+    return failures
+
+
+def seed(session: Session, simulations: int, depth: int, branching: int) -> Sample:
+    """Create the simulations, each with a full tree and a few bookmarks; flushes only."""
+    tree = full_tree(depth, branching)
+    sample = None
+    for i in range(simulations):
+        simulation = scratch_simulation(session)
+        insert_message_tree(session, simulation.id, tree)
+        messages = session.exec(
+            select(Message).where(Message.simulation_id == simulation.id).order_by(Message.depth, Message.id)
+        ).all()
+        for message in messages[:: max(1, len(messages) // 5)]:
+            session.add(Bookmark(simulation_id=simulation.id, message_id=message.id, name="benchmark"))
+        session.flush()
+        if i == simulations // 2:
+            sample = Sample(
+                case_id=simulation.case_id,
+                simulation_id=simulation.id,
+                message=messages[len(messages) // 3],
+                leaf=messages[-1],
+            )
+        session.expunge_all()
+    assert sample is not None
+    return sample
+
+
+def main() -> None:
+    args_parser = parser("Check that the hot queries use index scans.")
+    args_parser.add_argument("--simulations", type=int, default=200)
+    args_parser.add_argument("--depth", type=int, default=6)
+    args_parser.add_argument("--branching", type=int, default=3)
+    args = args_parser.parse_args()
+
+    with scratch_session(get_engine(args.sqlite)) as session:
+        sample = seed(session, args.simulations, args.depth, args.branching)
+        session.execute(text("ANALYZE"))
+        failures = seq_scans(session, sample)
+        for name, query in HOT_QUERIES.items():
+            status = f"SEQ SCAN on {', '.join(failures[name])}" if name in failures else "ok"
+            report(f"{name:>24}: {status}")
+            if name in failures:
+                for line in explain(session, query(sample)):
+                    report(f"{'':>26}{line}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
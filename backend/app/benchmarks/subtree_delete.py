@@ -0,0 +1,81 @@
+"""
+Subtree deletion: one range DELETE on the ancestry path
+(crud.delete_messages_including_children) against the former recursion with a
+SELECT and an ORM delete per message.
+
+    python -m app.benchmarks.subtree_delete [--sqlite] [--depth 8] [--branching 3]
+"""
+import time
+from typing import Any
+
+from sqlmodel import Session, func, select
+
+from app.benchmarks.common import (
+    get_engine,
+    parser,
+    report,
+    scratch_session,
+    scratch_simulation,
+)
+from app.crud import delete_descendants, insert_message_tree
+from app.models import Message
+
+
+def full_tree(depth: int, branching: int, level: int = 1) -> dict[str, Any]:
+    return {
+        "speaker": "A" if level % 2 else "B",
+        "line": f"statement at level {level}",
+        "responses": [full_tree(depth, branching, level + 1) for _ in range(branching)] if level < depth else [],
+    }
+
+
+def delete_recursively(session: Session, message_id: int) -> int:
+    """The previous implementation, kept for comparison."""
+    deleted = 0
+    for child in session.exec(select(Message).where(Message.parent_id == message_id)).all():
+        deleted += delete_recursively(session, child.id)
+        session.delete(child)
+        deleted += 1
+    session.flush()
+    return deleted
+
+
+def main() -> None:
+    args_parser = parser("Benchmark deleting a message subtree.")
+    args_parser.add_argument("--depth", type=int, default=8)
+    args_parser.add_argument("--branching", type=int, default=3)
+    args = args_parser.parse_args()
+    tree = full_tree(args.depth, args.branching)
+
+    with scratch_session(get_engine(args.sqlite)) as session:
+        simulation = scratch_simulation(session)
+        timings: dict[str, list[float]] = {"range": [], "recursive": []}
+        deleted = 0
+        for _ in range(args.repeat):
+            for name in timings:
+                insert_message_tree(session, simulation.id, tree)
+                session.flush()
+                # Start from an empty identity map, as a request would
+                session.expunge_all()
+                root = session.exec(
+                    select(Message).where(
+                        Message.simulation_id == simulation.id, Message.parent_id.is_(None)
+                    ).order_by(Message.id.desc())
+                ).first()
+
+                start = time.perf_counter()
+                if name == "range":
+                    deleted = delete_descendants(session, root, root.depth)
+                else:
+                    deleted = delete_recursively(session, root.id)
+                timings[name].append((time.perf_counter() - start) * 1000)
+                assert session.exec(select(func.count(Message.id)).where(Message.parent_id == root.id)).one() == 0
+
+        report(f"{'method':>10} {'messages':>9} {'median ms':>10} {'max ms':>10}")
+        for name, samples in timings.items():
+            samples.sort()
+            report(f"{name:>10} {deleted:>9} {samples[len(samples) // 2]:>10.2f} {samples[-1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
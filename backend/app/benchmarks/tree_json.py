@@ -0,0 +1,89 @@
+"""
+GET /trees/{id}/messages serialization: rows streamed through
+app.core.tree_json against the former get_tree + recursive build_tree +
+response_model encoding.
+
+    python -m app.benchmarks.tree_json [--sqlite] [--depth 9] [--branching 3]
+"""
+import json
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, select
+
+from app.benchmarks.common import (
+    get_engine,
+    parser,
+    report,
+    scratch_session,
+    scratch_simulation,
+    timed,
+)
+from app.benchmarks.subtree_delete import full_tree
+from app.core.tree_json import iter_tree_json
+from app.crud import get_tree_rows, insert_message_tree
+from app.models import Message
+
+
+def nested_recursively(session: Session, simulation_id: int) -> bytes:
+    """The previous implementation, kept for comparison."""
+    messages = list(session.exec(select(Message).where(Message.simulation_id == simulation_id)).all())
+    children_map: dict[int | None, list[Message]] = {}
+    for msg in messages:
+        children_map.setdefault(msg.parent_id, []).append(msg)
+    for child_list in children_map.values():
+        child_list.sort(key=lambda m: m.id)
+    ordered: list[Message] = []
+
+    def dfs(parent_id: int | None = None) -> None:
+        for msg in children_map.get(parent_id, []):
+            ordered.append(msg)
+            dfs(msg.id)
+
+    dfs(None)
+    ordered.sort(key=lambda m: m.id)
+
+    by_parent: dict[int | None, list[Message]] = {}
+    for m in ordered:
+        by_parent.setdefault(m.parent_id, []).append(m)
+    for children in by_parent.values():
+        children.sort(key=lambda m: m.id)
+
+    def build_tree(parent_id: int | None) -> list[dict[str, Any]]:
+        return [
+            {"id": msg.id, "role": msg.role, "content": msg.content, "children": build_tree(msg.id)}
+            for msg in by_parent.get(parent_id, [])
+        ]
+
+    return json.dumps(jsonable_encoder(build_tree(None))).encode()
+
+
+def streamed(session: Session, simulation_id: int) -> bytes:
+    return b"".join(iter_tree_json(get_tree_rows(session, simulation_id)))
+
+
+def main() -> None:
+    args_parser = parser("Benchmark serializing a whole simulation tree.")
+    args_parser.add_argument("--depth", type=int, default=9)
+    args_parser.add_argument("--branching", type=int, default=3)
+    args = args_parser.parse_args()
+
+    with scratch_session(get_engine(args.sqlite)) as session:
+        simulation = scratch_simulation(session)
+        stats = insert_message_tree(session, simulation.id, full_tree(args.depth, args.branching))
+        session.flush()
+        assert json.loads(streamed(session, simulation.id)) == json.loads(nested_recursively(session, simulation.id))
+
+        report(f"{'method':>10} {'messages':>9} {'median ms':>10} {'p95 ms':>10}")
+        for name, fn in (("streamed", streamed), ("recursive", nested_recursively)):
+            def run(fn: Callable[[Session, int], bytes] = fn) -> None:
+                session.expunge_all()
+                fn(session, simulation.id)
+
+            result = timed(run, args.repeat)
+            report(f"{name:>10} {stats.rows:>9} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
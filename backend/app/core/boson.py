@@ -0,0 +1,65 @@
+"""
+Shared Boson AI client.
+
+A single AsyncOpenAI client is created in the FastAPI lifespan (see app.main) and
+handed to routes through the BosonClientDep dependency, so every request of a
+worker reuses the same keep-alive connection pool instead of opening a new one.
+Calls go through the upstream governor (app.core.upstream), which owns retries,
+so the client's own retries are disabled.
+"""
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+from app.core.upstream import governor
+
+
+def model_timeout(model: str | None = None) -> httpx.Timeout:
+    """Return the request timeout configured for the given model."""
+    read_timeout = settings.BOSON_MODEL_TIMEOUTS.get(model or "", settings.BOSON_TIMEOUT)
+    return httpx.Timeout(read_timeout, connect=settings.BOSON_CONNECT_TIMEOUT)
+
+
+def create_boson_client() -> AsyncOpenAI:
+    """Create the pooled client. Called once per worker from the app lifespan."""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.BOSON_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.BOSON_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.BOSON_KEEPALIVE_EXPIRY,
+        ),
+        timeout=model_timeout(),
+    )
+    return AsyncOpenAI(
+        api_key=settings.BOSON_API_KEY,
+        base_url=settings.BOSON_BASE_URL,
+        http_client=http_client,
+        timeout=model_timeout(),
+        max_retries=0,
+    )
+
+
+async def chat_completion(client: AsyncOpenAI, *, model: str, **kwargs: Any) -> Any:
+    """
+    Await a chat completion using the timeout configured for `model`. With
+    stream=True the returned stream holds a concurrency slot until it is closed.
+    """
+    call = governor.call_stream if kwargs.get("stream") else governor.call
+    return await call(
+        model,
+        lambda: client.chat.completions.create(
+            model=model, timeout=model_timeout(model), **kwargs
+        ),
+    )
+
+
+async def speech(client: AsyncOpenAI, *, model: str, **kwargs: Any) -> Any:
+    """Await a text-to-speech request using the timeout configured for `model`."""
+    return await governor.call(
+        model,
+        lambda: client.audio.speech.create(
+            model=model, timeout=model_timeout(model), **kwargs
+        ),
+    )
@@ -0,0 +1,93 @@
+"""
+In-process cache of parsed case contexts.
+
+`Case.context` is a JSON string that every tree generation formats into the
+LLM background, and every case view parses again. Entries hold the parsed JSON
+and the formatted background of one case at one `summary_version`, which is
+bumped on every context edit. A lookup reads only that integer by primary key
+(or takes it from a row the caller already read), so an edit in any worker
+invalidates the entry in all of them without messaging between workers, and a
+hit skips both fetching the context text and parsing it.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.crud import format_case_background_for_llm
+from app.models import Case
+
+
+class CaseContext(NamedTuple):
+    version: int
+    data: dict[str, Any]  # shared between callers, do not modify
+    background: str  # format_case_background_for_llm(context)
+
+
+def parse_context(context_json: str | None) -> dict[str, Any]:
+    try:
+        data = json.loads(context_json or "")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class CaseContextCache:
+    def __init__(self, entries: int) -> None:
+        self.entries = entries
+        self._lru: OrderedDict[int, CaseContext] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session: Session, case_id: int, version: int | None = None) -> CaseContext | None:
+        """
+        The context of a case at its current version, or None if there is no such
+        case. Pass the summary_version when it was just read with the case row.
+        """
+        if version is None:
+            version = session.exec(select(Case.summary_version).where(Case.id == case_id)).first()
+            if version is None:
+                return None
+        with self._lock:
+            cached = self._lru.get(case_id)
+            if cached is not None and cached.version == version:
+                self._lru.move_to_end(case_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        row = session.exec(select(Case.context, Case.summary_version).where(Case.id == case_id)).first()
+        if row is None:
+            return None
+        context, version = row
+        if not context:
+            return None
+        return self.put(case_id, version, context)
+
+    def put(self, case_id: int, version: int, context_json: str) -> CaseContext:
+        """Remember the context of a case as written at version."""
+        entry = CaseContext(version, parse_context(context_json), format_case_background_for_llm(context_json))
+        with self._lock:
+            cached = self._lru.get(case_id)
+            # A slower reader must not replace a newer version
+            if cached is None or cached.version <= version:
+                self._lru[case_id] = entry
+                self._lru.move_to_end(case_id)
+                while len(self._lru) > self.entries:
+                    self._lru.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._lru), "hits": self.hits, "misses": self.misses}
+
+
+case_contexts = CaseContextCache(settings.CASE_CONTEXT_CACHE_ENTRIES)
@@ -104,6 +104,99 @@ class Settings(BaseSettings):
     
     # Boson AI Configuration
     BOSON_API_KEY: str = ""
+    # Point at the local stand-in (python -m app.mock_boson) for offline load tests
+    BOSON_BASE_URL: str = "https://hackathon.boson.ai/v1"
+    # Connection pool shared by every request of a worker (see app.core.boson)
+    BOSON_MAX_CONNECTIONS: int = 100
+    BOSON_MAX_KEEPALIVE_CONNECTIONS: int = 40
+    BOSON_KEEPALIVE_EXPIRY: float = 60.0
+    BOSON_CONNECT_TIMEOUT: float = 10.0
+    # Read timeout in seconds, overridable per model
+    BOSON_TIMEOUT: float = 60.0
+    BOSON_MODEL_TIMEOUTS: dict[str, float] = {
+        "Qwen3-32B-thinking-Hackathon": 180.0,
+        "higgs-audio-generation-Hackathon": 180.0,
+        "higgs-audio-understanding-Hackathon": 60.0,
+    }
+
+    # Upstream governor (see app.core.upstream), limits are per worker.
+    # Concurrent requests per model:
+    BOSON_MAX_CONCURRENCY: int = 8
+    BOSON_MODEL_CONCURRENCY: dict[str, int] = {
+        "Qwen3-32B-thinking-Hackathon": 6,
+        "higgs-audio-generation-Hackathon": 4,
+    }
+    # Retries on 429/5xx/timeouts with exponential backoff and full jitter
+    BOSON_MAX_RETRIES: int = 3
+    BOSON_RETRY_BASE_DELAY: float = 0.5
+    BOSON_RETRY_MAX_DELAY: float = 20.0
+    # Retries may not exceed this share of the requests in the window (plus a floor)
+    BOSON_RETRY_BUDGET_RATIO: float = 0.2
+    BOSON_RETRY_BUDGET_MIN_PER_SECOND: float = 0.2
+    BOSON_RETRY_BUDGET_WINDOW: float = 10.0
+    # Fail fast after this many consecutive failures of a model, probe again later
+    BOSON_BREAKER_FAILURE_THRESHOLD: int = 5
+    BOSON_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Tree generation: truncated responses are repaired and only their missing
+    # branches regenerated, so one attempt is enough. With more, redundant
+    # attempts are hedged: a backup starts only if none answered within the
+    # hedge delay, which should track the p50 latency of the thinking model.
+    TREE_GENERATION_ATTEMPTS: int = 1
+    TREE_GENERATION_HEDGE_DELAY: float = 25.0
+    # Tree shape limits for ContinueConversationRequest.depth/branching. Levels
+    # that would push one call past TREE_MAX_NODES_PER_CALL nodes are expanded
+    # by parallel per-branch calls instead.
+    TREE_MAX_DEPTH: int = 6
+    TREE_MAX_BRANCHING: int = 5
+    TREE_MAX_NODES: int = 400
+    TREE_MAX_NODES_PER_CALL: int = 13
+
+    # Pages of GET /cases (keyset pagination, see crud.list_cases): the size
+    # without ?limit= and the largest one a client may ask for
+    CASES_DEFAULT_PAGE_SIZE: int = 100
+    CASES_MAX_PAGE_SIZE: int = 500
+
+    # Levels returned at most by one lazy tree request (/trees/{id}/nodes)
+    LAZY_TREE_MAX_DEPTH: int = 8
+
+    # Deleted messages are reported by /trees/{id}/changes for this long; older
+    # clients are told to reload the whole tree
+    TREE_CHANGES_RETENTION_SECONDS: int = 60 * 60 * 24
+
+    # LLM response cache: in-process LRU in front of the llmcacheentry table
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 7
+    LLM_CACHE_MEMORY_ENTRIES: int = 512
+    LLM_CACHE_DB_MAX_ENTRIES: int = 20000
+
+    # Single-flight coalescing of identical generations across workers
+    SINGLE_FLIGHT_LEASE_SECONDS: int = 300  # taken over if the owner dies
+    SINGLE_FLIGHT_RESULT_SECONDS: int = 30  # outcome kept for workers still polling
+    SINGLE_FLIGHT_POLL_INTERVAL: float = 0.25
+
+    # Tree-generation prompts keep the latest turns verbatim and fold older ones
+    # into a running summary, HISTORY_SUMMARY_CHUNK turns at a time
+    HISTORY_VERBATIM_TURNS: int = 6
+    HISTORY_SUMMARY_CHUNK: int = 6
+    HISTORY_SUMMARY_MAX_TOKENS: int = 1024
+
+    # Speculative pre-generation: selecting a leaf generates its continuation in
+    # the background, staged until /continue-conversation takes it
+    SPECULATION_ENABLED: bool = True
+    SPECULATION_INCLUDE_SIBLINGS: bool = False
+    SPECULATION_BUDGET: int = 2  # staged or in-flight trees per simulation
+    SPECULATION_DELAY_SECONDS: float = 1.0  # let rapid re-selections settle
+    SPECULATION_TTL_SECONDS: int = 600
+
+    # Parsed Case.context and formatted LLM backgrounds kept per worker, checked
+    # against summary_version on every use (see app.core.case_context)
+    CASE_CONTEXT_CACHE_ENTRIES: int = 1024
+
+    # Case summaries are regenerated in the background once edits settle
+    CASE_SUMMARY_DEBOUNCE_SECONDS: float = 3.0
+    # A summary still pending after this long (e.g. worker restart) is rescheduled
+    CASE_SUMMARY_STALE_SECONDS: int = 300
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
@@ -0,0 +1,43 @@
+"""
+Per-key debouncing of background coroutines.
+
+Every `schedule()` for a key cancels whatever is still pending or running for
+that key and starts a new timer, so a burst of calls collapses into a single
+execution `delay` seconds after the last one.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer:
+    def __init__(self) -> None:
+        self._tasks: dict[Hashable, asyncio.Task[None]] = {}
+
+    def schedule(self, key: Hashable, delay: float, fn: Callable[[], Awaitable[None]]) -> None:
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+
+        task = asyncio.ensure_future(self._run(delay, fn))
+        self._tasks[key] = task
+
+        def forget(done: "asyncio.Task[None]") -> None:
+            if self._tasks.get(key) is done:
+                del self._tasks[key]
+
+        task.add_done_callback(forget)
+
+    def pending(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    async def _run(self, delay: float, fn: Callable[[], Awaitable[None]]) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Debounced task failed: {e}")
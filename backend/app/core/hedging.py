@@ -0,0 +1,93 @@
+"""
+First-valid-wins racing of redundant upstream requests.
+
+Attempts are started one at a time: a further attempt is only launched when the
+running ones have not produced a valid answer within `hedge_delay` seconds (set
+this to the p50 latency of the call), or as soon as one of them fails. The first
+result accepted by `validate` wins and every other attempt is cancelled, which
+also aborts its in-flight HTTP request.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+T = TypeVar("T")
+
+
+async def race_first_valid(
+    attempt: Callable[[], Awaitable[R]],
+    validate: Callable[[R], T | None],
+    *,
+    attempts: int = 3,
+    hedge_delay: float | None = None,
+    fatal: tuple[type[BaseException], ...] = (),
+) -> T | None:
+    """
+    Run up to `attempts` calls of `attempt` and return the first value accepted by
+    `validate`, or None when every attempt failed.
+
+    `validate` returns None (or raises) to reject a response. With `hedge_delay`
+    set to None or 0 all attempts start immediately. An attempt raising one of the
+    `fatal` exception types ends the race and the exception is re-raised.
+    """
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task[Any]] = set()
+    started = 0
+    last_launch = loop.time()
+
+    def launch() -> None:
+        nonlocal started, last_launch
+        started += 1
+        last_launch = loop.time()
+        pending.add(asyncio.create_task(attempt()))
+
+    try:
+        launch()
+        if not hedge_delay:
+            while started < attempts:
+                launch()
+
+        while pending:
+            timeout = None
+            if hedge_delay and started < attempts:
+                timeout = max(0.0, last_launch + hedge_delay - loop.time())
+
+            done, _ = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                # Nobody answered within the hedge delay: start a backup request
+                logger.info(f"Hedging: starting attempt {started + 1}/{attempts}")
+                launch()
+                continue
+
+            for task in done:
+                pending.discard(task)
+                if task.cancelled():
+                    logger.warning("Attempt was cancelled")
+                elif isinstance(task.exception(), fatal):
+                    raise task.exception()  # type: ignore[misc]
+                elif task.exception() is not None:
+                    logger.warning(f"Attempt failed: {task.exception()!r}")
+                else:
+                    try:
+                        value = validate(task.result())
+                    except Exception as e:
+                        logger.warning(f"Attempt returned an invalid response: {e!r}")
+                        value = None
+                    if value is not None:
+                        return value
+                # Replace the failed attempt right away instead of waiting for the hedge timer
+                if started < attempts:
+                    launch()
+
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,116 @@
+"""
+Rolling compaction of the conversation history in tree-generation prompts.
+
+The last HISTORY_VERBATIM_TURNS turns of the root-to-leaf path are sent word for
+word and everything before them is replaced by a running summary. Summaries
+grow HISTORY_SUMMARY_CHUNK turns at a time, each one extending the previous, and
+are stored in the `historysummary` table keyed by the id of the last message
+they cover. A summary is therefore built once and reused by every descendant of
+that message, and the prompt stays bounded however deep the negotiation gets.
+The table is read and written in the threadpool, off the event loop.
+"""
+import logging
+from collections.abc import Sequence
+
+from fastapi.concurrency import run_in_threadpool
+from openai import AsyncOpenAI
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.llm_cache import cached_completion
+from app.models import HistorySummary, Message
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "Qwen3-32B-thinking-Hackathon"
+
+
+def format_turn(message: Message) -> str:
+    return f"{message.role}: {message.content}"
+
+
+def _strip_think(content: str) -> str:
+    return content.split("</think>", 1)[-1].strip()
+
+
+async def summarize_turns(client: AsyncOpenAI, previous_summary: str, turns: Sequence[str]) -> str:
+    """Fold `turns` into `previous_summary` and return the new running summary."""
+    prompt = (
+        "Summarize this legal negotiation between party A and party B in at most 150 words. "
+        "Keep every offer, concession, deadline and unresolved issue. "
+        "Reply with the summary only.\n\n"
+    )
+    if previous_summary:
+        prompt += f"[SUMMARY SO FAR]\n{previous_summary}\n\n"
+    prompt += "[NEW STATEMENTS]\n" + "\n".join(turns)
+    return await cached_completion(
+        client,
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt},
+        ],
+        parse=_strip_think,
+        max_tokens=settings.HISTORY_SUMMARY_MAX_TOKENS,
+        temperature=0.3,
+    )
+
+
+async def compact_history(client: AsyncOpenAI, session: Session, path: Sequence[Message]) -> str:
+    """Serialize a root-to-leaf path for the prompt, summarizing all but the latest turns."""
+    # Snapshot the path: committing summaries expires the loaded messages
+    ids = [m.id for m in path]
+    turns = [format_turn(m) for m in path]
+
+    chunk = max(1, settings.HISTORY_SUMMARY_CHUNK)
+    covered = max(len(turns) - settings.HISTORY_VERBATIM_TURNS, 0) // chunk * chunk
+    if covered == 0:
+        return "\n".join(turns)
+
+    summary = await _summary_through(client, session, ids, turns, covered, chunk)
+    recent = "\n".join(turns[covered:])
+    return (
+        f"Summary of the first {covered} statements:\n{summary}\n\n"
+        f"Most recent statements:\n{recent}"
+    )
+
+
+async def _summary_through(
+    client: AsyncOpenAI,
+    session: Session,
+    ids: list[int],
+    turns: list[str],
+    end: int,
+    chunk: int,
+) -> str:
+    """Return the running summary of turns[:end], building missing chunks from the deepest cached one."""
+    # The session is only used by this coroutine, one call at a time
+    start, summary = await run_in_threadpool(_deepest_summary, session, ids, end, chunk)
+    for boundary in range(start + chunk, end + 1, chunk):
+        try:
+            summary = await summarize_turns(client, summary, turns[boundary - chunk : boundary])
+        except Exception as e:
+            logger.warning(f"History summary up to message {ids[boundary - 1]} failed: {e}")
+            omitted = end - boundary + chunk
+            return f"{summary}\n({omitted} further statements omitted)".strip()
+        await run_in_threadpool(_store, session, ids[boundary - 1], boundary, summary)
+    return summary
+
+
+def _deepest_summary(session: Session, ids: list[int], end: int, chunk: int) -> tuple[int, str]:
+    """The stored summary covering the most turns up to end, with that number of turns (0 if none)."""
+    for start in range(end, 0, -chunk):
+        cached = session.get(HistorySummary, ids[start - 1])
+        if cached is not None:
+            return start, cached.summary
+    return 0, ""
+
+
+def _store(session: Session, message_id: int, turn_count: int, summary: str) -> None:
+    session.add(HistorySummary(message_id=message_id, turn_count=turn_count, summary=summary))
+    try:
+        session.commit()
+    except IntegrityError:
+        # Built concurrently for another descendant; keep the stored one
+        session.rollback()
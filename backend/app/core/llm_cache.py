@@ -0,0 +1,202 @@
+"""
+Content-addressed cache for LLM responses.
+
+Entries are keyed on a hash of (model, full message list, sampling params). An
+in-process LRU sits in front of the persistent `llmcacheentry` table, which is
+shared by all workers. Both layers expire entries after LLM_CACHE_TTL_SECONDS
+and are capped in size. Callers that must regenerate (the `refresh` path) pass
+`bypass=True`: the cached value is skipped but the fresh one is still stored.
+Coroutines use `aget`/`aset`, which keep the table round trips off the event loop.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from openai import AsyncOpenAI
+from sqlmodel import Session, delete, select
+
+from app.core.boson import chat_completion
+from app.core.config import settings
+from app.core.db import engine
+from app.models import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Prune the table every this many writes
+_PRUNE_EVERY = 100
+
+
+class LLMResponseCache:
+    def __init__(self, memory_entries: int, ttl_seconds: int, db_max_entries: int) -> None:
+        self.memory_entries = memory_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.db_max_entries = db_max_entries
+        self._lru: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict[str, Any]], params: dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Look key up in memory, then in the table. Blocks on the database."""
+        now = datetime.utcnow()
+        cached = self._recall(key, now)
+        if cached is not None:
+            return cached
+
+        try:
+            with Session(engine) as session:
+                entry = session.get(LLMCacheEntry, key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            entry = None
+
+        if entry is None or entry.expires_at <= now:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.db_hits += 1
+            self._remember(key, entry.response, entry.expires_at)
+        return entry.response
+
+    async def aget(self, key: str) -> str | None:
+        """get() for coroutines: memory hits are answered inline, the table is read in a thread."""
+        cached = self._recall(key, datetime.utcnow())
+        if cached is not None:
+            return cached
+        return await run_in_threadpool(self.get, key)
+
+    def set(self, key: str, model: str, response: str) -> None:
+        """Store response in memory and in the table. Blocks on the database."""
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+
+        try:
+            with Session(engine) as session:
+                session.merge(
+                    LLMCacheEntry(
+                        key=key,
+                        model=model,
+                        response=response,
+                        created_at=now,
+                        expires_at=expires_at,
+                    )
+                )
+                session.commit()
+                if prune:
+                    self._prune(session, now)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def aset(self, key: str, model: str, response: str) -> None:
+        """set() for coroutines, run in a thread."""
+        await run_in_threadpool(self.set, key, model, response)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._lru),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+            }
+
+    def _recall(self, key: str, now: datetime) -> str | None:
+        with self._lock:
+            cached = self._lru.get(key)
+            if cached is None:
+                return None
+            response, expires_at = cached
+            if expires_at <= now:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            self.memory_hits += 1
+            return response
+
+    def _remember(self, key: str, response: str, expires_at: datetime) -> None:
+        self._lru[key] = (response, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def _prune(self, session: Session, now: datetime) -> None:
+        """Drop expired rows, then the oldest rows beyond LLM_CACHE_DB_MAX_ENTRIES."""
+        session.exec(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= now))
+        overflow = (
+            select(LLMCacheEntry.key)
+            .order_by(LLMCacheEntry.created_at.desc())
+            .offset(self.db_max_entries)
+        )
+        session.exec(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(overflow)))
+        session.commit()
+
+
+llm_cache = LLMResponseCache(
+    memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    db_max_entries=settings.LLM_CACHE_DB_MAX_ENTRIES,
+)
+
+
+def _identity(content: str) -> str:
+    return content
+
+
+async def cached_completion(
+    client: AsyncOpenAI,
+    *,
+    model: str,
+    messages: list[dict[str, Any]],
+    parse: Callable[[str], T] = _identity,  # type: ignore[assignment]
+    bypass: bool = False,
+    **params: Any,
+) -> T:
+    """
+    Return `parse(content)` for a chat completion, serving repeats from the cache.
+    A response is only stored once `parse` accepted it.
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        response = await chat_completion(client, model=model, messages=messages, **params)
+        return parse(response.choices[0].message.content)
+
+    key = llm_cache.make_key(model, messages, params)
+    if not bypass:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return parse(cached)
+
+    response = await chat_completion(client, model=model, messages=messages, **params)
+    content = response.choices[0].message.content
+    result = parse(content)
+    await llm_cache.aset(key, model, content)
+    return result
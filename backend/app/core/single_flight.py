@@ -0,0 +1,158 @@
+"""
+Single-flight coalescing of identical generation requests.
+
+Concurrent calls with the same key share one execution. Within a worker the
+duplicates await the same task; across workers the first caller takes a lease
+row in `generationlease` and the others poll it until the result is stored.
+The outcome is only handed to callers that were waiting while the lease was in
+flight: a request arriving after it finished runs again, so it is not answered
+with a result that predates it. A lease whose owner died is taken over once it
+expires. The lease table is read and written in the threadpool, so waiting does
+not block the event loop.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import GenerationLease
+
+logger = logging.getLogger(__name__)
+
+LEADER = "leader"
+WAIT = "wait"
+DONE = "done"
+FAILED = "failed"
+
+
+class SingleFlightError(HTTPException):
+    """
+    The shared execution failed in another worker. Carries the status, detail and
+    headers of the HTTPException it raised there (a 500 for any other error).
+    """
+
+    def __init__(self, key: str, error: str | None) -> None:
+        failure = json.loads(error) if error is not None else {}
+        super().__init__(
+            status_code=failure.get("status_code", 500),
+            detail=failure.get("detail", f"Coalesced request {key} failed in another worker"),
+            headers=failure.get("headers"),
+        )
+
+
+def _describe(error: BaseException) -> str | None:
+    """The HTTP response of error as stored on a failed lease."""
+    if not isinstance(error, HTTPException):
+        return None
+    return json.dumps({"status_code": error.status_code, "detail": error.detail, "headers": error.headers}, default=str)
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Task[Any]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` once for all concurrent callers using `key`; its result must be JSON-serializable."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info(f"Coalescing duplicate request for {key}")
+        # Shield so a disconnecting caller does not cancel the shared work
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        waiting = False
+        while True:
+            state, result = await run_in_threadpool(self._acquire, key, owner, waiting)
+            if state == LEADER:
+                try:
+                    value = await fn()
+                except BaseException as e:
+                    await run_in_threadpool(self._release, key, owner, FAILED, None, _describe(e))
+                    raise
+                await run_in_threadpool(self._release, key, owner, DONE, json.dumps(value), None)
+                return value
+            if state == DONE:
+                return json.loads(result) if result is not None else None
+            if state == FAILED:
+                raise SingleFlightError(key, result)
+            waiting = True
+            await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+    def _acquire(self, key: str, owner: str, waiting: bool) -> tuple[str, str | None]:
+        """
+        Take the lease of key, or report the outcome of the execution the caller was
+        waiting on: DONE with its JSON result, or FAILED with its JSON error.
+        """
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=settings.SINGLE_FLIGHT_LEASE_SECONDS)
+        with Session(engine) as session:
+            lease = session.get(GenerationLease, key)
+            if lease is None:
+                session.add(GenerationLease(key=key, owner=owner, expires_at=lease_until))
+                try:
+                    session.commit()
+                except IntegrityError:
+                    # Another worker inserted the lease first
+                    session.rollback()
+                    return WAIT, None
+                return LEADER, None
+
+            if lease.expires_at > now:
+                if lease.status == "running":
+                    return WAIT, None
+                if waiting:
+                    # We were waiting on this execution: share its outcome
+                    return (DONE, lease.result) if lease.status == DONE else (FAILED, lease.error)
+
+            # Expired, or finished before we arrived: try to take the lease over
+            taken = session.execute(
+                update(GenerationLease)
+                .where(
+                    GenerationLease.key == key,
+                    GenerationLease.owner == lease.owner,
+                    GenerationLease.status == lease.status,
+                )
+                .values(owner=owner, status="running", result=None, error=None, expires_at=lease_until)
+            )
+            session.commit()
+            return (LEADER, None) if taken.rowcount == 1 else (WAIT, None)
+
+    def _release(self, key: str, owner: str, status: str, result: str | None, error: str | None) -> None:
+        now = datetime.utcnow()
+        keep_until = now + timedelta(seconds=settings.SINGLE_FLIGHT_RESULT_SECONDS)
+        try:
+            with Session(engine) as session:
+                session.execute(
+                    update(GenerationLease)
+                    .where(GenerationLease.key == key, GenerationLease.owner == owner)
+                    .values(status=status, result=result, error=error, expires_at=keep_until)
+                )
+                # Housekeeping: drop leases that expired a while ago
+                session.execute(
+                    delete(GenerationLease).where(
+                        GenerationLease.expires_at < now - timedelta(hours=1)
+                    )
+                )
+                session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to release generation lease {key}: {e}")
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,65 @@
+"""
+Streaming serializer for message trees.
+
+`iter_tree_json()` turns flat (id, parent_id, role, content) rows into the
+nested JSON of GET /trees/{id}/messages in one pass: children are grouped by
+parent once, then an explicit stack walks the tree and writes each node as it
+is reached. Nothing is recursive, so deep negotiations cannot hit the
+recursion limit, and output is yielded in chunks for a StreamingResponse
+instead of being materialized as nested dicts first.
+"""
+import json
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+
+CHUNK_SIZE = 64 * 1024
+
+
+class TreeRow(NamedTuple):
+    id: int
+    parent_id: int | None
+    role: str | None
+    content: str | None
+
+
+def _string(value: str | None) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def iter_tree_json(rows: Iterable[TreeRow], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield `[{"id", "role", "content", "children": [...]}, ...]` for the roots
+    (parent_id None) and their descendants. Rows must be ordered by id so that
+    siblings come out in creation order.
+    """
+    children: dict[int | None, list[TreeRow]] = {}
+    for row in rows:
+        children.setdefault(row.parent_id, []).append(row)
+
+    parts = ["["]
+    size = 1
+    # One iterator over the remaining siblings per open level, and whether
+    # anything was written at that level yet
+    stack = [iter(children.get(None, ()))]
+    started = [False]
+    while stack:
+        row = next(stack[-1], None)
+        if row is None:
+            stack.pop()
+            started.pop()
+            part = "]}" if stack else "]"
+        else:
+            part = (
+                f'{"," if started[-1] else ""}{{"id":{row.id},"role":{_string(row.role)},'
+                f'"content":{_string(row.content)},"children":['
+            )
+            started[-1] = True
+            stack.append(iter(children.get(row.id, ())))
+            started.append(False)
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(parts).encode()
+            parts = []
+            size = 0
+    yield "".join(parts).encode()
@@ -0,0 +1,109 @@
+"""
+Repair and salvage of dialogue-tree JSON returned by the model.
+
+Responses may start with a <think> block, be wrapped in markdown fences, carry
+trailing commas or stop mid-way when max_tokens is reached. `parse_tree()`
+returns the tree as-is when the JSON is valid, and otherwise rebuilds it from
+every complete node the incremental parser (app.core.tree_stream) can recover,
+which closes whatever arrays and objects were left open. `missing_branches()`
+then lists the gaps so that only those branches have to be generated again.
+"""
+import json
+import logging
+from collections.abc import Iterator
+from typing import Any
+
+from app.core.tree_stream import StreamedNode, TreeNodeStreamParser
+from app.schemas import ScenariosTreeResponse
+
+logger = logging.getLogger(__name__)
+
+
+def extract_json(content: str) -> str:
+    """Drop a <think> block, markdown fences and prose around the outermost JSON object."""
+    if "</think>" in content:
+        content = content.split("</think>", 1)[1]
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1:
+        return content.strip()
+    return content[start : end + 1] if end > start else content[start:]
+
+
+def parse_tree(content: str) -> dict[str, Any] | None:
+    """
+    Parse a `scenarios_tree` response, salvaging complete nodes from broken JSON.
+    Returns None when not even the Level 1 node can be recovered.
+    """
+    try:
+        return ScenariosTreeResponse(**json.loads(extract_json(content))).model_dump()
+    except Exception:
+        pass
+
+    parser = TreeNodeStreamParser()
+    tree = nodes_to_tree(parser.feed(content))
+    if tree is None:
+        logger.warning("Failed to parse response: no complete Level 1 node")
+    else:
+        logger.info(f"Salvaged {count_nodes(tree['scenarios_tree'])} nodes from a broken tree response")
+    return tree
+
+
+def nodes_to_tree(nodes: list[StreamedNode]) -> dict[str, Any] | None:
+    """Nest parent-first streamed nodes back into a `scenarios_tree` dict."""
+    by_path: dict[tuple[int, ...], dict[str, Any]] = {}
+    for node in nodes:
+        data = {
+            "speaker": node.speaker,
+            "line": node.line,
+            "level": node.level,
+            "reflects_personality": node.reflects_personality,
+            "responses": [],
+        }
+        if node.path:
+            parent = by_path.get(node.path[:-1])
+            if parent is None:
+                continue
+            parent["responses"].append(data)
+        by_path[node.path] = data
+    root = by_path.get(())
+    return {"scenarios_tree": root} if root is not None else None
+
+
+def count_nodes(node: dict[str, Any]) -> int:
+    return 1 + sum(count_nodes(child) for child in node.get("responses", []))
+
+
+def node_at(root: dict[str, Any], path: tuple[int, ...]) -> dict[str, Any]:
+    node = root
+    for index in path:
+        node = node["responses"][index]
+    return node
+
+
+def missing_branches(
+    node: dict[str, Any], depth: int, branching: int, path: tuple[int, ...] = ()
+) -> list[tuple[tuple[int, ...], int]]:
+    """(path, number of missing responses) for every node above `depth` with too few responses."""
+    if node["level"] >= depth:
+        return []
+    gaps = []
+    responses = node.get("responses", [])
+    if len(responses) < branching:
+        gaps.append((path, branching - len(responses)))
+    for i, child in enumerate(responses):
+        gaps.extend(missing_branches(child, depth, branching, path + (i,)))
+    return gaps
+
+
+def iter_nodes(node: dict[str, Any], path: tuple[int, ...]) -> Iterator[StreamedNode]:
+    """Yield a subtree parent-first as StreamedNodes, `path` being the path of `node`."""
+    yield StreamedNode(
+        path=path,
+        speaker=node["speaker"],
+        line=node["line"],
+        level=node["level"],
+        reflects_personality=node["reflects_personality"],
+    )
+    for i, child in enumerate(node.get("responses", [])):
+        yield from iter_nodes(child, path + (i,))
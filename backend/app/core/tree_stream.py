@@ -0,0 +1,205 @@
+"""
+Incremental parser for streamed `scenarios_tree` JSON.
+
+Tokens from a streaming chat completion are fed in as they arrive and every
+TreeNode is emitted as soon as its own fields are known, i.e. when its
+"responses" array opens (or when the node closes if it has none). Nodes are
+always emitted parent-first so they can be persisted as they arrive; each one
+carries its `path`, the child indexes leading to it from the Level 1 node.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.schemas import TreeNode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamedNode:
+    path: tuple[int, ...]
+    speaker: str
+    line: str
+    level: int
+    reflects_personality: str
+
+    @property
+    def parent_path(self) -> tuple[int, ...] | None:
+        return self.path[:-1] if self.path else None
+
+
+@dataclass
+class _Frame:
+    kind: str  # "object" or "array"
+    start: int
+    parent: "_Frame | None"
+    key: str | None = None  # current key (objects) or owning key (arrays)
+    key_start: int = 0
+    expect_key: bool = True
+    value_open: bool = False
+    count: int = 0
+    # Node bookkeeping (objects that are TreeNodes only)
+    path: tuple[int, ...] | None = None
+    emitted: bool = False
+    dropped: bool = False
+    held: list[StreamedNode] = field(default_factory=list)
+
+
+class TreeNodeStreamParser:
+    """Feed raw completion text with `feed()`; it returns the newly completed nodes."""
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._started = False
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> list[StreamedNode]:
+        self._buffer += chunk
+        out: list[StreamedNode] = []
+        if not self._started and not self._skip_preamble():
+            return out
+
+        buf = self._buffer
+        while self._pos < len(buf) and not self.done:
+            i = self._pos
+            ch = buf[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    top = self._stack[-1]
+                    if top.kind == "object" and top.expect_key:
+                        top.key = json.loads(buf[self._string_start : i + 1])
+                        top.key_start = self._string_start
+                        top.expect_key = False
+                continue
+
+            if not self._stack:
+                # Ignore anything around the top-level object (markdown fences, prose)
+                if ch == "{":
+                    self._stack.append(_Frame("object", i, None))
+                continue
+
+            top = self._stack[-1]
+            if ch.isspace() or ch == ":":
+                continue
+            if ch == ",":
+                if top.kind == "object":
+                    top.expect_key = True
+                else:
+                    top.value_open = False
+                continue
+            if ch == "}" or ch == "]":
+                self._close(i, out)
+                continue
+
+            # Start of a value
+            if top.kind == "array" and not top.value_open:
+                top.value_open = True
+                top.count += 1
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == "{":
+                self._stack.append(self._open_object(i, top))
+            elif ch == "[":
+                self._stack.append(_Frame("array", i, top, key=top.key))
+                if top.path is not None and top.key == "responses":
+                    self._emit_header(top, out)
+        return out
+
+    def _skip_preamble(self) -> bool:
+        """Drop a leading <think>...</think> block before looking for JSON."""
+        stripped = self._buffer.lstrip()
+        if stripped.startswith("<think>"):
+            end = self._buffer.find("</think>")
+            if end == -1:
+                return False
+            self._pos = end + len("</think>")
+        elif "<think>".startswith(stripped):
+            # Not enough text yet to tell whether a think block follows
+            return False
+        self._started = True
+        return True
+
+    def _open_object(self, start: int, parent: _Frame) -> _Frame:
+        frame = _Frame("object", start, parent)
+        if parent.kind == "object" and parent.key == "scenarios_tree":
+            frame.path = ()
+        elif parent.kind == "array" and parent.key == "responses":
+            owner = parent.parent
+            if owner is not None and owner.path is not None:
+                frame.path = owner.path + (parent.count - 1,)
+                frame.dropped = owner.dropped
+        return frame
+
+    def _close(self, end: int, out: list[StreamedNode]) -> None:
+        frame = self._stack.pop()
+        if frame.kind == "object" and frame.path is not None and not frame.emitted:
+            # Node without a "responses" array, or whose fields came after it
+            self._emit(frame, self._buffer[frame.start : end + 1], out, final=True)
+        if not self._stack:
+            self.done = True
+
+    def _emit_header(self, frame: _Frame, out: list[StreamedNode]) -> None:
+        if frame.emitted:
+            return
+        header = self._buffer[frame.start : frame.key_start].rstrip().rstrip(",") + "}"
+        self._emit(frame, header, out, final=False)
+
+    def _emit(self, frame: _Frame, text: str, out: list[StreamedNode], final: bool) -> None:
+        if frame.dropped:
+            frame.emitted = True
+            return
+        try:
+            data: dict[str, Any] = json.loads(text)
+            data.pop("responses", None)
+            node = TreeNode(**data)
+        except Exception as e:
+            if not final:
+                # Some fields come after "responses": wait for the node to close
+                return
+            logger.warning(f"Dropping malformed streamed node at {frame.path}: {e}")
+            frame.emitted = True
+            frame.dropped = True
+            return
+
+        frame.emitted = True
+        assert frame.path is not None
+        streamed = StreamedNode(
+            path=frame.path,
+            speaker=node.speaker,
+            line=node.line,
+            level=node.level,
+            reflects_personality=node.reflects_personality,
+        )
+        sink = self._sink(frame, out)
+        sink.append(streamed)
+        sink.extend(frame.held)
+        frame.held.clear()
+
+    def _sink(self, frame: _Frame, out: list[StreamedNode]) -> list[StreamedNode]:
+        """Children of a node that is not emitted yet wait in that node's held list."""
+        ancestor = frame.parent
+        while ancestor is not None:
+            if ancestor.path is not None and not ancestor.emitted:
+                return ancestor.held
+            ancestor = ancestor.parent
+        return out
@@ -0,0 +1,306 @@
+"""
+Governor for calls to the Boson AI API.
+
+Every upstream call of a worker goes through `governor.call()`, or
+`governor.call_stream()` for streamed responses, which applies:
+
+- a per-model semaphore bounding concurrent requests (BOSON_MODEL_CONCURRENCY),
+  held by a streamed response until its body is consumed,
+- retries with exponential backoff and full jitter on 429, 5xx, timeouts and
+  connection errors, honouring Retry-After,
+- a retry budget shared by all models, so retries stay a bounded fraction of
+  traffic instead of multiplying load while Boson is struggling,
+- a per-model circuit breaker that fails fast once a model keeps failing and
+  lets a single probe through after BOSON_BREAKER_RESET_SECONDS.
+
+When a call cannot be served it raises UpstreamUnavailableError, an
+HTTPException answered as 503 with a Retry-After header.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from fastapi import HTTPException
+from openai import APIConnectionError, APIStatusError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailableError(HTTPException):
+    """Boson cannot serve the request right now; clients should retry later."""
+
+    def __init__(self, detail: str, retry_after: float) -> None:
+        self.retry_after = max(1, round(retry_after))
+        super().__init__(
+            status_code=503, detail=detail, headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    # Includes APITimeoutError
+    return isinstance(error, APIConnectionError)
+
+
+def retry_after(error: BaseException) -> float | None:
+    """The delay requested by a Retry-After header, if any."""
+    if not isinstance(error, APIStatusError):
+        return None
+    try:
+        return float(error.response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; half-opens after `reset_seconds`."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def check(self) -> None:
+        """Raise if the circuit is open or its half-open probe is already in flight."""
+        if self.opened_at is None:
+            return
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if remaining > 0 or self.probing:
+            raise UpstreamUnavailableError(
+                f"Boson AI model {self.name} is unavailable, failing fast",
+                retry_after=max(remaining, 1.0),
+            )
+
+    def before_call(self) -> bool:
+        """Raise if the circuit is open; return True when this call is the half-open probe."""
+        self.check()
+        if self.opened_at is None:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            if not self.probing:
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def abandon_probe(self) -> None:
+        """The probe was cancelled before it could tell anything."""
+        self.probing = False
+
+
+class RetryBudget:
+    """Allow retries up to `ratio` of the requests seen in the last `window` seconds."""
+
+    def __init__(self, ratio: float, min_per_second: float, window: float) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+        allowed = self.min_per_second * self.window + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+
+class GovernedStream:
+    """
+    A streamed upstream response that holds its concurrency slot until it is
+    exhausted, fails or is closed, and only then tells the breaker how it went.
+    Must be closed, like the openai stream it wraps.
+    """
+
+    def __init__(self, stream: Any, semaphore: asyncio.Semaphore, breaker: CircuitBreaker) -> None:
+        self._stream = stream
+        self._semaphore = semaphore
+        self._breaker = breaker
+        self._finished = False
+
+    def __aiter__(self) -> "GovernedStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._finish(failed=False)
+            raise
+        except Exception as e:
+            self._finish(failed=is_retryable(e))
+            raise
+
+    async def close(self) -> None:
+        try:
+            await self._stream.close()
+        finally:
+            # Closed early by the consumer: the upstream did answer
+            self._finish(failed=False)
+
+    def _finish(self, failed: bool) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        self._semaphore.release()
+        if failed:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+
+
+class UpstreamGovernor:
+    def __init__(self) -> None:
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.budget = RetryBudget(
+            ratio=settings.BOSON_RETRY_BUDGET_RATIO,
+            min_per_second=settings.BOSON_RETRY_BUDGET_MIN_PER_SECOND,
+            window=settings.BOSON_RETRY_BUDGET_WINDOW,
+        )
+        self.retries = 0
+
+    def semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            limit = settings.BOSON_MODEL_CONCURRENCY.get(model, settings.BOSON_MAX_CONCURRENCY)
+            self._semaphores[model] = asyncio.Semaphore(limit)
+        return self._semaphores[model]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(
+                model,
+                failure_threshold=settings.BOSON_BREAKER_FAILURE_THRESHOLD,
+                reset_seconds=settings.BOSON_BREAKER_RESET_SECONDS,
+            )
+        return self._breakers[model]
+
+    async def call(self, model: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()` under the concurrency limit, retry policy and breaker of `model`."""
+        return await self._call(model, fn, stream=False)
+
+    async def call_stream(self, model: str, fn: Callable[[], Awaitable[Any]]) -> "GovernedStream":
+        """
+        Open a streamed response like call(), but keep its concurrency slot, and
+        report it to the breaker, only once the stream is exhausted, fails or is
+        closed. Opening the stream is retried; failures mid-body are not, as
+        part of it has already been consumed.
+        """
+        return await self._call(model, fn, stream=True)
+
+    async def _call(self, model: str, fn: Callable[[], Awaitable[Any]], stream: bool) -> Any:
+        breaker = self.breaker(model)
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            # Fail fast rather than queue for a slot, and check again once one is
+            # free: the circuit may have opened while this call was waiting
+            breaker.check()
+            semaphore = self.semaphore(model)
+            await semaphore.acquire()
+            try:
+                probe = breaker.before_call()
+            except BaseException:
+                semaphore.release()
+                raise
+            settled = False
+            try:
+                try:
+                    result = await fn()
+                except BaseException:
+                    semaphore.release()
+                    raise
+                settled = True
+                if stream:
+                    # The stream settles the slot and the breaker when it ends
+                    return GovernedStream(result, semaphore, breaker)
+                semaphore.release()
+                breaker.record_success()
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; the request itself was bad
+                    breaker.record_success()
+                    settled = True
+                    raise
+                breaker.record_failure()
+                settled = True
+                error = e
+            finally:
+                if probe and not settled:
+                    breaker.abandon_probe()
+
+            attempt += 1
+            if attempt > settings.BOSON_MAX_RETRIES or not self.budget.try_spend():
+                raise UpstreamUnavailableError(
+                    f"Boson AI model {model} is unavailable: {error}",
+                    retry_after=retry_after(error) or settings.BOSON_RETRY_MAX_DELAY,
+                ) from error
+
+            delay = random.uniform(
+                0, min(settings.BOSON_RETRY_MAX_DELAY, settings.BOSON_RETRY_BASE_DELAY * 2**attempt)
+            )
+            delay = max(delay, min(retry_after(error) or 0.0, settings.BOSON_RETRY_MAX_DELAY))
+            self.retries += 1
+            logger.info(f"Retrying {model} in {delay:.2f}s (attempt {attempt}): {error!r}")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "retry_budget_exhausted": self.budget.exhausted,
+            "models": {
+                model: {
+                    "circuit": self.breaker(model).state,
+                    "consecutive_failures": self.breaker(model).failures,
+                    "available_slots": self._semaphores[model]._value
+                    if model in self._semaphores
+                    else None,
+                }
+                for model in sorted(set(self._semaphores) | set(self._breakers))
+            },
+        }
+
+
+governor = UpstreamGovernor()
@@ -1,3 +1,5 @@
+import logging
+import time
 import uuid
 from fastapi import FastAPI, HTTPException, Depends
 from typing import Any
@@ -6,12 +8,21 @@ from sqlmodel import Session, select
 
 from app.core.security import get_password_hash, verify_password
 from app.models import Item, ItemCreate, User, UserCreate, UserUpdate, Case, \
-    Message, Simulation, Bookmark
-from app.schemas import SimulationCreate, BookmarkCreate
+    Message, Simulation, Bookmark, StagedTree, MessageTombstone, bump_change_counter, deepest, \
+    PATH_KEY_LENGTH, message_path_key
+from app.schemas import SimulationCreate, BookmarkCreate, TreeWriteStats
 from app.schemas import messages_to_conversation
-from sqlmodel import Session, select, delete
+from app.core.config import settings
+from app.core.tree_json import TreeRow
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, delete, func
 from typing import List, Optional
 
+logger = logging.getLogger(__name__)
+
 
 def get_case_context(session: Session, case_id: int) -> str | None:
     """Return the context field for a given case_id."""
@@ -47,21 +58,58 @@ def format_case_background_for_llm(context_json: str) -> str:
 
 
 
+def subtree_prefix(message: Message) -> str:
+    """The path shared by every descendant of message."""
+    return f"{message.path}{message.id}/"
+
+
+def subtree_range(prefix: str):
+    """
+    Filter on paths starting with prefix, as a range of the indexed path key. Up to
+    PATH_KEY_LENGTH the key range is exact; a deeper prefix is one key value, the
+    rows of which are then checked against the full path.
+    """
+    # "0" is the byte right after "/", so no path outside the subtree sorts in between
+    end = prefix[:-1] + "0"
+    if len(prefix) <= PATH_KEY_LENGTH:
+        return (message_path_key >= prefix) & (message_path_key < end)
+    return (message_path_key == prefix[:PATH_KEY_LENGTH]) & (Message.path >= prefix) & (Message.path < end)
+
+
+def ancestor_ids(message: Message) -> list[int]:
+    return [int(label) for label in message.path.split("/") if label]
+
+
+def get_message_path(session: Session, message_id: int) -> list[Message]:
+    """Return the messages from the root down to message_id (inclusive)."""
+    message = session.get(Message, message_id)
+    if not message:
+        return []
+    ancestors = session.exec(
+        select(Message).where(Message.id.in_(ancestor_ids(message))).order_by(Message.depth)
+    ).all()
+    return [*ancestors, message]
+
+
+def get_subtree(session: Session, message_id: int) -> list[Message]:
+    """Return every descendant of message_id, parents before children."""
+    message = session.get(Message, message_id)
+    if not message:
+        return []
+    statement = (
+        select(Message)
+        .where(subtree_range(subtree_prefix(message)))
+        .order_by(Message.depth, Message.id)
+    )
+    return list(session.exec(statement).all())
+
+
 def get_messages_by_tree(session: Session, tree_id: int, message_id: int = None, to_conversation=True):
     """Retrieve messages from message_id up to the root in hierarchical order.
     If message_id is None, returns all messages in the tree."""
     
     if message_id is not None:
-        # Traverse up from the given message to the root
-        ordered = []
-        current_id = message_id
-        
-        while current_id is not None:
-            message = session.get(Message, current_id)
-            if not message:
-                break
-            ordered.insert(0, message)  # Insert at beginning to maintain root-to-leaf order
-            current_id = message.parent_id
+        ordered = get_message_path(session, message_id)
     else:
         # Get all messages in the tree (original behavior)
         statement = select(Message).where(Message.simulation_id == tree_id)
@@ -101,9 +149,105 @@ def get_messages_by_tree(session: Session, tree_id: int, message_id: int = None,
     ]
 
 
+def insert_message_tree(
+    session: Session,
+    simulation_id: int,
+    root: dict[str, Any],
+    *,
+    parent_id: int | None = None,
+    include_root: bool = True,
+    root_selected: bool = True,
+    selected: bool = False,
+) -> TreeWriteStats:
+    """
+    Insert a TreeNode hierarchy of any depth, one multi-row INSERT ... RETURNING per level.
+    With include_root=False only the responses of root are stored, under parent_id.
+    Does not commit: the caller owns the transaction.
+    """
+    start = time.perf_counter()
+    if parent_id is None:
+        path, depth = "", 0
+    else:
+        parent = session.get(Message, parent_id)
+        path, depth = subtree_prefix(parent), parent.depth + 1
+    if include_root:
+        level = [(root, parent_id, root_selected)]
+    else:
+        level = [(child, parent_id, selected) for child in root.get("responses", [])]
+
+    rows = 0
+    levels = 0
+    paths = {parent_id: path}
+    revision = bump_revision(session, simulation_id)
+    while level:
+        ids = session.execute(
+            insert(Message).returning(Message.id, sort_by_parameter_order=True),
+            [
+                {
+                    "content": node.get("line", ""),
+                    "role": node.get("speaker", "A"),
+                    "simulation_id": simulation_id,
+                    "parent_id": node_parent_id,
+                    "selected": node_selected,
+                    "path": paths[node_parent_id],
+                    "depth": depth,
+                    "revision": revision,
+                }
+                for node, node_parent_id, node_selected in level
+            ],
+        ).scalars().all()
+        rows += len(ids)
+        levels += 1
+        paths = {
+            message_id: f"{paths[node_parent_id]}{message_id}/"
+            for (_, node_parent_id, _), message_id in zip(level, ids, strict=True)
+        }
+        depth += 1
+        level = [
+            (child, message_id, selected)
+            for (node, _, _), message_id in zip(level, ids, strict=True)
+            for child in node.get("responses", [])
+        ]
+
+    count_inserted_messages(session, simulation_id, rows, depth - 1)
+    stats = TreeWriteStats(rows=rows, levels=levels, seconds=time.perf_counter() - start)
+    logger.info(f"Inserted {stats.rows} messages over {stats.levels} levels ({stats.seconds * 1000:.1f} ms)")
+    return stats
+
+
+def get_tree_window(session: Session, simulation_id: int, root: Message | None, max_depth: int) -> list[Message]:
+    """
+    Return root and its descendants down to max_depth levels below it, or the roots
+    of the simulation and max_depth levels below them when root is None.
+    Parents come before children. Each level is one range of
+    ix_message_simulation_id_depth_path_key, so the cost follows the size of the result.
+    """
+    first = 0 if root is None else root.depth + 1
+    statement = select(Message).where(
+        Message.simulation_id == simulation_id,
+        Message.depth.in_(range(first, (root.depth if root else 0) + max_depth + 1)),
+    )
+    if root is not None:
+        statement = statement.where(subtree_range(subtree_prefix(root)))
+    messages = list(session.exec(statement.order_by(Message.depth, Message.id)).all())
+    return [root, *messages] if root is not None else messages
+
+
+def count_children(session: Session, parent_ids: list[int]) -> dict[int, int]:
+    """Number of direct children of each message; messages without children are absent."""
+    if not parent_ids:
+        return {}
+    statement = (
+        select(Message.parent_id, func.count(Message.id))
+        .where(Message.parent_id.in_(parent_ids))
+        .group_by(Message.parent_id)
+    )
+    return dict(session.exec(statement).all())
+
+
 def get_tree(session: Session, tree_id: int) -> list[Message]:
     """
-    Retrieve all messages for a specific tree_id in hierarchical chronological order.
+    Retrieve all messages for a specific tree_id in chronological order.
     Includes both selected and unselected messages.
 
     The tree alternates between legal and client sides:
@@ -111,39 +255,18 @@ def get_tree(session: Session, tree_id: int) -> list[Message]:
     - Then branches with multiple options (usually 3 per side)
     """
     # Fetch all messages for the tree (no selected filter)
-    statement = select(Message).where(Message.simulation_id == tree_id)
-    messages = session.exec(statement).all()
-
-    if not messages:
-        return []
-
-    # Build mapping: parent_id → list of children
-    children_map: dict[int | None, list[Message]] = {}
-    for msg in messages:
-        children_map.setdefault(msg.parent_id, []).append(msg)
-
-    # Sort children by creation order (id ascending)
-    for child_list in children_map.values():
-        child_list.sort(key=lambda m: m.id)
-
-    ordered: list[Message] = []
+    statement = select(Message).where(Message.simulation_id == tree_id).order_by(Message.id)
+    return list(session.exec(statement).all())
 
-    def dfs(parent_id: int | None = None):
-        """
-        Depth-first traversal from root down, preserving order.
-        Each branch is fully explored before moving to the next.
-        """
-        for msg in children_map.get(parent_id, []):
-            ordered.append(msg)
-            dfs(msg.id)
 
-    # Start traversal from root(s)
-    dfs(None)
-
-    # Optional: sort by id to ensure chronological order (in case of multiple roots)
-    ordered.sort(key=lambda m: m.id)
-
-    return ordered
+def get_tree_rows(session: Session, tree_id: int) -> list[TreeRow]:
+    """The columns app.core.tree_json needs for every message of a tree, ordered by id."""
+    statement = (
+        select(Message.id, Message.parent_id, Message.role, Message.content)
+        .where(Message.simulation_id == tree_id)
+        .order_by(Message.id)
+    )
+    return [TreeRow(*row) for row in session.exec(statement)]
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -202,7 +325,7 @@ def get_selected_messages_between(
 
     statement = (
         select(Message)
-        .where(Message.selected == True)
+        .where(Message.selected.is_(True))
         .where(Message.id >= start_id)
         .where(Message.id <= end_id)
         .order_by(Message.id)
@@ -212,62 +335,161 @@ def get_selected_messages_between(
     return messages
 
 
-def delete_messages_including_children(session: Session, message_id: int) -> bool:
+def bump_revision(session: Session, simulation_id: int) -> int:
     """
-    Delete all children of a message (not the message itself).
-    Returns True if successful, False otherwise.
+    Advance the revision of a simulation and return it. Does not commit; the row
+    lock taken here orders concurrent writers, so revisions commit in sequence.
     """
+    return session.execute(
+        update(Simulation)
+        .where(Simulation.id == simulation_id)
+        .values(revision=Simulation.revision + 1)
+        .returning(Simulation.revision)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
 
-    # Get all direct children
-    children_stmt = select(Message).where(Message.parent_id == message_id)
-    children = session.exec(children_stmt).all()
-
-    # Recursively delete all descendants of each child
-    for child in children:
-        delete_messages_including_children(session, child.id)
-        session.delete(child)  # Delete the child itself after its descendants
-    
-    try:
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        return False
 
-    return True
+def count_inserted_messages(session: Session, simulation_id: int, rows: int, depth: int) -> None:
+    """
+    Add bulk-inserted messages, the deepest `depth` levels down, to node_count and
+    max_depth of their simulation; ORM inserts are counted by the Message events.
+    Does not commit.
+    """
+    if rows:
+        session.execute(
+            update(Simulation)
+            .where(Simulation.id == simulation_id)
+            .values(node_count=Simulation.node_count + rows, max_depth=deepest(depth))
+            .execution_options(synchronize_session=False)
+        )
 
 
-def delete_messages_after_children(session: Session, message_id: int) -> int:
+def count_deleted_messages(session: Session, simulation_id: int, rows: int) -> None:
     """
-    Delete all messages in the same tree that come after the last child
-    of the given message. Keeps the message itself and its direct children.
-    Returns the number of deleted rows.
+    Remove deleted messages from node_count of their simulation and re-read
+    max_depth, a single probe of ix_message_simulation_id_depth_path. Does not commit.
     """
+    max_depth = (
+        select(func.coalesce(func.max(Message.depth), 0)).where(Message.simulation_id == simulation_id).scalar_subquery()
+    )
+    session.execute(
+        update(Simulation)
+        .where(Simulation.id == simulation_id)
+        .values(node_count=Simulation.node_count - rows, max_depth=max_depth)
+        .execution_options(synchronize_session=False)
+    )
 
-    # Get the target message
-    target = session.get(Message, message_id)
-    if not target:
-        raise ValueError(f"Message with id={message_id} not found")
 
-    # Get all direct children
-    children_stmt = select(Message).where(Message.parent_id == message_id)
-    children = session.exec(children_stmt).all()
+def record_deleted_messages(session: Session, simulation_id: int, message_ids: list[int]) -> None:
+    """Write tombstones for deleted messages and drop expired ones. Does not commit."""
+    revision = bump_revision(session, simulation_id)
+    session.execute(
+        insert(MessageTombstone),
+        [{"simulation_id": simulation_id, "message_id": message_id, "revision": revision} for message_id in message_ids],
+    )
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.TREE_CHANGES_RETENTION_SECONDS)
+    expired = session.execute(
+        delete(MessageTombstone)
+        .where(MessageTombstone.simulation_id == simulation_id, MessageTombstone.deleted_at < cutoff)
+        .returning(MessageTombstone.revision)
+    ).scalars().all()
+    if expired:
+        # Clients older than the dropped tombstones can no longer be sent a diff
+        session.execute(
+            update(Simulation)
+            .where(Simulation.id == simulation_id)
+            .values(changes_floor=max(expired))
+            .execution_options(synchronize_session=False)
+        )
 
-    # Determine the cutoff ID (highest child ID)
-    if children:
-        last_child_id = max(child.id for child in children)
-    else:
-        last_child_id = message_id
 
-    # Delete all messages in this tree with id > last_child_id
-    delete_stmt = delete(Message).where(
-        (Message.simulation_id == target.simulation_id) & (Message.id > last_child_id)
+def get_tree_changes(session: Session, simulation_id: int, since: int) -> tuple[list[Message], list[int]]:
+    """Messages inserted or updated after revision since, and ids of messages deleted after it."""
+    upserted = session.exec(
+        select(Message)
+        .where(Message.simulation_id == simulation_id, Message.revision > since)
+        .order_by(Message.depth, Message.id)
+    ).all()
+    deleted = session.exec(
+        select(MessageTombstone.message_id)
+        .where(MessageTombstone.simulation_id == simulation_id, MessageTombstone.revision > since)
+    ).all()
+    return list(upserted), list(deleted)
+
+
+def note_selected_message(session: Session, message: Message) -> None:
+    """Move the active leaf of the simulation to a newly selected, flushed message. Does not commit."""
+    session.execute(
+        update(Simulation)
+        .where(
+            Simulation.id == message.simulation_id,
+            or_(Simulation.active_leaf_depth.is_(None), Simulation.active_leaf_depth <= message.depth),
+        )
+        .values(active_leaf_id=message.id, active_leaf_depth=message.depth)
     )
 
-    result = session.exec(delete_stmt)
+
+def refresh_active_leaf(session: Session, simulation_id: int) -> None:
+    """Recompute the active leaf of a simulation from its selected messages. Does not commit."""
+    leaf = session.exec(
+        select(Message.id, Message.depth)
+        .where(Message.simulation_id == simulation_id, Message.selected.is_(True))
+        .order_by(Message.depth.desc(), Message.id.desc())
+        .limit(1)
+    ).first()
+    session.execute(
+        update(Simulation)
+        .where(Simulation.id == simulation_id)
+        .values(active_leaf_id=leaf.id if leaf else None, active_leaf_depth=leaf.depth if leaf else None)
+    )
+
+
+def delete_descendants(session: Session, message: Message, below_depth: int) -> int:
+    """
+    Delete the descendants of message deeper than below_depth with one range DELETE.
+    Does not commit; returns the number of deleted messages.
+    """
+    statement = (
+        delete(Message)
+        .where(subtree_range(subtree_prefix(message)), Message.depth > below_depth)
+        .returning(Message.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = session.execute(statement).scalars().all()
+    if deleted:
+        record_deleted_messages(session, message.simulation_id, deleted)
+        count_deleted_messages(session, message.simulation_id, len(deleted))
+        # The active leaf may have been in the deleted branch
+        refresh_active_leaf(session, message.simulation_id)
+    return len(deleted)
+
+
+def delete_messages_including_children(session: Session, message_id: int) -> int:
+    """
+    Delete all children of a message and their descendants (not the message itself).
+    Returns the number of deleted messages.
+    """
+    message = session.get(Message, message_id)
+    if not message:
+        return 0
+    deleted = delete_descendants(session, message, message.depth)
     session.commit()
+    return deleted
 
-    return result.rowcount or 0
 
+def delete_messages_after_children(session: Session, message_id: int) -> int:
+    """
+    Delete everything below the direct children of the given message.
+    Keeps the message itself and its direct children; other branches are untouched.
+    Returns the number of deleted rows.
+    """
+    target = session.get(Message, message_id)
+    if not target:
+        raise ValueError(f"Message with id={message_id} not found")
+
+    deleted = delete_descendants(session, target, target.depth + 1)
+    session.commit()
+    return deleted
 
 
 def get_message_children(db: Session, message_id: int) -> List[Message]:
@@ -312,7 +534,7 @@ def update_message_selected(db: Session, message_id: int) -> Message:
         else Message.parent_id.is_(None),
         Message.id != message_id,
         Message.simulation_id == message.simulation_id,
-        Message.selected == True
+        Message.selected.is_(True),
     )
     selected_sibling = db.exec(sibling_query).first()
     if selected_sibling:
@@ -324,11 +546,161 @@ def update_message_selected(db: Session, message_id: int) -> Message:
     # ✅ Passed all checks
     message.selected = True
     db.add(message)
+    note_selected_message(db, message)
     db.commit()
     db.refresh(message)
     return message
 
 
+def reserve_staged_tree(
+    session: Session, simulation_id: int, message_id: int, depth: int, branching: int, budget: int, ttl_seconds: int
+) -> StagedTree | None:
+    """
+    Claim a pending slot for a speculative tree continuing from message_id.
+    Expired rows are dropped and, when the simulation is at its budget, the oldest
+    ready ones are evicted; in-flight generations are never evicted. Returns None
+    when no slot is free or the tree is already staged or being generated.
+    """
+    now = datetime.utcnow()
+    session.exec(delete(StagedTree).where(StagedTree.expires_at < now))
+    staged = session.exec(
+        select(StagedTree).where(StagedTree.simulation_id == simulation_id).order_by(StagedTree.created_at)
+    ).all()
+    excess = len(staged) - budget + 1
+    for row in staged:
+        if excess <= 0:
+            break
+        if row.status == "ready":
+            session.delete(row)
+            excess -= 1
+    if excess > 0:
+        session.commit()
+        return None
+
+    row = StagedTree(
+        simulation_id=simulation_id,
+        message_id=message_id,
+        depth=depth,
+        branching=branching,
+        expires_at=now + timedelta(seconds=ttl_seconds),
+    )
+    session.add(row)
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        return None
+    session.refresh(row)
+    return row
+
+
+def mark_staged_tree_ready(session: Session, staged_id: int, tree: str) -> bool:
+    """Store the generated tree JSON; False if the row was evicted meanwhile."""
+    row = session.get(StagedTree, staged_id)
+    if row is None:
+        return False
+    row.status = "ready"
+    row.tree = tree
+    session.add(row)
+    session.commit()
+    return True
+
+
+def take_staged_tree(session: Session, message_id: int, depth: int, branching: int) -> str | None:
+    """Remove and return the ready, unexpired tree staged for message_id, if any."""
+    row = session.exec(
+        select(StagedTree).where(
+            StagedTree.message_id == message_id,
+            StagedTree.depth == depth,
+            StagedTree.branching == branching,
+            StagedTree.status == "ready",
+        )
+    ).first()
+    if row is None:
+        return None
+    tree = row.tree if row.expires_at >= datetime.utcnow() else None
+    session.delete(row)
+    session.commit()
+    return tree
+
+
+def discard_staged_trees(session: Session, message_id: int) -> int:
+    """Drop every tree staged for message_id."""
+    result = session.exec(delete(StagedTree).where(StagedTree.message_id == message_id))
+    session.commit()
+    return result.rowcount or 0
+
+
+def evict_staged_trees(session: Session, simulation_id: int, keep_message_ids: list[int]) -> int:
+    """Drop the trees staged for messages of the simulation the user moved away from."""
+    result = session.exec(
+        delete(StagedTree).where(
+            StagedTree.simulation_id == simulation_id,
+            StagedTree.message_id.not_in(keep_message_ids),
+        )
+    )
+    session.commit()
+    return result.rowcount or 0
+
+
+def case_page(limit: int, before: tuple[datetime, int] | None = None, columns: tuple = (Case.id,)):
+    """
+    The next `limit` cases, most recently modified first, after
+    the (last_modified, id) key `before`. Read from ix_case_last_modified_id, so
+    the cost does not depend on how far into the list the page is.
+    """
+    statement = select(*columns)
+    if before is not None:
+        statement = statement.where(tuple_(Case.last_modified, Case.id) < tuple_(*before))
+    statement = statement.order_by(Case.last_modified.desc(), Case.id.desc())
+    return statement.limit(limit)
+
+
+def list_cases(
+    session: Session, limit: int, before: tuple[datetime, int] | None = None, include_details: bool = False
+) -> list[dict[str, Any]]:
+    """
+    One page of cases with the number of simulations of each, read from the
+    simulation_count column. The context and summary texts are only read with
+    include_details.
+    """
+    columns = (Case.id, Case.name, Case.party_a, Case.party_b, Case.last_modified,
+               Case.summary_status, Case.summary_version, Case.simulation_count.label("scenario_count"))
+    if include_details:
+        columns += (Case.context, Case.summary)
+    return [dict(row._mapping) for row in session.exec(case_page(limit, before, columns)).all()]
+
+
+def repair_counters(session: Session) -> tuple[int, int]:
+    """
+    Recompute Case.simulation_count and Simulation.node_count/max_depth from the
+    rows they count, fixing only the ones that drifted. Returns the number of
+    cases and simulations corrected; does not commit.
+    """
+    simulation_count = (
+        select(func.count(Simulation.id)).where(Simulation.case_id == Case.id).scalar_subquery()
+    )
+    cases = session.execute(
+        update(Case)
+        .where(Case.simulation_count != simulation_count)
+        .values(simulation_count=simulation_count)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    node_count = select(func.count(Message.id)).where(Message.simulation_id == Simulation.id).scalar_subquery()
+    max_depth = (
+        select(func.coalesce(func.max(Message.depth), 0)).where(Message.simulation_id == Simulation.id).scalar_subquery()
+    )
+    simulations = session.execute(
+        update(Simulation)
+        .where(or_(Simulation.node_count != node_count, Simulation.max_depth != max_depth))
+        .values(node_count=node_count, max_depth=max_depth)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if cases:
+        bump_change_counter(session.connection(), "cases")
+    return cases or 0, simulations or 0
+
+
 def create_simulation(*, session: Session, simulation_create: SimulationCreate) -> Simulation:
     """Create a new simulation."""
     # Check if case exists
@@ -0,0 +1,306 @@
+"""
+Local OpenAI-compatible stand-in for the Boson AI API.
+
+Serves canned answers for everything the backend asks Boson for, so the
+generation and audio paths can be benchmarked without hackathon.boson.ai:
+
+- chat completions, plain and streamed: `scenarios_tree` JSON for tree prompts,
+  `<think>`-prefixed text for summaries, a transcript for the audio
+  understanding model and base64 WAV audio for the audio generation model
+- `audio.speech`: 16-bit mono 24 kHz PCM or WAV
+
+Run it and point the backend at it:
+
+    MOCK_BOSON_LATENCY_MEDIAN=20 python -m app.mock_boson --port 8090
+    BOSON_BASE_URL=http://localhost:8090/v1 BOSON_API_KEY=mock fastapi run app/main.py
+
+Latency, error, malformed-JSON and truncation behaviour is configured with the
+MOCK_BOSON_* environment variables below.
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import math
+import random
+import re
+import struct
+import time
+import uuid
+import wave
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+SAMPLE_RATE = 24000
+
+
+class MockBosonSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="MOCK_BOSON_", extra="ignore")
+
+    # Response latency in seconds, drawn from a log-normal distribution around
+    # the median; per-model medians override the default one
+    LATENCY_MEDIAN: float = 1.0
+    LATENCY_SIGMA: float = 0.5
+    MODEL_LATENCY_MEDIANS: dict[str, float] = {}
+    # Streaming: characters per chunk and seconds between chunks
+    STREAM_CHUNK_CHARS: int = 16
+    STREAM_CHUNK_INTERVAL: float = 0.02
+
+    # Fault injection, as probabilities per request
+    ERROR_RATE: float = 0.0
+    ERROR_STATUS_CODES: list[int] = [500, 502, 503, 429]
+    MALFORMED_JSON_RATE: float = 0.0
+    TRUNCATION_RATE: float = 0.0
+
+    # Shape of the canned dialogue tree when the prompt does not specify it
+    TREE_DEPTH: int = 3
+    TREE_BRANCHING: int = 3
+
+    # Length of generated speech per input character
+    SPEECH_SECONDS_PER_CHAR: float = 0.06
+
+    # Fix for reproducible runs
+    SEED: int | None = None
+
+
+mock_settings = MockBosonSettings()
+rng = random.Random(mock_settings.SEED)
+
+app = FastAPI(title="Mock Boson AI")
+
+
+def sample_latency(model: str) -> float:
+    median = mock_settings.MODEL_LATENCY_MEDIANS.get(model, mock_settings.LATENCY_MEDIAN)
+    if median <= 0:
+        return 0.0
+    return rng.lognormvariate(math.log(median), mock_settings.LATENCY_SIGMA)
+
+
+def roll(rate: float) -> bool:
+    return rate > 0 and rng.random() < rate
+
+
+def error_response() -> JSONResponse:
+    status_code = rng.choice(mock_settings.ERROR_STATUS_CODES)
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": f"Injected error {status_code}", "type": "server_error"}},
+    )
+
+
+def build_tree(
+    level: int = 1, speaker: str = "A", path: str = "1", depth: int = 3, branching: int = 3
+) -> dict[str, Any]:
+    other = "B" if speaker == "A" else "A"
+    return {
+        "speaker": speaker,
+        "line": f"Mock line {path} from {speaker}: we should settle this before it goes to court.",
+        "level": level,
+        "reflects_personality": f"Canned justification for node {path}.",
+        "responses": [
+            build_tree(level + 1, other, f"{path}.{i + 1}", depth, branching)
+            for i in range(branching)
+        ] if level < depth else [],
+    }
+
+
+def _prompt_int(pattern: str, text: str, default: int) -> int:
+    match = re.search(pattern, text)
+    return int(match[1]) if match else default
+
+
+def build_answer_tree(body: dict[str, Any]) -> dict[str, Any]:
+    """A full tree, or the responses of one node, in the shape the prompt asks for."""
+    messages = body.get("messages") or [{}]
+    system = str(messages[0].get("content") or "")
+    prompt = str(messages[-1].get("content") or "")
+
+    branch = re.search(r'exactly (\d+) more Level (\d+) responses from "([AB])"', prompt)
+    if branch is not None:
+        count, level, speaker = int(branch[1]), int(branch[2]), branch[3]
+        depth = _prompt_int(r"down to Level (\d+)", prompt, level)
+        branching = _prompt_int(r"exactly (\d+) nested responses", prompt, mock_settings.TREE_BRANCHING)
+        return {
+            "responses": [
+                build_tree(level, speaker, f"r{level}.{i + 1}", depth, branching)
+                for i in range(count)
+            ]
+        }
+
+    depth = _prompt_int(r"exactly (\d+) levels deep", system, mock_settings.TREE_DEPTH)
+    branching = _prompt_int(r"Level 2: (\d+) possible responses", system, mock_settings.TREE_BRANCHING)
+    return {"scenarios_tree": build_tree(depth=depth, branching=branching)}
+
+
+def corrupt_json(text: str) -> str:
+    """Break JSON the way the thinking model does: fences, trailing commas, cut-off tail."""
+    kind = rng.choice(["fence", "trailing_comma", "unclosed"])
+    if kind == "fence":
+        return f"```json\n{text}\n```"
+    if kind == "trailing_comma":
+        return text.replace("[]", "[],", 1).replace("}]", "},]", 1)
+    return text[: text.rfind("}")]
+
+
+def pcm_tone(seconds: float) -> bytes:
+    frames = max(1, int(seconds * SAMPLE_RATE))
+    return b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)))
+        for i in range(frames)
+    )
+
+
+def wav_bytes(pcm: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def is_tree_prompt(body: dict[str, Any]) -> bool:
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return True
+    return any(
+        isinstance(m.get("content"), str) and "scenarios_tree" in m["content"]
+        for m in body.get("messages", [])
+    )
+
+
+def completion_content(body: dict[str, Any]) -> tuple[str, str]:
+    """Return the canned answer for a chat completion and its finish reason."""
+    model = body.get("model", "")
+    if "audio-understanding" in model:
+        content = "This is a mock transcript of the uploaded audio."
+    elif is_tree_prompt(body):
+        content = json.dumps(build_answer_tree(body), indent=2)
+        if roll(mock_settings.MALFORMED_JSON_RATE):
+            content = corrupt_json(content)
+    else:
+        content = (
+            "<think>\n\n</think>\n\n"
+            "Mock summary: the parties dispute the contract terms and both want to avoid litigation."
+        )
+
+    if roll(mock_settings.TRUNCATION_RATE):
+        return content[: rng.randint(len(content) // 4, len(content) * 3 // 4)], "length"
+    return content, "stop"
+
+
+def completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+
+@app.get("/v1/models")
+async def list_models() -> dict[str, Any]:
+    models = [
+        "Qwen3-32B-thinking-Hackathon",
+        "higgs-audio-generation-Hackathon",
+        "higgs-audio-understanding-Hackathon",
+    ]
+    return {
+        "object": "list",
+        "data": [{"id": m, "object": "model", "created": 0, "owned_by": "mock"} for m in models],
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Response:
+    body = await request.json()
+    model = body.get("model", "")
+    await asyncio.sleep(sample_latency(model))
+    if roll(mock_settings.ERROR_RATE):
+        return error_response()
+
+    content, finish_reason = completion_content(body)
+    if body.get("stream"):
+        return StreamingResponse(
+            stream_chunks(model, content, finish_reason), media_type="text/event-stream"
+        )
+
+    message: dict[str, Any] = {"role": "assistant", "content": content}
+    if "audio-generation" in model and "audio" in (body.get("modalities") or []):
+        seconds = mock_settings.SPEECH_SECONDS_PER_CHAR * len(json.dumps(body.get("messages", [])))
+        message["audio"] = {
+            "id": f"audio-{uuid.uuid4().hex[:12]}",
+            "data": base64.b64encode(wav_bytes(pcm_tone(min(seconds, 30.0)))).decode("utf-8"),
+            "expires_at": int(time.time()) + 3600,
+            "transcript": content,
+        }
+    return JSONResponse(
+        {
+            "id": completion_id(),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": len(json.dumps(body.get("messages", []))) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(json.dumps(body.get("messages", []))) + len(content)) // 4,
+            },
+        }
+    )
+
+
+async def stream_chunks(model: str, content: str, finish_reason: str) -> AsyncIterator[str]:
+    cid = completion_id()
+    created = int(time.time())
+
+    def chunk(delta: dict[str, Any], finish: str | None = None) -> str:
+        data = {
+            "id": cid,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    size = max(1, mock_settings.STREAM_CHUNK_CHARS)
+    for start in range(0, len(content), size):
+        yield chunk({"content": content[start : start + size]})
+        if mock_settings.STREAM_CHUNK_INTERVAL > 0:
+            await asyncio.sleep(mock_settings.STREAM_CHUNK_INTERVAL)
+    yield chunk({}, finish_reason)
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/audio/speech")
+async def audio_speech(request: Request) -> Response:
+    body = await request.json()
+    model = body.get("model", "")
+    await asyncio.sleep(sample_latency(model))
+    if roll(mock_settings.ERROR_RATE):
+        return error_response()
+
+    text = body.get("input", "")
+    pcm = pcm_tone(min(mock_settings.SPEECH_SECONDS_PER_CHAR * len(text), 60.0))
+    if roll(mock_settings.TRUNCATION_RATE):
+        pcm = pcm[: len(pcm) // 2 // 2 * 2]
+    if body.get("response_format", "wav") == "pcm":
+        return Response(content=pcm, media_type="audio/pcm")
+    return Response(content=wav_bytes(pcm), media_type="audio/wav")
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the mock Boson AI server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("app.mock_boson:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
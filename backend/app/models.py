@@ -2,6 +2,22 @@ import uuid
 from datetime import datetime
 
 from pydantic import EmailStr
+from sqlalchemy import (
+    DDL,
+    Index,
+    String,
+    UniqueConstraint,
+    case,
+    event,
+    func,
+    insert,
+    inspect,
+    literal_column,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.orm import object_session
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -14,13 +30,47 @@ class UserBase(SQLModel):
 
 
 class Case(SQLModel, table=True):
+    # Keyset pagination of the case list, most recently modified first
+    __table_args__ = (Index("ix_case_last_modified_id", "last_modified", "id"),)
     id: int = Field(default=None, primary_key=True)
     name: str = Field(default=None)
     party_a: str = Field(default=None)
     party_b: str = Field(default=None)
     context: str = Field(default=None)
     summary: str = Field(default=None)
+    summary_status: str = Field(default="ready", max_length=16)  # pending | ready | failed
+    summary_version: int = Field(default=0)  # bumped on every context edit
     last_modified: datetime = Field(default_factory=datetime.utcnow)  # <-- new field
+    # Maintained on simulation insert and delete (see _count_inserted_simulation); repair
+    # with python -m app.repair_counters
+    simulation_count: int = Field(default=0)
+
+
+class ChangeCounter(SQLModel, table=True):
+    # Version of a whole collection for conditional GETs: "cases" changes with
+    # everything GET /cases shows (see bump_change_counter)
+    name: str = Field(primary_key=True, max_length=32)
+    value: int = Field(default=0)
+
+
+event.listen(ChangeCounter.__table__, "after_create", DDL("INSERT INTO changecounter (name, value) VALUES ('cases', 0)"))
+
+
+def bump_change_counter(connection, name: str) -> None:
+    """Advance a ChangeCounter within the caller's transaction, creating it if missing."""
+    bumped = connection.execute(
+        update(ChangeCounter).where(ChangeCounter.name == name).values(value=ChangeCounter.value + 1)
+    )
+    if bumped.rowcount == 0:
+        connection.execute(insert(ChangeCounter).values(name=name, value=1))
+
+
+@event.listens_for(Case, "after_insert")
+@event.listens_for(Case, "after_update")
+@event.listens_for(Case, "after_delete")
+def _bump_case_list(_mapper, connection, _target: Case) -> None:
+    """Every ORM write of a case changes the case list."""
+    bump_change_counter(connection, "cases")
 
 
 class Simulation(SQLModel, table=True):
@@ -28,22 +78,161 @@ class Simulation(SQLModel, table=True):
     headline: str = Field(default=None)
     brief: str = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    case_id: int = Field(foreign_key="case.id", nullable=False, ondelete="CASCADE")
+    case_id: int = Field(foreign_key="case.id", nullable=False, ondelete="CASCADE", index=True)
+    # Deepest selected message, i.e. the current position in the negotiation.
+    # Kept up to date by the crud writers; no foreign key, as message references simulation
+    active_leaf_id: int | None = Field(default=None)
+    active_leaf_depth: int | None = Field(default=None)
+    # Bumped by every message insert, update and delete (see crud.bump_revision);
+    # /trees/{id}/changes can diff from any revision since changes_floor
+    revision: int = Field(default=0)
+    changes_floor: int = Field(default=0)
+    # Number of messages and depth of the deepest one, maintained with the revision
+    # by every message insert and delete; repair with python -m app.repair_counters
+    node_count: int = Field(default=0)
+    max_depth: int = Field(default=0)
 
 class Message(SQLModel, table=True):
+    # The selected messages of a simulation, deepest first (its active path). The
+    # predicates are what Message.selected.is_(True) compiles to, so queries match them
+    __table_args__ = (
+        Index("ix_message_selected", "simulation_id", "depth", postgresql_where=text("selected IS true"), sqlite_where=text("selected IS 1")),
+        Index("ix_message_simulation_id_revision", "simulation_id", "revision"),
+    )
     id: int = Field(default=None, primary_key=True)
     content: str = Field(default=None)
     role: str = Field(default=None) #todo enum
     selected: bool = Field(default=False)
+    simulation_id: int = Field(foreign_key="simulation.id", nullable=False, ondelete="CASCADE", index=True)
+    parent_id: int = Field(foreign_key="message.id", nullable=True, index=True)
+    # Ancestor ids from the root down to the parent, each followed by "/" ("" for
+    # roots). Byte-ordered so a subtree is one range of message_path_key, see crud.subtree_range
+    path: str = Field(default="", sa_type=String().with_variant(String(collation="C"), "postgresql"))
+    depth: int = Field(default=0)  # number of ancestors
+    revision: int = Field(default=0)  # simulation revision of the last insert or update
+
+
+# Paths grow with depth and a Postgres btree entry is limited to about 2.7KB, so
+# only a bounded prefix of them is indexed; deeper subtrees are filtered on the
+# full path within one key, see crud.subtree_range
+PATH_KEY_LENGTH = 1024
+# Literal arguments, so the planners match it against the index expression
+message_path_key = func.substr(Message.path, literal_column("1"), literal_column(str(PATH_KEY_LENGTH)))
+Index("ix_message_path_key", message_path_key)
+# Levels of a subtree, see crud.get_tree_window
+Index("ix_message_simulation_id_depth_path_key", Message.simulation_id, Message.depth, message_path_key)
+
+
+@event.listens_for(Message, "before_insert")
+def _set_message_ancestry(_mapper, connection, target: Message) -> None:
+    """Derive path and depth from the parent for every ORM insert."""
+    if target.parent_id is None:
+        target.path, target.depth = "", 0
+        return
+    parent = connection.execute(
+        select(Message.path, Message.depth).where(Message.id == target.parent_id)
+    ).first()
+    if parent is not None:
+        target.path = f"{parent.path}{target.parent_id}/"
+        target.depth = parent.depth + 1
+
+
+def deepest(depth: int):
+    """max_depth after adding messages at most `depth` deep, as an UPDATE value."""
+    return case((Simulation.max_depth < depth, depth), else_=Simulation.max_depth)
+
+
+@event.listens_for(Message, "before_insert")
+@event.listens_for(Message, "before_update")
+def _stamp_message_revision(_mapper, connection, target: Message) -> None:
+    """
+    Give every ORM insert and actual update of a message a new simulation
+    revision; inserts also count towards node_count and max_depth.
+    """
+    inserting = not inspect(target).has_identity
+    if not inserting and not object_session(target).is_modified(target, include_collections=False):
+        return
+    values = {"revision": Simulation.revision + 1}
+    if inserting:
+        values.update(node_count=Simulation.node_count + 1, max_depth=deepest(target.depth))
+    target.revision = connection.execute(
+        update(Simulation)
+        .where(Simulation.id == target.simulation_id)
+        .values(**values)
+        .returning(Simulation.revision)
+    ).scalar_one()
+
+
+def _count_simulation(connection, target: Simulation, step: int) -> None:
+    connection.execute(
+        update(Case).where(Case.id == target.case_id).values(simulation_count=Case.simulation_count + step)
+    )
+    bump_change_counter(connection, "cases")
+
+
+@event.listens_for(Simulation, "after_insert")
+def _count_inserted_simulation(_mapper, connection, target: Simulation) -> None:
+    """Keep Case.simulation_count in step with ORM inserts and deletes of simulations."""
+    _count_simulation(connection, target, 1)
+
+
+@event.listens_for(Simulation, "after_delete")
+def _count_deleted_simulation(_mapper, connection, target: Simulation) -> None:
+    _count_simulation(connection, target, -1)
+
+
+class MessageTombstone(SQLModel, table=True):
+    # A deleted message, kept for /trees/{id}/changes until TREE_CHANGES_RETENTION_SECONDS
+    __table_args__ = (Index("ix_messagetombstone_simulation_id_revision", "simulation_id", "revision"),)
+    id: int = Field(default=None, primary_key=True)
     simulation_id: int = Field(foreign_key="simulation.id", nullable=False, ondelete="CASCADE")
-    parent_id: int = Field(foreign_key="message.id", nullable=True)
+    message_id: int
+    revision: int
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
 
 class Bookmark(SQLModel, table=True):
+    __table_args__ = (Index("ix_bookmark_simulation_id_message_id", "simulation_id", "message_id"),)
     id: int = Field(default=None, primary_key=True)
     simulation_id: int = Field(foreign_key="simulation.id", nullable=False, ondelete="CASCADE")
-    message_id: int = Field(foreign_key="message.id", nullable=False, ondelete="CASCADE")
+    message_id: int = Field(foreign_key="message.id", nullable=False, ondelete="CASCADE", index=True)
     name: str = Field(default=None, max_length=255)
 
+class HistorySummary(SQLModel, table=True):
+    # Running summary of the path from the root down to message_id (inclusive)
+    message_id: int = Field(primary_key=True, foreign_key="message.id", ondelete="CASCADE")
+    turn_count: int
+    summary: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class StagedTree(SQLModel, table=True):
+    # Tree generated speculatively for continuing from message_id, not saved yet
+    __table_args__ = (UniqueConstraint("message_id", "depth", "branching"),)
+    id: int = Field(default=None, primary_key=True)
+    simulation_id: int = Field(foreign_key="simulation.id", nullable=False, ondelete="CASCADE", index=True)
+    message_id: int = Field(foreign_key="message.id", nullable=False, ondelete="CASCADE")
+    depth: int
+    branching: int
+    status: str = Field(default="pending", max_length=16)  # pending | ready
+    tree: str | None = Field(default=None)  # scenarios_tree JSON once ready
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
+
+class LLMCacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True, max_length=64)  # sha256 of model, messages and params
+    model: str = Field(max_length=255)
+    response: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    expires_at: datetime = Field(index=True)
+
+class GenerationLease(SQLModel, table=True):
+    key: str = Field(primary_key=True, max_length=255)
+    owner: str = Field(max_length=64)
+    status: str = Field(default="running", max_length=16)  # running | done | failed
+    result: str | None = Field(default=None)  # JSON result once done
+    error: str | None = Field(default=None)  # JSON status_code, detail and headers once failed
+    expires_at: datetime = Field(index=True)
+
 class Document(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
     file_name: str = Field(default=None)
@@ -0,0 +1,30 @@
+"""
+Recompute the denormalized counters (Case.simulation_count, Simulation.node_count
+and Simulation.max_depth) from the rows they count:
+
+    python -m app.repair_counters
+
+They are maintained by every write through the ORM and app.crud, so this is
+only needed after writing to the tables directly.
+"""
+import logging
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.crud import repair_counters
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("Recomputing case and simulation counters")
+    with Session(engine) as session:
+        cases, simulations = repair_counters(session)
+        session.commit()
+    logger.info(f"Corrected {cases} cases and {simulations} simulations")
+
+
+if __name__ == "__main__":
+    main()
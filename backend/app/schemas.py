@@ -23,6 +23,11 @@ class TreeNode(BaseModel):
 class ScenariosTreeResponse(BaseModel):
     scenarios_tree: TreeNode
 
+class TreeWriteStats(BaseModel):
+    rows: int  # messages inserted
+    levels: int  # tree levels written, one multi-row INSERT each
+    seconds: float
+
 class TreeResponse(BaseModel):
     tree_id: Optional[int] = None
     case_id: int
@@ -72,6 +77,28 @@ class CaseWithTreeCount(BaseModel):
     summary: str
     last_modified: datetime
     scenario_count: int
+    summary_status: str = "ready"
+    summary_version: int = 0
+
+
+class CaseListItem(BaseModel):
+    """A row of GET /cases; context and summary only with include_details."""
+    id: int
+    name: str
+    party_a: str | None = None
+    party_b: str | None = None
+    last_modified: datetime
+    scenario_count: int
+    summary_status: str = "ready"
+    summary_version: int = 0
+    context: str | None = None
+    summary: str | None = None
+
+
+class CaseSummaryResponse(BaseModel):
+    summary: str
+    summary_status: str
+    summary_version: int
 
 
 class SimulationCreate(BaseModel):
@@ -88,6 +115,49 @@ class SimulationResponse(BaseModel):
     case_id: int
 
 
+class ActiveLeafResponse(BaseModel):
+    simulation_id: int
+    message_id: int | None  # None while the simulation has no selected message
+    depth: int | None
+
+
+class LazyTreeNode(BaseModel):
+    id: int
+    parent_id: int | None
+    role: str | None
+    content: str | None
+    selected: bool
+    depth: int
+    child_count: int
+    has_more: bool  # has children that were not loaded; expand it to get them
+    children: list["LazyTreeNode"] = []
+
+
+class LazyTreeResponse(BaseModel):
+    simulation_id: int
+    root_id: int | None  # None when loading from the top of the simulation
+    max_depth: int
+    nodes: list[LazyTreeNode]
+
+
+class TreeNodeChange(BaseModel):
+    id: int
+    parent_id: int | None
+    role: str | None
+    content: str | None
+    selected: bool
+    depth: int
+    revision: int
+
+
+class TreeChangesResponse(BaseModel):
+    simulation_id: int
+    revision: int  # pass as `since` on the next poll
+    reset: bool  # `since` is too old to diff from; reload the whole tree
+    upserted: list[TreeNodeChange]  # parents before children
+    deleted: list[int]
+
+
 class BookmarkCreate(BaseModel):
     simulation_id: int
     message_id: int
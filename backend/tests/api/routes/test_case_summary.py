@@ -0,0 +1,65 @@
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.deps import get_optional_boson_client
+from app.api.routes import web_app
+from app.core.config import settings
+from app.main import app
+from app.models import Case
+from tests.utils.simulation import create_random_simulation
+
+
+@pytest.fixture
+def summaries(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    calls: list[str] = []
+
+    async def summarize(_client: object, context: str, **_: Any) -> str:
+        calls.append(context)
+        return "retried summary"
+
+    monkeypatch.setattr(web_app, "summarize_background_helper", summarize)
+    monkeypatch.setattr(settings, "CASE_SUMMARY_DEBOUNCE_SECONDS", 0.0)
+    app.dependency_overrides[get_optional_boson_client] = lambda: object()
+    yield calls
+    app.dependency_overrides.pop(get_optional_boson_client)
+
+
+def _failed_case(db: Session) -> Case:
+    case = db.get(Case, create_random_simulation(db).case_id)
+    case.summary_status = "failed"
+    db.add(case)
+    db.commit()
+    return case
+
+
+def test_failed_summary_is_retried_when_read(client: TestClient, db: Session, summaries: list[str]) -> None:
+    case = _failed_case(db)
+    url = f"{settings.API_V1_STR}/cases/{case.id}/summary"
+
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.json()["summary_status"] == "pending"
+
+    deadline = time.monotonic() + 5
+    while client.get(url).json()["summary_status"] != "ready" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.get(url).json() == {
+        "summary": "retried summary", "summary_status": "ready", "summary_version": case.summary_version
+    }
+    assert len(summaries) == 1
+
+
+def test_summary_reads_work_without_boson(client: TestClient, db: Session) -> None:
+    case = _failed_case(db)
+    app.dependency_overrides[get_optional_boson_client] = lambda: None
+    try:
+        r = client.get(f"{settings.API_V1_STR}/cases/{case.id}/summary")
+    finally:
+        app.dependency_overrides.pop(get_optional_boson_client)
+    assert r.status_code == 200
+    assert r.json()["summary_status"] == "failed"
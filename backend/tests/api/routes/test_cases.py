@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+from app.models import Case, Simulation
+from tests.utils.utils import random_lower_string
+
+
+def _cases(db: Session, count: int, start: datetime = datetime(2999, 1, 1)) -> list[Case]:
+    # Far in the future, so these are the first page whatever else is in the database
+    cases = [
+        Case(name=random_lower_string(), party_a="A", party_b="B", context='{"k": 1}', summary="s",
+             last_modified=start + timedelta(minutes=i))
+        for i in range(count)
+    ]
+    db.add_all(cases)
+    db.commit()
+    for i, case in enumerate(cases):
+        db.add_all(Simulation(headline="h", brief="b", case_id=case.id) for _ in range(i))
+    db.commit()
+    return cases
+
+
+def test_cases_are_paged_newest_first_with_counts(client: TestClient, db: Session) -> None:
+    cases = _cases(db, 5)
+    url = f"{settings.API_V1_STR}/cases"
+
+    first = client.get(url, params={"limit": 2})
+    assert first.status_code == 200
+    assert [(c["id"], c["scenario_count"]) for c in first.json()] == [(cases[4].id, 4), (cases[3].id, 3)]
+    assert "context" not in first.json()[0] and "summary" not in first.json()[0]
+
+    second = client.get(url, params={"limit": 2, "before": first.headers["x-next-cursor"]})
+    assert [(c["id"], c["scenario_count"]) for c in second.json()] == [(cases[2].id, 2), (cases[1].id, 1)]
+
+    detailed = client.get(url, params={"limit": 1, "include_details": True}).json()
+    assert detailed[0]["context"] == '{"k": 1}' and detailed[0]["summary"] == "s"
+
+
+def test_without_limit_the_first_page_is_returned(client: TestClient, db: Session) -> None:
+    cases = _cases(db, 3, start=datetime(3000, 1, 1))
+    r = client.get(f"{settings.API_V1_STR}/cases")
+    assert r.status_code == 200
+    ids = [c["id"] for c in r.json()]
+    assert ids[:3] == [c.id for c in reversed(cases)]
+    assert len(ids) == min(settings.CASES_DEFAULT_PAGE_SIZE, db.exec(select(func.count(Case.id))).one())
+
+
+def test_last_page_has_no_cursor(client: TestClient, db: Session) -> None:
+    _cases(db, 1)
+    url = f"{settings.API_V1_STR}/cases"
+    pages = 0
+    params: dict[str, str | int] = {"limit": settings.CASES_MAX_PAGE_SIZE}
+    while True:
+        r = client.get(url, params=params)
+        assert r.status_code == 200 and len(r.json()) <= settings.CASES_MAX_PAGE_SIZE
+        pages += 1
+        if "x-next-cursor" not in r.headers:
+            break
+        params["before"] = r.headers["x-next-cursor"]
+    assert pages >= 1
+
+    assert client.get(url, params={"before": "yesterday"}).status_code == 400
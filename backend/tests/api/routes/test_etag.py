@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.api.routes import web_app
+from app.core.config import settings
+from app.models import Case
+from app.schemas import SimulationCreate
+from tests.utils.simulation import create_random_simulation, full_tree
+
+
+def _revalidate(client: TestClient, url: str) -> tuple[str, int]:
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    again = client.get(url, headers={"If-None-Match": etag})
+    return etag, again.status_code
+
+
+def test_tree_reads_are_not_modified_until_the_tree_changes(client: TestClient, db: Session) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, full_tree(3, 2))
+    db.commit()
+    urls = [
+        f"{settings.API_V1_STR}/trees/{simulation.id}/messages",
+        f"{settings.API_V1_STR}/trees/{simulation.id}/nodes?max_depth=1",
+        f"{settings.API_V1_STR}/trees/{simulation.id}/messages/traversal",
+        f"{settings.API_V1_STR}/simulations/{simulation.id}",
+    ]
+    etags = {}
+    for url in urls:
+        etags[url], status = _revalidate(client, url)
+        assert status == 304
+
+    [root] = crud.get_tree_window(db, simulation.id, None, 0)
+    crud.update_message_selected(db, crud.get_message_children(db, root.id)[0].id)
+    for url in urls:
+        r = client.get(url, headers={"If-None-Match": etags[url]})
+        assert r.status_code == 200
+        assert r.headers["etag"] != etags[url]
+
+
+def test_case_reads_change_with_their_simulations(client: TestClient, db: Session) -> None:
+    simulation = create_random_simulation(db)
+    case_url = f"{settings.API_V1_STR}/cases/{simulation.case_id}"
+    list_url = f"{settings.API_V1_STR}/cases"
+    case_etag, status = _revalidate(client, case_url)
+    assert status == 304
+    list_etag, status = _revalidate(client, list_url)
+    assert status == 304
+
+    # Node counts are part of the case
+    crud.insert_message_tree(db, simulation.id, full_tree(2, 2))
+    db.commit()
+    assert client.get(case_url, headers={"If-None-Match": case_etag}).status_code == 200
+
+    # Scenario counts are part of the list, without touching last_modified
+    empty = create_random_simulation(db)
+    case = db.get(Case, empty.case_id)
+    last_modified = case.last_modified
+    list_etag = client.get(list_url).headers["etag"]
+    crud.create_simulation(
+        session=db, simulation_create=SimulationCreate(headline="h", brief="b", case_id=empty.case_id)
+    )
+    assert client.get(list_url, headers={"If-None-Match": list_etag}).status_code == 200
+    list_etag = client.get(list_url).headers["etag"]
+    r = client.delete(f"{settings.API_V1_STR}/simulations/{empty.id}")
+    assert r.status_code == 200
+    assert client.get(list_url, headers={"If-None-Match": list_etag}).status_code == 200
+    db.refresh(case)
+    assert case.last_modified == last_modified
+
+
+def test_case_list_changes_with_summaries(client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def summarize(*_: Any, **__: Any) -> str:
+        return "new summary"
+
+    monkeypatch.setattr(web_app, "summarize_background_helper", summarize)
+    case = db.get(Case, create_random_simulation(db).case_id)
+    list_url = f"{settings.API_V1_STR}/cases"
+    list_etag = client.get(list_url).headers["etag"]
+
+    asyncio.run(web_app.regenerate_case_summary(object(), case.id, case.summary_version))  # type: ignore[arg-type]
+    assert client.get(list_url, headers={"If-None-Match": list_etag}).status_code == 200
@@ -0,0 +1,53 @@
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from tests.utils.simulation import create_random_simulation, full_tree
+
+
+def _walk(nodes: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    found = []
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        found.append(node)
+        stack.extend(node["children"])
+    return found
+
+
+def test_top_of_simulation_is_depth_limited(client: TestClient, db: Session) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, full_tree(5, 3))
+    db.commit()
+
+    r = client.get(f"{settings.API_V1_STR}/trees/{simulation.id}/nodes", params={"max_depth": 1})
+    assert r.status_code == 200
+    [root] = r.json()["nodes"]
+    assert (root["depth"], root["child_count"], root["has_more"], len(root["children"])) == (0, 3, False, 3)
+    assert all(c["child_count"] == 3 and c["has_more"] and c["children"] == [] for c in root["children"])
+    assert len(_walk([root])) == 1 + 3
+
+
+def test_expand_loads_the_next_levels_of_one_node(client: TestClient, db: Session) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, full_tree(4, 2))
+    db.commit()
+    top = client.get(f"{settings.API_V1_STR}/trees/{simulation.id}/nodes", params={"max_depth": 1}).json()
+    node = top["nodes"][0]["children"][1]
+
+    expanded = client.get(f"{settings.API_V1_STR}/messages/{node['id']}/expand", params={"max_depth": 2}).json()
+    [same] = expanded["nodes"]
+    assert same["id"] == node["id"] and expanded["root_id"] == node["id"]
+    assert len(same["children"]) == 2
+    leaves = [n for n in _walk(expanded["nodes"]) if n["depth"] == 3]
+    assert len(leaves) == 4
+    assert all(n["child_count"] == 0 and not n["has_more"] for n in leaves)
+    # Nothing from the sibling branch
+    subtree = {m.id for m in crud.get_subtree(db, node["id"])} | {node["id"]}
+    assert {n["id"] for n in _walk(expanded["nodes"])} <= subtree
+
+    r = client.get(f"{settings.API_V1_STR}/trees/{simulation.id + 1}/nodes", params={"root_id": node["id"]})
+    assert r.status_code == 404
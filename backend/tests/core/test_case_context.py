@@ -0,0 +1,65 @@
+import json
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.core.case_context import CaseContextCache
+from app.models import Case
+from tests.utils.simulation import create_random_simulation
+
+
+def _context(party_a: str) -> str:
+    return json.dumps({"parties": {"party_A": {"name": party_a}, "party_B": {"name": "B"}}, "key_issues": "price"})
+
+
+def _case(db: Session, party_a: str) -> Case:
+    case = db.get(Case, create_random_simulation(db).case_id)
+    case.context = _context(party_a)
+    db.add(case)
+    db.commit()
+    return case
+
+
+def test_hits_until_the_version_changes(db: Session) -> None:
+    cache = CaseContextCache(entries=8)
+    case = _case(db, "Alice")
+
+    first = cache.get(db, case.id)
+    assert first.data["parties"]["party_A"]["name"] == "Alice"
+    assert "Party A: Alice" in first.background
+    assert cache.get(db, case.id) is first
+    assert cache.get(db, case.id, case.summary_version) is first
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1}
+
+    # An edit by another worker bumps the version
+    db.execute(
+        update(Case)
+        .where(Case.id == case.id)
+        .values(context=_context("Carol"), summary_version=Case.summary_version + 1)
+    )
+    db.commit()
+    second = cache.get(db, case.id)
+    assert second.version == first.version + 1
+    assert "Party A: Carol" in second.background
+
+    # A late writer of the old version does not win
+    cache.put(case.id, first.version, _context("Alice"))
+    assert cache.get(db, case.id) is second
+
+
+def test_missing_cases_and_eviction(db: Session) -> None:
+    cache = CaseContextCache(entries=2)
+    assert cache.get(db, 10**9) is None
+
+    cases = [_case(db, name) for name in ("A", "B", "C")]
+    for case in cases:
+        cache.get(db, case.id)
+    assert cache.stats()["entries"] == 2
+    cache.get(db, cases[0].id)
+    assert cache.stats()["misses"] == 4
+
+    malformed = _case(db, "D")
+    malformed.context = "{not json"
+    db.add(malformed)
+    db.commit()
+    assert cache.get(db, malformed.id).data == {}
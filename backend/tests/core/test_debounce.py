@@ -0,0 +1,36 @@
+import asyncio
+
+from app.core.debounce import Debouncer
+
+
+def test_burst_collapses_into_one_call() -> None:
+    calls: list[int] = []
+
+    async def run() -> None:
+        debouncer = Debouncer()
+        for i in range(5):
+            debouncer.schedule("case-1", 0.05, lambda i=i: _record(calls, i))
+            await asyncio.sleep(0.01)
+        assert debouncer.pending("case-1")
+        await asyncio.sleep(0.1)
+        assert not debouncer.pending("case-1")
+
+    asyncio.run(run())
+    assert calls == [4]
+
+
+def test_keys_are_debounced_independently() -> None:
+    calls: list[int] = []
+
+    async def run() -> None:
+        debouncer = Debouncer()
+        debouncer.schedule(1, 0.01, lambda: _record(calls, 1))
+        debouncer.schedule(2, 0.01, lambda: _record(calls, 2))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert sorted(calls) == [1, 2]
+
+
+async def _record(calls: list[int], value: int) -> None:
+    calls.append(value)
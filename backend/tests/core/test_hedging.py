@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.hedging import race_first_valid
+
+
+def _accept(value: str) -> str | None:
+    return value if value.startswith("ok") else None
+
+
+def test_race_returns_first_valid_and_cancels_losers() -> None:
+    cancelled: list[int] = []
+    delays = iter([0.2, 0.01, 0.3])
+
+    async def attempt() -> str:
+        delay = next(delays)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return f"ok-{delay}"
+
+    result = asyncio.run(race_first_valid(attempt, _accept, attempts=3, hedge_delay=0))
+    assert result == "ok-0.01"
+    assert len(cancelled) == 2
+
+
+def test_race_hedges_only_after_delay() -> None:
+    started: list[int] = []
+
+    async def attempt() -> str:
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    result = asyncio.run(race_first_valid(attempt, _accept, attempts=3, hedge_delay=1.0))
+    assert result == "ok"
+    assert len(started) == 1
+
+
+def test_race_starts_backup_when_first_is_slow() -> None:
+    delays = iter([1.0, 0.01, 0.01])
+
+    async def attempt() -> str:
+        delay = next(delays)
+        await asyncio.sleep(delay)
+        return f"ok-{delay}"
+
+    result = asyncio.run(race_first_valid(attempt, _accept, attempts=3, hedge_delay=0.05))
+    assert result == "ok-0.01"
+
+
+def test_race_replaces_invalid_responses() -> None:
+    responses = iter(["bad", "broken", "ok"])
+
+    async def attempt() -> str:
+        return next(responses)
+
+    result = asyncio.run(race_first_valid(attempt, _accept, attempts=3, hedge_delay=10.0))
+    assert result == "ok"
+
+
+def test_race_returns_none_when_all_fail() -> None:
+    async def attempt() -> str:
+        raise RuntimeError("upstream error")
+
+    assert asyncio.run(race_first_valid(attempt, _accept, attempts=3)) is None
+
+
+def test_race_stops_on_fatal_errors() -> None:
+    started: list[int] = []
+
+    async def attempt() -> str:
+        started.append(1)
+        raise KeyError("circuit open")
+
+    with pytest.raises(KeyError):
+        asyncio.run(race_first_valid(attempt, _accept, attempts=3, hedge_delay=10.0, fatal=(KeyError,)))
+    assert len(started) == 1
@@ -0,0 +1,64 @@
+import asyncio
+from collections.abc import Sequence
+
+import pytest
+from sqlmodel import Session
+
+from app.core import history
+from app.core.config import settings
+from app.crud import get_message_path
+from app.models import HistorySummary, Message
+from tests.utils.simulation import create_message_chain, create_random_simulation
+
+
+def _chain(db: Session, depth: int) -> list[Message]:
+    leaf = create_message_chain(db, create_random_simulation(db), depth)[-1]
+    return get_message_path(db, leaf.id)
+
+
+@pytest.fixture
+def fake_summaries(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+    calls: list[list[str]] = []
+
+    async def summarize(_client: object, previous: str, turns: Sequence[str]) -> str:
+        calls.append(list(turns))
+        return f"{previous}|{len(turns)}" if previous else f"{len(turns)}"
+
+    monkeypatch.setattr(history, "summarize_turns", summarize)
+    monkeypatch.setattr(settings, "HISTORY_VERBATIM_TURNS", 4)
+    monkeypatch.setattr(settings, "HISTORY_SUMMARY_CHUNK", 3)
+    return calls
+
+
+def test_short_history_is_verbatim(db: Session, fake_summaries: list[list[str]]) -> None:
+    path = _chain(db, 4)
+    text = asyncio.run(history.compact_history(None, db, path))  # type: ignore[arg-type]
+    assert text.splitlines() == [f"{m.role}: {m.content}" for m in path]
+    assert fake_summaries == []
+
+
+def test_deep_history_keeps_recent_turns_and_summarizes_the_rest(
+    db: Session, fake_summaries: list[list[str]]
+) -> None:
+    path = _chain(db, 11)
+    text = asyncio.run(history.compact_history(None, db, path))  # type: ignore[arg-type]
+
+    # 11 - 4 verbatim = 7 -> two chunks of 3 summarized, 5 turns kept
+    assert "Summary of the first 6 statements:\n3|3" in text
+    assert text.endswith("\n".join(f"{m.role}: {m.content}" for m in path[6:]))
+    assert [len(c) for c in fake_summaries] == [3, 3]
+    assert db.get(HistorySummary, path[5].id).turn_count == 6  # type: ignore[union-attr]
+
+
+def test_descendants_reuse_ancestor_summaries(
+    db: Session, fake_summaries: list[list[str]]
+) -> None:
+    path = _chain(db, 13)
+    asyncio.run(history.compact_history(None, db, path[:10]))  # type: ignore[arg-type]
+    assert len(fake_summaries) == 2
+
+    # A deeper descendant only summarizes the one new chunk
+    fake_summaries.clear()
+    text = asyncio.run(history.compact_history(None, db, path))  # type: ignore[arg-type]
+    assert fake_summaries == [[f"{m.role}: {m.content}" for m in path[6:9]]]
+    assert "Summary of the first 9 statements:\n3|3|3" in text
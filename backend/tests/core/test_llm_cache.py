@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import types
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlmodel import Session
+
+from app.core.llm_cache import LLMResponseCache, cached_completion, llm_cache
+from app.models import LLMCacheEntry
+from tests.utils.utils import random_lower_string
+
+
+def _messages() -> list[dict[str, Any]]:
+    return [{"role": "user", "content": random_lower_string()}]
+
+
+def test_key_depends_on_model_messages_and_params() -> None:
+    messages = _messages()
+    key = LLMResponseCache.make_key("m", messages, {"temperature": 0.7})
+    assert key == LLMResponseCache.make_key("m", list(messages), {"temperature": 0.7})
+    assert key != LLMResponseCache.make_key("other", messages, {"temperature": 0.7})
+    assert key != LLMResponseCache.make_key("m", messages, {"temperature": 0.2})
+    assert key != LLMResponseCache.make_key("m", _messages(), {"temperature": 0.7})
+
+
+def test_memory_then_db_hit() -> None:
+    cache = LLMResponseCache(memory_entries=8, ttl_seconds=60, db_max_entries=100)
+    key = cache.make_key("m", _messages(), {})
+    assert cache.get(key) is None
+    cache.set(key, "m", "answer")
+    assert cache.get(key) == "answer"
+    cache.clear_memory()
+    assert cache.get(key) == "answer"
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"], stats["db_hits"]) == (1, 1, 1)
+
+
+def test_async_lookups_read_the_table_off_the_event_loop() -> None:
+    cache = LLMResponseCache(memory_entries=8, ttl_seconds=60, db_max_entries=100)
+    key = cache.make_key("m", _messages(), {})
+    threads: list[int] = []
+    get = cache.get
+
+    def record(key: str) -> str | None:
+        threads.append(threading.get_ident())
+        return get(key)
+
+    cache.get = record  # type: ignore[method-assign]
+
+    async def run() -> tuple[str | None, str | None, int]:
+        await cache.aset(key, "m", "answer")
+        cache.clear_memory()
+        from_db = await cache.aget(key)
+        return from_db, await cache.aget(key), threading.get_ident()
+
+    from_db, from_memory, loop_thread = asyncio.run(run())
+    assert (from_db, from_memory) == ("answer", "answer")
+    # Only the table lookup left the event loop; the memory hit did not
+    assert len(threads) == 1 and threads[0] != loop_thread
+
+
+def test_lru_evicts_oldest_entry() -> None:
+    cache = LLMResponseCache(memory_entries=2, ttl_seconds=60, db_max_entries=100)
+    for i in range(3):
+        cache._remember(str(i), "x", datetime.utcnow() + timedelta(seconds=60))
+    assert list(cache._lru) == ["1", "2"]
+
+
+def test_expired_entry_is_a_miss(db: Session) -> None:
+    cache = LLMResponseCache(memory_entries=8, ttl_seconds=60, db_max_entries=100)
+    key = cache.make_key("m", _messages(), {})
+    db.add(
+        LLMCacheEntry(
+            key=key,
+            model="m",
+            response="stale",
+            expires_at=datetime.utcnow() - timedelta(seconds=1),
+        )
+    )
+    db.commit()
+    assert cache.get(key) is None
+
+
+def test_cached_completion_skips_upstream_on_hit_and_honours_bypass() -> None:
+    calls: list[dict[str, Any]] = []
+
+    async def create(**kwargs: Any) -> Any:
+        calls.append(kwargs)
+        message = types.SimpleNamespace(content=f"answer-{len(calls)}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    client: Any = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+    )
+    messages = _messages()
+
+    async def run(bypass: bool) -> str:
+        return await cached_completion(
+            client, model="m", messages=messages, bypass=bypass, temperature=0.7
+        )
+
+    assert asyncio.run(run(False)) == "answer-1"
+    assert asyncio.run(run(False)) == "answer-1"
+    assert asyncio.run(run(True)) == "answer-2"
+    assert asyncio.run(run(False)) == "answer-2"
+    assert len(calls) == 2
+    llm_cache.clear_memory()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import APIStatusError, AsyncOpenAI
+
+from app import mock_boson
+from app.mock_boson import app, mock_settings
+
+
+def _client() -> AsyncOpenAI:
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return AsyncOpenAI(
+        api_key="mock", base_url="http://mock/v1", http_client=http_client, max_retries=0
+    )
+
+
+def _no_latency(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mock_settings, "LATENCY_MEDIAN", 0.0)
+    monkeypatch.setattr(mock_settings, "STREAM_CHUNK_INTERVAL", 0.0)
+
+
+def test_tree_completion_is_valid_json(monkeypatch: pytest.MonkeyPatch) -> None:
+    _no_latency(monkeypatch)
+
+    async def run() -> str:
+        response = await _client().chat.completions.create(
+            model="Qwen3-32B-thinking-Hackathon",
+            messages=[{"role": "system", "content": "The root must be scenarios_tree."}],
+            response_format={"type": "json_object"},
+        )
+        return response.choices[0].message.content or ""
+
+    tree = json.loads(asyncio.run(run()))["scenarios_tree"]
+    assert tree["level"] == 1
+    assert len(tree["responses"]) == mock_settings.TREE_BRANCHING
+    assert tree["responses"][0]["speaker"] != tree["speaker"]
+
+
+def test_streamed_completion_matches_content(monkeypatch: pytest.MonkeyPatch) -> None:
+    _no_latency(monkeypatch)
+
+    async def run() -> str:
+        stream = await _client().chat.completions.create(
+            model="Qwen3-32B-thinking-Hackathon",
+            messages=[{"role": "user", "content": "Summarize."}],
+            stream=True,
+        )
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+        return "".join(parts)
+
+    content = asyncio.run(run())
+    assert content.startswith("<think>")
+    assert content.split("\n")[4].startswith("Mock summary")
+
+
+def test_injected_errors_and_truncation(monkeypatch: pytest.MonkeyPatch) -> None:
+    _no_latency(monkeypatch)
+    monkeypatch.setattr(mock_settings, "ERROR_RATE", 1.0)
+    monkeypatch.setattr(mock_settings, "ERROR_STATUS_CODES", [503])
+
+    async def failing() -> None:
+        await _client().chat.completions.create(
+            model="Qwen3-32B-thinking-Hackathon", messages=[{"role": "user", "content": "x"}]
+        )
+
+    with pytest.raises(APIStatusError) as excinfo:
+        asyncio.run(failing())
+    assert excinfo.value.status_code == 503
+
+    monkeypatch.setattr(mock_settings, "ERROR_RATE", 0.0)
+    monkeypatch.setattr(mock_settings, "TRUNCATION_RATE", 1.0)
+    content, finish_reason = mock_boson.completion_content(
+        {"model": "m", "response_format": {"type": "json_object"}}
+    )
+    assert finish_reason == "length"
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(content)
+
+
+def test_speech_returns_pcm(monkeypatch: pytest.MonkeyPatch) -> None:
+    _no_latency(monkeypatch)
+
+    async def run() -> bytes:
+        response = await _client().audio.speech.create(
+            model="higgs-audio-generation-Hackathon",
+            voice="belinda",
+            input="Hello there",
+            response_format="pcm",
+        )
+        return response.content
+
+    pcm = asyncio.run(run())
+    assert len(pcm) > 0 and len(pcm) % 2 == 0
@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.single_flight import SingleFlight, SingleFlightError
+from app.core.upstream import UpstreamUnavailableError
+from app.models import GenerationLease
+from tests.utils.utils import random_lower_string
+
+
+async def _lease_taken(db: Session, key: str) -> None:
+    """Wait until a worker holds the lease of key."""
+    while db.exec(select(GenerationLease.owner).where(GenerationLease.key == key)).first() is None:
+        await asyncio.sleep(0.01)
+
+
+def test_concurrent_duplicates_share_one_execution() -> None:
+    calls: list[int] = []
+
+    async def generate() -> dict[str, int]:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": len(calls)}
+
+    async def run() -> list[dict[str, int]]:
+        flight = SingleFlight()
+        key = random_lower_string()
+        return await asyncio.gather(*(flight.do(key, generate) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert results == [{"value": 1}] * 5
+    assert len(calls) == 1
+
+
+def test_other_worker_waits_for_the_lease_owner(db: Session) -> None:
+    calls: list[str] = []
+
+    def generate(name: str):  # type: ignore[no-untyped-def]
+        async def inner() -> str:
+            calls.append(name)
+            await asyncio.sleep(0.3)
+            return name
+
+        return inner
+
+    async def run() -> list[str]:
+        # Two SingleFlight instances stand in for two uvicorn workers
+        worker_a, worker_b = SingleFlight(), SingleFlight()
+        key = random_lower_string()
+        first = asyncio.ensure_future(worker_a.do(key, generate("a")))
+        await _lease_taken(db, key)
+        second = await worker_b.do(key, generate("b"))
+        return [await first, second]
+
+    assert asyncio.run(run()) == ["a", "a"]
+    assert calls == ["a"]
+
+
+def test_expired_lease_is_taken_over(db: Session) -> None:
+    key = random_lower_string()
+    db.add(
+        GenerationLease(
+            key=key, owner="dead-worker", expires_at=datetime.utcnow() - timedelta(seconds=1)
+        )
+    )
+    db.commit()
+
+    async def generate() -> str:
+        return "fresh"
+
+    assert asyncio.run(SingleFlight().do(key, generate)) == "fresh"
+
+
+def test_failure_is_shared_with_waiting_workers(db: Session) -> None:
+    async def fail() -> str:
+        await asyncio.sleep(0.3)
+        raise RuntimeError("upstream error")
+
+    async def never() -> str:
+        raise AssertionError("should not run")
+
+    async def run() -> None:
+        worker_a, worker_b = SingleFlight(), SingleFlight()
+        key = random_lower_string()
+        first = asyncio.ensure_future(worker_a.do(key, fail))
+        await _lease_taken(db, key)
+        with pytest.raises(SingleFlightError) as shared:
+            await worker_b.do(key, never)
+        assert shared.value.status_code == 500
+        with pytest.raises(RuntimeError):
+            await first
+
+    asyncio.run(run())
+
+
+def test_waiting_workers_get_the_status_of_an_http_failure(db: Session) -> None:
+    async def unavailable() -> str:
+        await asyncio.sleep(0.3)
+        raise UpstreamUnavailableError("Boson is overloaded", retry_after=7)
+
+    async def never() -> str:
+        raise AssertionError("should not run")
+
+    async def run() -> SingleFlightError:
+        worker_a, worker_b = SingleFlight(), SingleFlight()
+        key = random_lower_string()
+        first = asyncio.ensure_future(worker_a.do(key, unavailable))
+        await _lease_taken(db, key)
+        with pytest.raises(SingleFlightError) as shared:
+            await worker_b.do(key, never)
+        with pytest.raises(UpstreamUnavailableError):
+            await first
+        return shared.value
+
+    error = asyncio.run(run())
+    assert (error.status_code, error.detail) == (503, "Boson is overloaded")
+    assert error.headers == {"Retry-After": "7"}
+
+
+def test_request_after_the_result_was_stored_runs_again() -> None:
+    calls: list[str] = []
+
+    def generate(name: str):  # type: ignore[no-untyped-def]
+        async def inner() -> str:
+            calls.append(name)
+            return name
+
+        return inner
+
+    async def run() -> list[str]:
+        worker_a, worker_b = SingleFlight(), SingleFlight()
+        key = random_lower_string()
+        return [await worker_a.do(key, generate("a")), await worker_b.do(key, generate("b"))]
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert calls == ["a", "b"]
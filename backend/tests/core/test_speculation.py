@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlmodel import Session, select
+
+from app.api.routes import web_app
+from app.api.routes.tree_generation import TREE_BRANCHING, TREE_DEPTH
+from app.core.config import settings
+from app.crud import mark_staged_tree_ready, reserve_staged_tree
+from app.models import Message, Simulation, StagedTree
+from tests.utils.simulation import (
+    build_tree,
+    create_message_chain,
+    create_random_simulation,
+)
+
+
+@pytest.fixture
+def generations(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    calls: list[int] = []
+
+    async def generate_tree(_client: object, request: web_app.ContinueConversationRequest) -> dict[str, Any]:
+        calls.append(request.message_id)
+        return {"scenarios_tree": build_tree(depth=request.depth, branching=request.branching)}
+
+    monkeypatch.setattr(web_app, "_generate_tree", generate_tree)
+    monkeypatch.setattr(settings, "SPECULATION_DELAY_SECONDS", 0.0)
+    return calls
+
+
+def _select(db: Session, message_id: int) -> None:
+    async def run() -> None:
+        # Blocking DB work, so FastAPI must run it in the threadpool
+        assert not asyncio.iscoroutinefunction(web_app.select_message)
+        background_tasks = BackgroundTasks()
+        web_app.select_message(message_id, background_tasks, client=object(), db=db)  # type: ignore[arg-type]
+        await background_tasks()
+        while web_app.speculation_debouncer.pending(message_id):
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+
+
+def _staged(db: Session, simulation: Simulation) -> list[StagedTree]:
+    db.expire_all()
+    return list(db.exec(select(StagedTree).where(StagedTree.simulation_id == simulation.id)).all())
+
+
+def test_selected_leaf_is_staged_and_used_by_continue(db: Session, generations: list[int]) -> None:
+    simulation = create_random_simulation(db)
+    root = create_message_chain(db, simulation, 1)[0]
+    leaf = Message(content="offer", role="B", selected=False, simulation_id=simulation.id, parent_id=root.id)
+    db.add(leaf)
+    db.commit()
+    db.refresh(leaf)
+
+    _select(db, leaf.id)
+    assert generations == [leaf.id]
+    [staged] = _staged(db, simulation)
+    assert staged.message_id == leaf.id and staged.status == "ready"
+
+    request = web_app.ContinueConversationRequest(case_id=simulation.case_id, tree_id=simulation.id, message_id=leaf.id)
+    tree = asyncio.run(web_app.continue_conversation(request, client=object()))  # type: ignore[arg-type]
+
+    assert generations == [leaf.id]  # served from the staged tree
+    assert tree["scenarios_tree"]["level"] == 1
+    assert _staged(db, simulation) == []
+    children = db.exec(select(Message).where(Message.parent_id == leaf.id)).all()
+    assert len(children) == TREE_BRANCHING
+
+
+@pytest.mark.usefixtures("generations")
+def test_selecting_another_branch_evicts_staged_trees(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    first = create_message_chain(db, simulation, 1)[0]
+    _select(db, first.id)
+    assert [s.message_id for s in _staged(db, simulation)] == [first.id]
+
+    second = Message(content="reply", role="B", selected=False, simulation_id=simulation.id, parent_id=first.id)
+    db.add(second)
+    db.commit()
+    db.refresh(second)
+    _select(db, second.id)
+
+    assert [s.message_id for s in _staged(db, simulation)] == [second.id]
+
+
+def test_budget_evicts_oldest_ready_but_not_pending(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    a, b, c = create_message_chain(db, simulation, 3)
+
+    def reserve(message: Message) -> StagedTree | None:
+        return reserve_staged_tree(db, simulation.id, message.id, TREE_DEPTH, TREE_BRANCHING, budget=1, ttl_seconds=60)
+
+    first = reserve(a)
+    assert first is not None
+    assert reserve(b) is None  # the only slot is still generating
+    mark_staged_tree_ready(db, first.id, "{}")
+    assert reserve(b) is not None
+    assert reserve(b) is None  # already staged
+    assert [s.message_id for s in _staged(db, simulation)] == [b.id]
+    assert reserve(c) is None
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from app.api.routes.tree_generation import (
+    base_depth,
+    build_tree_system_message,
+    create_tree,
+)
+from app.core.config import settings
+from app.core.tree_repair import count_nodes, missing_branches
+from app.mock_boson import app as mock_app
+from app.mock_boson import mock_settings
+
+
+@pytest.fixture
+def mock_client(monkeypatch: pytest.MonkeyPatch) -> AsyncOpenAI:
+    monkeypatch.setattr(mock_settings, "LATENCY_MEDIAN", 0.0)
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    return AsyncOpenAI(
+        api_key="mock",
+        base_url="http://mock/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app)),
+        max_retries=0,
+    )
+
+
+def _levels(node: dict[str, Any]) -> int:
+    return 1 + max((_levels(child) for child in node["responses"]), default=0)
+
+
+def test_base_depth_keeps_first_call_small() -> None:
+    assert base_depth(3, 3) == 3  # 13 nodes, the classic tree in one call
+    assert base_depth(6, 3) == 3
+    assert base_depth(3, 5) == 2
+    assert base_depth(2, 5) == 2
+
+
+def test_prompt_follows_requested_shape() -> None:
+    prompt = build_tree_system_message("background", "", "goal", depth=4, branching=2)
+    assert "exactly 4 levels deep" in prompt
+    assert "Level 2: 2 possible responses" in prompt
+    assert "Level 4: For each Level 3 response, provide exactly 2 follow-up replies" in prompt
+
+
+def test_deep_tree_is_expanded_per_branch(mock_client: AsyncOpenAI) -> None:
+    tree = asyncio.run(
+        create_tree(mock_client, "background", "", "goal", depth=5, branching=2)
+    )
+    root = tree["scenarios_tree"]
+    assert _levels(root) == 5
+    assert count_nodes(root) == 1 + 2 + 4 + 8 + 16
+    assert missing_branches(root, depth=5, branching=2) == []
+
+
+def test_wide_tree_is_expanded_per_branch(mock_client: AsyncOpenAI) -> None:
+    tree = asyncio.run(
+        create_tree(mock_client, "background", "", "goal", depth=3, branching=5)
+    )
+    root = tree["scenarios_tree"]
+    assert [len(child["responses"]) for child in root["responses"]] == [5] * 5
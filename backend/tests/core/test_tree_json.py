@@ -0,0 +1,45 @@
+import json
+
+from app.core.tree_json import TreeRow, iter_tree_json
+
+
+def _decode(rows: list[TreeRow], chunk_size: int = 64) -> object:
+    return json.loads(b"".join(iter_tree_json(rows, chunk_size=chunk_size)))
+
+
+def test_rows_are_nested_in_id_order() -> None:
+    rows = [
+        TreeRow(1, None, "A", "opening"),
+        TreeRow(2, 1, "B", 'reply "one"'),
+        TreeRow(3, 1, "B", "réponse deux"),
+        TreeRow(4, 2, "A", None),
+        TreeRow(5, None, "A", "second root"),
+    ]
+    assert _decode(rows) == [
+        {
+            "id": 1,
+            "role": "A",
+            "content": "opening",
+            "children": [
+                {"id": 2, "role": "B", "content": 'reply "one"', "children": [
+                    {"id": 4, "role": "A", "content": None, "children": []},
+                ]},
+                {"id": 3, "role": "B", "content": "réponse deux", "children": []},
+            ],
+        },
+        {"id": 5, "role": "A", "content": "second root", "children": []},
+    ]
+
+
+def test_empty_and_orphaned_rows() -> None:
+    assert _decode([]) == []
+    # Messages whose parent is missing are not reachable from a root
+    assert _decode([TreeRow(7, 6, "A", "orphan")]) == []
+
+
+def test_deep_chain_does_not_recurse() -> None:
+    depth = 5000
+    rows = [TreeRow(i, i - 1 if i > 1 else None, "A", f"line {i}") for i in range(1, depth + 1)]
+    text = b"".join(iter_tree_json(rows)).decode()
+    assert text.count('"children":[') == depth
+    assert text.endswith("]}" * depth + "]")
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from app.api.routes.tree_generation import expand_tree
+from app.core.tree_repair import count_nodes, missing_branches, parse_tree
+from app.mock_boson import app as mock_app
+from app.mock_boson import mock_settings
+
+
+def _node(speaker: str, line: str, level: int, responses: list[Any]) -> dict[str, Any]:
+    return {
+        "speaker": speaker,
+        "line": line,
+        "level": level,
+        "reflects_personality": "...",
+        "responses": responses,
+    }
+
+
+def _tree() -> dict[str, Any]:
+    return {
+        "scenarios_tree": _node(
+            "A",
+            "root",
+            1,
+            [
+                _node("B", f"b{i}", 2, [_node("A", f"a{i}{j}", 3, []) for j in range(3)])
+                for i in range(3)
+            ],
+        )
+    }
+
+
+def test_think_preamble_fences_and_trailing_commas_are_repaired() -> None:
+    text = json.dumps(_tree(), indent=2).replace("[]", "[],", 1)
+    tree = parse_tree("<think>\nplanning {\n</think>\n```json\n" + text + "\n```")
+    assert tree == _tree()
+
+
+def test_truncated_response_keeps_complete_nodes() -> None:
+    text = json.dumps(_tree())
+    tree = parse_tree(text[: text.index('"a22"') - 20])
+    assert tree is not None
+    root = tree["scenarios_tree"]
+    assert count_nodes(root) == 12
+    assert missing_branches(root, depth=3, branching=3) == [((2,), 1)]
+
+
+def test_unrecoverable_response_returns_none() -> None:
+    assert parse_tree("Sorry, I cannot help with that.") is None
+    assert parse_tree('{"scenarios_tree": {"speaker": "A", "li') is None
+
+
+def test_only_missing_branches_are_regenerated(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mock_settings, "LATENCY_MEDIAN", 0.0)
+    client = AsyncOpenAI(
+        api_key="mock",
+        base_url="http://mock/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app)),
+        max_retries=0,
+    )
+    text = json.dumps(_tree())
+    tree = parse_tree(text[: text.index('"b2"') - 20])
+    assert tree is not None
+    root = tree["scenarios_tree"]
+    assert missing_branches(root, depth=3, branching=3) == [((), 1)]
+
+    async def expand() -> list[Any]:
+        return [node async for node in expand_tree(client, "system", root)]
+
+    added = asyncio.run(expand())
+    assert [node.path for node in added] == [(2,), (2, 0), (2, 1), (2, 2)]
+    assert [n["line"] for n in root["responses"][:2]] == ["b0", "b1"]
+    assert root["responses"][2]["speaker"] == "B"
+    assert count_nodes(root) == 13
+    assert missing_branches(root, depth=3, branching=3) == []
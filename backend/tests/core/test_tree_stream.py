@@ -0,0 +1,82 @@
+import json
+from typing import Any
+
+from app.core.tree_stream import TreeNodeStreamParser
+
+
+def _node(speaker: str, line: str, level: int, responses: list[Any]) -> dict[str, Any]:
+    return {
+        "speaker": speaker,
+        "line": line,
+        "level": level,
+        "reflects_personality": "...",
+        "responses": responses,
+    }
+
+
+def _tree() -> dict[str, Any]:
+    return {
+        "scenarios_tree": _node(
+            "A",
+            "root",
+            1,
+            [
+                _node("B", f"b{i}", 2, [_node("A", f"a{i}{j}", 3, []) for j in range(3)])
+                for i in range(3)
+            ],
+        )
+    }
+
+
+def _feed(text: str, step: int) -> tuple[TreeNodeStreamParser, list[Any]]:
+    parser = TreeNodeStreamParser()
+    nodes = []
+    for i in range(0, len(text), step):
+        nodes += parser.feed(text[i : i + step])
+    return parser, nodes
+
+
+def test_nodes_are_emitted_parent_first() -> None:
+    parser, nodes = _feed(json.dumps(_tree(), indent=2), step=3)
+    assert parser.done
+    assert [n.line for n in nodes][:5] == ["root", "b0", "a00", "a01", "a02"]
+    assert len(nodes) == 13
+    assert nodes[0].path == ()
+    assert nodes[-1].path == (2, 2)
+    assert nodes[-1].parent_path == (2,)
+
+
+def test_level2_node_is_emitted_before_its_children_close() -> None:
+    text = json.dumps(_tree())
+    cut = text.index('"a00"')
+    parser = TreeNodeStreamParser()
+    nodes = parser.feed(text[:cut])
+    assert [n.line for n in nodes] == ["root", "b0"]
+    assert not parser.done
+
+
+def test_think_preamble_and_fences_are_ignored() -> None:
+    text = "<think>\nmaybe {not json}\n</think>\n```json\n" + json.dumps(_tree()) + "\n```"
+    parser, nodes = _feed(text, step=1)
+    assert parser.done
+    assert len(nodes) == 13
+
+
+def test_fields_after_responses_are_still_emitted_parent_first() -> None:
+    tree = _tree()
+    level2 = tree["scenarios_tree"]["responses"][1]
+    tree["scenarios_tree"]["responses"][1] = {"responses": level2.pop("responses"), **level2}
+    _, nodes = _feed(json.dumps(tree), step=5)
+    lines = [n.line for n in nodes]
+    assert lines.index("b1") < lines.index("a10")
+    assert len(nodes) == 13
+
+
+def test_malformed_node_is_dropped_with_its_subtree() -> None:
+    tree = _tree()
+    del tree["scenarios_tree"]["responses"][0]["line"]
+    tree["scenarios_tree"]["responses"][0]["responses"][0]["level"] = "x"
+    _, nodes = _feed(json.dumps(tree), step=4)
+    lines = [n.line for n in nodes]
+    assert "a00" not in lines
+    assert len(nodes) == 13 - 4
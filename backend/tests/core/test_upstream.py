@@ -0,0 +1,194 @@
+import asyncio
+import json
+import types
+from typing import Any
+
+import httpx
+import pytest
+from openai import APIConnectionError, APIStatusError
+
+from app.api.routes.tree_generation import TREE_MODEL, stream_tree
+from app.core import boson
+from app.core.config import settings
+from app.core.upstream import RetryBudget, UpstreamGovernor, UpstreamUnavailableError
+from tests.utils.simulation import build_tree
+
+
+def _status_error(status_code: int) -> APIStatusError:
+    request = httpx.Request("POST", "http://mock/v1/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    return APIStatusError(f"status {status_code}", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "BOSON_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "BOSON_RETRY_MAX_DELAY", 0.0)
+    monkeypatch.setattr(settings, "BOSON_MAX_RETRIES", 3)
+    monkeypatch.setattr(settings, "BOSON_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "BOSON_BREAKER_RESET_SECONDS", 60.0)
+
+
+def _flaky(failures: list[int]):  # type: ignore[no-untyped-def]
+    calls: list[int] = []
+
+    async def fn() -> str:
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise _status_error(failures[len(calls) - 1])
+        return "ok"
+
+    return fn, calls
+
+
+def test_transient_errors_are_retried() -> None:
+    governor = UpstreamGovernor()
+    fn, calls = _flaky([503, 429])
+    assert asyncio.run(governor.call("model", fn)) == "ok"
+    assert len(calls) == 3
+    assert governor.retries == 2
+    assert governor.breaker("model").state == "closed"
+
+
+def test_client_errors_are_not_retried() -> None:
+    governor = UpstreamGovernor()
+    fn, calls = _flaky([400])
+    with pytest.raises(APIStatusError):
+        asyncio.run(governor.call("model", fn))
+    assert len(calls) == 1
+    assert governor.breaker("model").failures == 0
+
+
+def test_breaker_opens_and_fails_fast() -> None:
+    governor = UpstreamGovernor()
+    fn, calls = _flaky([500] * 10)
+    with pytest.raises(UpstreamUnavailableError) as excinfo:
+        asyncio.run(governor.call("model", fn))
+    assert excinfo.value.status_code == 503
+    assert len(calls) == 3  # the breaker opened before the last retry
+    assert governor.breaker("model").state == "open"
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(governor.call("model", fn))
+    assert len(calls) == 3
+
+    # Other models are unaffected
+    other, _ = _flaky([])
+    assert asyncio.run(governor.call("other", other)) == "ok"
+
+
+def test_retry_budget_caps_retries() -> None:
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, window=10.0)
+    for _ in range(4):
+        budget.record_request()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+    assert budget.exhausted == 1
+
+
+def test_concurrency_is_limited_per_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "BOSON_MODEL_CONCURRENCY", {"model": 2})
+    governor = UpstreamGovernor()
+    running: list[int] = []
+    peak: list[int] = [0]
+
+    async def fn() -> None:
+        running.append(1)
+        peak[0] = max(peak[0], len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def run() -> None:
+        await asyncio.gather(*(governor.call("model", fn) for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak[0] == 2
+
+
+def test_calls_queued_when_the_breaker_opens_fail_fast(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "BOSON_MODEL_CONCURRENCY", {"model": 1})
+    monkeypatch.setattr(settings, "BOSON_MAX_RETRIES", 0)
+    monkeypatch.setattr(settings, "BOSON_BREAKER_FAILURE_THRESHOLD", 1)
+    governor = UpstreamGovernor()
+    fn, calls = _flaky([500] * 10)
+
+    async def failing() -> str:
+        await asyncio.sleep(0.01)
+        return await fn()
+
+    async def run() -> list[Any]:
+        return await asyncio.gather(*(governor.call("model", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    # The first call opened the circuit; the two queued behind it never went upstream
+    assert len(calls) == 1
+    assert all(isinstance(r, UpstreamUnavailableError) for r in results)
+    assert governor.semaphore("model")._value == 1
+
+
+class _FakeStream:
+    """The parts of openai's AsyncStream used by stream_tree, failing after `fail_after` chunks."""
+
+    def __init__(self, text: str, fail_after: int | None = None) -> None:
+        self._chunks = [text[i : i + 8] for i in range(0, len(text), 8)]
+        self._fail_after = fail_after
+        self.closed = False
+
+    async def __anext__(self) -> Any:
+        if self._fail_after is not None and self._fail_after == 0:
+            raise APIConnectionError(request=httpx.Request("POST", "http://mock/v1/chat/completions"))
+        if not self._chunks:
+            raise StopAsyncIteration
+        if self._fail_after is not None:
+            self._fail_after -= 1
+        delta = types.SimpleNamespace(content=self._chunks.pop(0))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _streaming_client(stream: _FakeStream) -> Any:
+    async def create(**kwargs: Any) -> _FakeStream:
+        assert kwargs["stream"] is True
+        return stream
+
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+
+def test_open_stream_in_stream_tree_holds_a_slot(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "BOSON_MODEL_CONCURRENCY", {TREE_MODEL: 2})
+    governor = UpstreamGovernor()
+    monkeypatch.setattr(boson, "governor", governor)
+    stream = _FakeStream(json.dumps({"scenarios_tree": build_tree(depth=2, branching=2)}))
+
+    async def run() -> None:
+        nodes = stream_tree(_streaming_client(stream), "background", "", "goal")  # type: ignore[arg-type]
+        first = await nodes.__anext__()
+        assert first.line == "line 1"
+        # Tokens are still being read: the stream occupies one of the two slots
+        assert governor.semaphore(TREE_MODEL)._value == 1
+        await nodes.aclose()
+
+    asyncio.run(run())
+    assert stream.closed
+    assert governor.semaphore(TREE_MODEL)._value == 2
+    assert governor.breaker(TREE_MODEL).failures == 0
+
+
+def test_failure_mid_stream_counts_for_the_breaker(monkeypatch: pytest.MonkeyPatch) -> None:
+    governor = UpstreamGovernor()
+    monkeypatch.setattr(boson, "governor", governor)
+    stream = _FakeStream(json.dumps({"scenarios_tree": build_tree(depth=2, branching=2)}), fail_after=3)
+
+    async def run() -> None:
+        opened = await boson.chat_completion(_streaming_client(stream), model="model", stream=True)  # type: ignore[arg-type]
+        try:
+            with pytest.raises(APIConnectionError):
+                async for _ in opened:
+                    pass
+        finally:
+            await opened.close()
+
+    asyncio.run(run())
+    assert governor.breaker("model").failures == 1
+    assert governor.semaphore("model")._value == settings.BOSON_MAX_CONCURRENCY
@@ -0,0 +1,40 @@
+from sqlmodel import Session, select
+
+from app import crud
+from app.api.routes.tree_generation import save_messages_to_tree
+from app.api.routes.web_app import get_active_leaf, get_last_message_id_from_tree
+from app.models import Message, Simulation
+from tests.utils.simulation import create_random_simulation, full_tree
+
+
+def _active_leaf(db: Session, simulation: Simulation) -> tuple[int | None, int | None]:
+    db.expire_all()
+    leaf = get_active_leaf(simulation.id, db)
+    return leaf.message_id, leaf.depth
+
+
+def test_active_leaf_follows_generation_selection_and_deletion(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    assert _active_leaf(db, simulation) == (None, None)
+
+    save_messages_to_tree(db, simulation.case_id, {"scenarios_tree": full_tree(3, 2)}, existing_tree_id=simulation.id)
+    root = db.exec(select(Message).where(Message.simulation_id == simulation.id, Message.parent_id == None)).one()  # noqa: E711
+    assert _active_leaf(db, simulation) == (root.id, 0)
+
+    child = crud.get_message_children(db, root.id)[0]
+    crud.update_message_selected(db, child.id)
+    grandchild = crud.get_message_children(db, child.id)[1]
+    crud.update_message_selected(db, grandchild.id)
+    assert _active_leaf(db, simulation) == (grandchild.id, 2)
+    assert get_last_message_id_from_tree(db, simulation.id) == grandchild.id
+
+    # Generating from the leaf adds unselected options only
+    save_messages_to_tree(
+        db, simulation.case_id, {"scenarios_tree": full_tree(2, 3)}, existing_tree_id=simulation.id, last_message_id=grandchild.id
+    )
+    assert _active_leaf(db, simulation) == (grandchild.id, 2)
+
+    crud.delete_messages_after_children(db, root.id)
+    assert _active_leaf(db, simulation) == (child.id, 1)
+    crud.delete_messages_including_children(db, root.id)
+    assert _active_leaf(db, simulation) == (root.id, 0)
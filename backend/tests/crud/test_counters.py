@@ -0,0 +1,60 @@
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import Case, Message, Simulation
+from app.schemas import SimulationCreate
+from tests.utils.simulation import (
+    create_message_chain,
+    create_random_simulation,
+    full_tree,
+)
+
+
+def _counters(db: Session, simulation: Simulation) -> tuple[int, int, int]:
+    db.expire_all()
+    case = db.get(Case, simulation.case_id)
+    simulation = db.get(Simulation, simulation.id)
+    return case.simulation_count, simulation.node_count, simulation.max_depth
+
+
+def test_counters_follow_inserts_and_deletes(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    assert _counters(db, simulation) == (1, 0, 0)
+
+    crud.insert_message_tree(db, simulation.id, full_tree(3, 2))
+    db.commit()
+    assert _counters(db, simulation) == (1, 7, 2)
+
+    leaf = db.exec(select(Message).where(Message.simulation_id == simulation.id, Message.depth == 2)).first()
+    db.add(Message(content="late reply", role="A", simulation_id=simulation.id, parent_id=leaf.id))
+    db.commit()
+    assert _counters(db, simulation) == (1, 8, 3)
+
+    root = db.exec(select(Message).where(Message.simulation_id == simulation.id, Message.depth == 0)).one()
+    crud.delete_messages_after_children(db, root.id)
+    assert _counters(db, simulation) == (1, 3, 1)
+    crud.delete_messages_including_children(db, root.id)
+    assert _counters(db, simulation) == (1, 1, 0)
+
+    other = crud.create_simulation(
+        session=db, simulation_create=SimulationCreate(headline="h", brief="b", case_id=simulation.case_id)
+    )
+    assert _counters(db, other)[0] == 2
+    db.delete(other)
+    db.commit()
+    assert _counters(db, simulation)[0] == 1
+
+
+def test_repair_recomputes_drifted_counters(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    create_message_chain(db, simulation, 4)
+    assert _counters(db, simulation) == (1, 4, 3)
+
+    db.execute(update(Simulation).where(Simulation.id == simulation.id).values(node_count=40, max_depth=0))
+    db.execute(update(Case).where(Case.id == simulation.case_id).values(simulation_count=0))
+    cases, simulations = crud.repair_counters(db)
+    assert cases >= 1 and simulations >= 1
+    db.commit()
+    assert _counters(db, simulation) == (1, 4, 3)
+    assert crud.repair_counters(db) == (0, 0)
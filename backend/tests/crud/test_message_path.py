@@ -0,0 +1,124 @@
+import pytest
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.models import PATH_KEY_LENGTH, Message
+from tests.utils.simulation import (
+    chain,
+    create_message_chain,
+    create_random_simulation,
+    full_tree,
+    walk_to_root,
+)
+
+
+def test_message_path_is_root_first(db: Session) -> None:
+    messages = create_message_chain(db, create_random_simulation(db), 4)
+    path = crud.get_message_path(db, messages[2].id)
+    assert [m.id for m in path] == [m.id for m in messages[:3]]
+
+
+def test_message_path_of_missing_message_is_empty(db: Session) -> None:
+    assert crud.get_message_path(db, 10**9) == []
+
+
+@pytest.mark.parametrize("depth", [10, 100, 1000])
+def test_message_path_matches_walk_to_root(db: Session, depth: int) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, chain(depth))
+    db.commit()
+    leaf = db.exec(select(func.max(Message.id)).where(Message.simulation_id == simulation.id)).one()
+
+    path = crud.get_message_path(db, leaf)
+    assert len(path) == depth
+    assert path[0].parent_id is None
+    assert [m.id for m in path] == [m.id for m in walk_to_root(db, leaf)]
+
+
+def test_ancestry_is_maintained_on_orm_and_bulk_insert(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    chain_messages = create_message_chain(db, simulation, 3)
+    assert [(m.path, m.depth) for m in chain_messages] == [
+        ("", 0),
+        (f"{chain_messages[0].id}/", 1),
+        (f"{chain_messages[0].id}/{chain_messages[1].id}/", 2),
+    ]
+
+    leaf = chain_messages[-1]
+    crud.insert_message_tree(db, simulation.id, chain(3), parent_id=leaf.id, include_root=False)
+    db.commit()
+    [child] = crud.get_message_children(db, leaf.id)
+    [grandchild] = crud.get_message_children(db, child.id)
+    assert (child.path, child.depth) == (crud.subtree_prefix(leaf), 3)
+    assert (grandchild.path, grandchild.depth) == (crud.subtree_prefix(child), 4)
+
+
+def test_subtree_is_a_range_of_paths(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    root = create_message_chain(db, simulation, 1)[0]
+    branches = []
+    for _ in range(12):
+        # Enough siblings for ids like 2 and 21 to share a textual prefix
+        branch = Message(content="x", role="B", simulation_id=simulation.id, parent_id=root.id)
+        db.add(branch)
+        db.commit()
+        db.refresh(branch)
+        branches.append(branch)
+    crud.insert_message_tree(db, simulation.id, chain(3), parent_id=branches[0].id, include_root=False)
+    db.commit()
+
+    subtree = crud.get_subtree(db, branches[0].id)
+    assert len(subtree) == 2
+    assert all(m.path.startswith(crud.subtree_prefix(branches[0])) for m in subtree)
+    assert [m.depth for m in subtree] == [2, 3]
+    assert len(crud.get_subtree(db, root.id)) == 14
+
+
+def test_delete_including_children_removes_only_the_subtree(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    root = create_message_chain(db, simulation, 1)[0]
+    crud.insert_message_tree(db, simulation.id, full_tree(4, 3), parent_id=root.id, include_root=False)
+    db.commit()
+    first, second, third = crud.get_message_children(db, root.id)
+
+    assert crud.delete_messages_including_children(db, first.id) == 3 + 9
+    assert crud.get_message_children(db, first.id) == []
+    assert len(crud.get_subtree(db, second.id)) == 12
+    assert len(crud.get_subtree(db, root.id)) == 3 + 2 * 12
+
+
+def test_delete_after_children_keeps_children_and_later_branches(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    root = create_message_chain(db, simulation, 1)[0]
+    crud.insert_message_tree(db, simulation.id, full_tree(4, 2), parent_id=root.id, include_root=False)
+    db.commit()
+    first, second = crud.get_message_children(db, root.id)
+    # A branch created after the trimmed one must survive
+    later = Message(content="later", role="A", simulation_id=simulation.id, parent_id=second.id)
+    db.add(later)
+    db.commit()
+
+    assert crud.delete_messages_after_children(db, first.id) == 4
+    assert len(crud.get_message_children(db, first.id)) == 2
+    assert len(crud.get_subtree(db, first.id)) == 2
+    assert len(crud.get_subtree(db, second.id)) == 6 + 1
+
+
+def test_subtrees_deeper_than_the_path_key(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, chain(600))
+    db.commit()
+    leaf = db.exec(select(Message).where(Message.simulation_id == simulation.id, Message.depth == 599)).one()
+    assert len(leaf.path) > PATH_KEY_LENGTH
+
+    [deep] = crud.get_message_path(db, leaf.id)[550:551]
+    assert len(crud.subtree_prefix(deep)) > PATH_KEY_LENGTH
+    assert [m.depth for m in crud.get_subtree(db, deep.id)] == list(range(551, 600))
+    window = crud.get_tree_window(db, simulation.id, deep, 3)
+    assert [m.depth for m in window] == [550, 551, 552, 553]
+
+    crud.insert_message_tree(db, simulation.id, full_tree(3, 2), parent_id=leaf.id, include_root=False)
+    db.commit()
+    assert len(crud.get_subtree(db, leaf.id)) == 6
+    assert crud.delete_messages_including_children(db, deep.id) == 49 + 6
+    assert crud.get_subtree(db, deep.id) == []
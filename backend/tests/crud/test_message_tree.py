@@ -0,0 +1,58 @@
+from typing import Any
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import Message
+from tests.utils.simulation import create_random_simulation
+
+
+def _tree(depth: int, branching: int, level: int = 1, speaker: str = "A") -> dict[str, Any]:
+    other = "B" if speaker == "A" else "A"
+    return {
+        "speaker": speaker,
+        "line": f"line at level {level}",
+        "level": level,
+        "reflects_personality": "...",
+        "responses": [
+            _tree(depth, branching, level + 1, other) for _ in range(branching)
+        ] if level < depth else [],
+    }
+
+
+def _children(messages: list[Message], parent_id: int | None) -> list[Message]:
+    return [m for m in messages if m.parent_id == parent_id]
+
+
+def test_insert_message_tree_of_any_shape(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    stats = crud.insert_message_tree(db, simulation.id, _tree(depth=4, branching=2))
+    db.commit()
+
+    assert stats.rows == 1 + 2 + 4 + 8
+    assert stats.levels == 4
+    messages = db.exec(select(Message).where(Message.simulation_id == simulation.id)).all()
+    assert len(messages) == 15
+    (root,) = _children(messages, None)
+    assert root.selected and root.role == "A"
+    level2 = _children(messages, root.id)
+    assert [m.role for m in level2] == ["B", "B"]
+    assert all(len(_children(messages, m.id)) == 2 for m in level2)
+    assert not any(m.selected for m in messages if m.id != root.id)
+
+
+def test_insert_message_tree_under_existing_message(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, _tree(depth=1, branching=0))
+    db.commit()
+    parent = db.exec(select(Message).where(Message.simulation_id == simulation.id)).one()
+
+    stats = crud.insert_message_tree(
+        db, simulation.id, _tree(depth=3, branching=3), parent_id=parent.id, include_root=False
+    )
+    db.commit()
+
+    assert stats.rows == 3 + 9
+    messages = db.exec(select(Message).where(Message.simulation_id == simulation.id)).all()
+    assert len(_children(messages, parent.id)) == 3
+    assert len(messages) == 13
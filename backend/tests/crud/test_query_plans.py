@@ -0,0 +1,18 @@
+from sqlmodel import Session
+
+from app.benchmarks.query_plans import full_scans, seed, seq_scans
+
+
+def test_hot_queries_use_indexes(db: Session) -> None:
+    sample = seed(db, simulations=3, depth=4, branching=2)
+    try:
+        assert seq_scans(db, sample, force_index=True) == {}
+    finally:
+        db.rollback()
+
+
+def test_full_scans_are_detected_in_both_dialects() -> None:
+    assert full_scans(["Seq Scan on message  (cost=0.00..1.10 rows=1 width=4)"]) == ["message"]
+    assert full_scans(["Index Scan using ix_message_parent_id on message"]) == []
+    assert full_scans(["SCAN bookmark"]) == ["bookmark"]
+    assert full_scans(["SCAN message USING INDEX ix_message_path_key", "SEARCH simulation USING INDEX ix_simulation_case_id (case_id=?)"]) == []
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.api.routes.tree_generation import save_messages_to_tree
+from app.api.routes.web_app import get_tree_changes_endpoint
+from app.core.config import settings
+from app.models import MessageTombstone, Simulation
+from app.schemas import TreeChangesResponse
+from tests.utils.simulation import create_random_simulation, full_tree
+
+
+def _changes(db: Session, simulation: Simulation, since: int) -> TreeChangesResponse:
+    db.expire_all()
+    return get_tree_changes_endpoint(simulation.id, since=since, session=db)
+
+
+def test_changes_cover_generation_selection_and_trim(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    start = _changes(db, simulation, 0)
+    assert (start.revision, start.upserted, start.deleted) == (0, [], [])
+
+    save_messages_to_tree(db, simulation.case_id, {"scenarios_tree": full_tree(3, 3)}, existing_tree_id=simulation.id)
+    generated = _changes(db, simulation, start.revision)
+    assert len(generated.upserted) == 13
+    assert generated.upserted[0].parent_id is None
+
+    root = generated.upserted[0]
+    child = crud.get_message_children(db, root.id)[2]
+    crud.update_message_selected(db, child.id)
+    selected = _changes(db, simulation, generated.revision)
+    assert [(n.id, n.selected) for n in selected.upserted] == [(child.id, True)]
+    assert selected.revision > generated.revision
+
+    crud.delete_messages_including_children(db, child.id)
+    trimmed = _changes(db, simulation, selected.revision)
+    assert trimmed.upserted == []
+    assert len(trimmed.deleted) == 3
+    assert _changes(db, simulation, trimmed.revision).deleted == []
+
+
+def test_clients_behind_expired_tombstones_reload(db: Session) -> None:
+    simulation = create_random_simulation(db)
+    crud.insert_message_tree(db, simulation.id, full_tree(3, 2))
+    db.commit()
+    [root] = crud.get_tree_window(db, simulation.id, None, 0)
+    first, second = crud.get_message_children(db, root.id)
+
+    crud.delete_messages_including_children(db, first.id)
+    before = _changes(db, simulation, 0).revision
+    for tombstone in db.exec(select(MessageTombstone).where(MessageTombstone.simulation_id == simulation.id)):
+        tombstone.deleted_at = datetime.utcnow() - timedelta(seconds=settings.TREE_CHANGES_RETENTION_SECONDS + 1)
+    db.commit()
+    crud.delete_messages_including_children(db, second.id)
+
+    assert _changes(db, simulation, before - 1).reset
+    assert not _changes(db, simulation, before).reset
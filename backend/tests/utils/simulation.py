@@ -0,0 +1,88 @@
+from typing import Any
+
+from sqlmodel import Session
+
+from app.models import Case, Message, Simulation
+from tests.utils.utils import random_lower_string
+
+
+def create_random_simulation(db: Session) -> Simulation:
+    case = Case(
+        name=random_lower_string(),
+        party_a=random_lower_string(),
+        party_b=random_lower_string(),
+        context="{}",
+        summary="",
+    )
+    db.add(case)
+    db.commit()
+    simulation = Simulation(
+        headline=random_lower_string(), brief=random_lower_string(), case_id=case.id
+    )
+    db.add(simulation)
+    db.commit()
+    db.refresh(simulation)
+    return simulation
+
+
+def create_message_chain(db: Session, simulation: Simulation, depth: int) -> list[Message]:
+    """Create a root-to-leaf path of `depth` selected messages, alternating A and B."""
+    chain: list[Message] = []
+    parent_id = None
+    for i in range(depth):
+        message = Message(
+            content=f"statement {i}",
+            role="A" if i % 2 == 0 else "B",
+            selected=True,
+            simulation_id=simulation.id,
+            parent_id=parent_id,
+        )
+        db.add(message)
+        db.commit()
+        db.refresh(message)
+        chain.append(message)
+        parent_id = message.id
+    return chain
+
+
+def full_tree(depth: int, branching: int, level: int = 1) -> dict[str, Any]:
+    """A complete TreeNode hierarchy `depth` levels deep, `branching` responses per node."""
+    return {
+        "speaker": "A" if level % 2 else "B",
+        "line": f"statement at level {level}",
+        "responses": [full_tree(depth, branching, level + 1) for _ in range(branching)] if level < depth else [],
+    }
+
+
+def build_tree(depth: int, branching: int, level: int = 1, path: str = "1") -> dict[str, Any]:
+    """A scenarios_tree node as the tree model returns it, with level and justification."""
+    return {
+        "speaker": "A" if level % 2 else "B",
+        "line": f"line {path}",
+        "level": level,
+        "reflects_personality": f"justification {path}",
+        "responses": [
+            build_tree(depth, branching, level + 1, f"{path}.{i + 1}") for i in range(branching)
+        ] if level < depth else [],
+    }
+
+
+def chain(depth: int) -> dict[str, Any]:
+    """A single branch `depth` messages deep, in TreeNode shape."""
+    node: dict[str, Any] = {"speaker": "A" if depth % 2 else "B", "line": f"statement {depth}", "responses": []}
+    for level in range(depth - 1, 0, -1):
+        node = {"speaker": "A" if level % 2 else "B", "line": f"statement {level}", "responses": [node]}
+    return node
+
+
+def walk_to_root(db: Session, message_id: int) -> list[Message]:
+    """Root-to-message path by following parent_id one message at a time."""
+    ordered: list[Message] = []
+    current_id: int | None = message_id
+    while current_id is not None:
+        message = db.get(Message, current_id)
+        if not message:
+            break
+        ordered.insert(0, message)
+        current_id = message.parent_id
+    return ordered
@@ -23,6 +23,23 @@ export const Route = createFileRoute("/cases")({
   component: CasesPage,
 })
 
+// GET /cases returns one page at a time; follow X-Next-Cursor to the last one
+async function fetchAllCases(): Promise<any[]> {
+  const apiUrl = import.meta.env.VITE_API_URL
+  const cases: any[] = []
+  let before: string | null = null
+  do {
+    const params = new URLSearchParams(before ? { before } : {})
+    const response = await fetch(`${apiUrl}/api/v1/cases?${params}`)
+    if (!response.ok) {
+      throw new Error("Failed to fetch cases")
+    }
+    cases.push(...(await response.json()))
+    before = response.headers.get("X-Next-Cursor")
+  } while (before)
+  return cases
+}
+
 interface Case {
   id: string
   name: string
@@ -43,7 +60,7 @@ function CasesPage() {
 
 
     useEffect(() => {
-    DefaultService.getAllCases()
+    fetchAllCases()
       .then((data: any) => {
         const cases = data.map((c: any) => ({
           id: String(c.id),